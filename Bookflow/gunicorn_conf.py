@@ -0,0 +1,31 @@
+"""
+Gunicorn settings for the container: ``gunicorn -c Bookflow/gunicorn_conf.py Bookflow.asgi``.
+
+The app is imported once in the master before the workers fork, so workers start serving
+without each loading Django, and a broken app fails the boot instead of every worker.
+"""
+import multiprocessing
+
+from decouple import config
+
+bind = config('GUNICORN_BIND', default=':8000')
+# Uvicorn workers so the async search views share one event loop per worker
+worker_class = 'uvicorn.workers.UvicornWorker'
+workers = config('WEB_CONCURRENCY', default=multiprocessing.cpu_count(), cast=int)
+preload_app = True
+
+timeout = config('GUNICORN_TIMEOUT', default=30, cast=int)
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers now and then, staggered so they do not all restart together
+max_requests = config('GUNICORN_MAX_REQUESTS', default=10000, cast=int)
+max_requests_jitter = max_requests // 10
+
+
+def post_fork(server, worker):
+    # Connections opened in the master while preloading must not be shared by the workers
+    from django.db import connections
+    connections.close_all()
+    # Build the autocomplete index before the first keystroke needs it
+    from services.autocomplete import get_book_autocomplete
+    get_book_autocomplete().warm()
@@ -36,11 +36,13 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'rest_framework',
     'student',
     'rental',
 ]
 
 MIDDLEWARE = [
+    'rental.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -55,7 +57,8 @@ ROOT_URLCONF = 'Bookflow.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that records render times for RequestMetricsMiddleware
+        'BACKEND': 'services.metrics.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -70,6 +73,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'Bookflow.wsgi.application'
+ASGI_APPLICATION = 'Bookflow.asgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
@@ -96,6 +100,132 @@ DATABASES = {
 # }
 DATABASES['default']['ATOMIC_REQUESTS'] = True
 
+# JSON API under /api/v1/; JSON only, so responses skip the browsable API templates
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.IsAuthenticated'],
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+    'DEFAULT_PARSER_CLASSES': ['rest_framework.parsers.JSONParser'],
+}
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# File based so that every gunicorn worker on the host shares it and it works offline.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / '.cache')),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
+# OpenLibrary search endpoint; point it at a mirror or at the benchmark stub
+OPENLIBRARY_SEARCH_URL = config('OPENLIBRARY_SEARCH_URL', default='https://openlibrary.org/search.json')
+# The maximum number of docs asked of OpenLibrary per search
+OPENLIBRARY_SEARCH_LIMIT = config('OPENLIBRARY_SEARCH_LIMIT', default=20, cast=int)
+
+# OpenLibrary search cache: an in-process LRU per worker in front of the shared cache above.
+# Entries are fresh for TTL seconds and served stale for STALE_TTL more seconds while refreshed.
+OPENLIBRARY_SEARCH_CACHE = {
+    'CACHE_ALIAS': 'default',
+    'MAX_ENTRIES': config('OPENLIBRARY_SEARCH_CACHE_MAX_ENTRIES', default=1024, cast=int),
+    'TTL': config('OPENLIBRARY_SEARCH_CACHE_TTL', default=300, cast=int),
+    'STALE_TTL': config('OPENLIBRARY_SEARCH_CACHE_STALE_TTL', default=3600, cast=int),
+}
+
+# OpenLibrary HTTP client: one pooled keep-alive session per worker process.
+# Timeouts are in seconds; retries use full-jitter exponential backoff capped at BACKOFF_MAX.
+OPENLIBRARY_HTTP_CLIENT = {
+    'POOL_MAXSIZE': config('OPENLIBRARY_HTTP_POOL_MAXSIZE', default=10, cast=int),
+    'CONNECT_TIMEOUT': config('OPENLIBRARY_HTTP_CONNECT_TIMEOUT', default=3.05, cast=float),
+    'READ_TIMEOUT': config('OPENLIBRARY_HTTP_READ_TIMEOUT', default=10, cast=float),
+    'MAX_RETRIES': config('OPENLIBRARY_HTTP_MAX_RETRIES', default=2, cast=int),
+    'BACKOFF_FACTOR': 0.2,
+    'BACKOFF_MAX': 2.0,
+    # Connections shared by all in-flight searches of the async (ASGI) search views
+    'ASYNC_POOL_MAXSIZE': config('OPENLIBRARY_HTTP_ASYNC_POOL_MAXSIZE', default=100, cast=int),
+}
+
+# OpenLibrary circuit breaker, per worker. Each search may take LATENCY_BUDGET seconds, retries
+# included. The circuit opens when at least MIN_CALLS of the calls of the last WINDOW seconds failed
+# at FAILURE_RATE or more; searches then skip OpenLibrary for OPEN_SECONDS, after which
+# HALF_OPEN_PROBES calls test whether it recovered. Skipped searches show local and cached results.
+OPENLIBRARY_SEARCH_LATENCY_BUDGET = config('OPENLIBRARY_SEARCH_LATENCY_BUDGET', default=4.0, cast=float)
+OPENLIBRARY_CIRCUIT_BREAKER = {
+    'WINDOW': config('OPENLIBRARY_CIRCUIT_WINDOW', default=30, cast=int),
+    'MIN_CALLS': config('OPENLIBRARY_CIRCUIT_MIN_CALLS', default=10, cast=int),
+    'FAILURE_RATE': config('OPENLIBRARY_CIRCUIT_FAILURE_RATE', default=0.5, cast=float),
+    'OPEN_SECONDS': config('OPENLIBRARY_CIRCUIT_OPEN_SECONDS', default=30, cast=float),
+    'HALF_OPEN_PROBES': 1,
+}
+
+# Single-flight: concurrent identical searches in a worker share one upstream call. Followers wait
+# up to TIMEOUT seconds for the leader. SHARED_LOCK also coordinates workers through the cache.
+OPENLIBRARY_SINGLE_FLIGHT = {
+    'TIMEOUT': config('OPENLIBRARY_SINGLE_FLIGHT_TIMEOUT', default=10, cast=float),
+    'SHARED_LOCK': config('OPENLIBRARY_SINGLE_FLIGHT_SHARED_LOCK', default=False, cast=bool),
+    'CACHE_ALIAS': 'default',
+    'LOCK_TTL': 15,
+    'POLL_INTERVAL': 0.05,
+}
+
+# Per-request timings; Server-Timing headers expose them to clients, so they can be turned off
+REQUEST_METRICS = {
+    'SERVER_TIMING': config('REQUEST_METRICS_SERVER_TIMING', default=True, cast=bool),
+}
+
+# Rendered rented books panels, keyed by the rental summary version of the student. The active
+# rentals only listing is re-rendered at least every ACTIVE_TTL seconds as return dates pass.
+RENTED_BOOKS_PANEL_CACHE = {
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': config('RENTED_BOOKS_PANEL_CACHE_TIMEOUT', default=24 * 60 * 60, cast=int),
+    'ACTIVE_TTL': 60,
+}
+
+# Per-process cache of catalogue key -> book_id used when renting books
+BOOK_CATALOGUE_CACHE = {
+    'MAX_ENTRIES': 10000,
+    'MAX_AGE': 24 * 60 * 60,
+}
+
+# Local full-text search over the catalogue; searches with fewer than MIN_RESULTS local
+# matches also go to OpenLibrary
+BOOK_LOCAL_SEARCH = {
+    'LIMIT': config('BOOK_LOCAL_SEARCH_LIMIT', default=20, cast=int),
+    'MIN_RESULTS': config('BOOK_LOCAL_SEARCH_MIN_RESULTS', default=5, cast=int),
+}
+
+# Typeahead suggestions from an in-memory index of the catalogue, built per worker on first use.
+# Books modified and rentals created since the last refresh are merged in at most every
+# REFRESH_INTERVAL seconds; the index is rebuilt every FULL_RELOAD_INTERVAL seconds.
+BOOK_AUTOCOMPLETE = {
+    'REFRESH_INTERVAL': config('BOOK_AUTOCOMPLETE_REFRESH_INTERVAL', default=60, cast=float),
+    'FULL_RELOAD_INTERVAL': config('BOOK_AUTOCOMPLETE_FULL_RELOAD_INTERVAL', default=3600, cast=float),
+    'LIMIT': 10,
+    'MIN_QUERY_LENGTH': 2,
+}
+
+# Overdue fees: the accrue_overdue_fees job of `manage.py run_jobs` charges PER_DAY for every full
+# day an unreturned rental is late. It scans BATCH_SIZE rentals per transaction every INTERVAL seconds.
+OVERDUE_FEES = {
+    'PER_DAY': config('OVERDUE_FEE_PER_DAY', default='0.10'),
+    'BATCH_SIZE': config('OVERDUE_FEES_BATCH_SIZE', default=1000, cast=int),
+    'INTERVAL': config('OVERDUE_FEES_INTERVAL', default=3600, cast=int),
+}
+
+# Periodic jobs of `manage.py run_jobs`: a runner holds a job for LEASE_SECONDS after each
+# checkpoint, and looks for due jobs every POLL_INTERVAL seconds
+JOB_RUNNER = {
+    'LEASE_SECONDS': config('JOB_RUNNER_LEASE_SECONDS', default=300, cast=int),
+    'POLL_INTERVAL': config('JOB_RUNNER_POLL_INTERVAL', default=30, cast=int),
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -144,4 +274,14 @@ STORAGES = {
     },
 }
 AUTH_USER_MODEL = 'student.Student'
-LOGIN_URL = '/'
\ No newline at end of file
+LOGIN_URL = '/'
+
+# Sessions and the signed in user are read from the cache, so authenticated requests run no query
+# for authentication. Sessions are written through to the database; cached users are dropped
+# when the student is saved and expire after TIMEOUT seconds otherwise.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+AUTHENTICATION_BACKENDS = ['student.backends.CachedModelBackend']
+STUDENT_USER_CACHE = {
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': config('STUDENT_USER_CACHE_TIMEOUT', default=300, cast=int),
+}
\ No newline at end of file
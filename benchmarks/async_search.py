@@ -0,0 +1,87 @@
+"""
+Compares sync and async OpenLibrary search throughput against a local slow stub server.
+
+The sync run models gunicorn sync workers: ``--workers`` threads each doing one blocking search at a
+time. The async run models a single ASGI worker keeping ``--concurrency`` searches in flight on one
+event loop. Every search uses a distinct title so the cache never answers.
+
+Example Usage:
+    python -m benchmarks.async_search --searches 200 --latency 0.2 --workers 4 --concurrency 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Bookflow.settings')
+django.setup()
+
+from django.test import override_settings  # noqa: E402
+
+from services.book_rental_service import OpenLibraryBookRentalService  # noqa: E402
+from services.http_client import AsyncPooledHTTPClient, PooledHTTPClient  # noqa: E402
+from services.search_cache import SearchResultCache  # noqa: E402
+from test.openlibrary_stub import stub_in_subprocess  # noqa: E402
+
+BENCHMARK_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark'},
+}
+
+
+def run_sync(search_url, searches, workers):
+    service = OpenLibraryBookRentalService(search_cache=SearchResultCache(),
+                                           http_client=PooledHTTPClient(pool_maxsize=workers),
+                                           api_base_url=search_url)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda index: service.search_book(f"sync title {index}"), range(searches)))
+    return time.perf_counter() - started, service.http_client.stats.snapshot()
+
+
+async def run_async(search_url, searches, concurrency):
+    http_client = AsyncPooledHTTPClient(pool_maxsize=concurrency)
+    service = OpenLibraryBookRentalService(search_cache=SearchResultCache(), async_http_client=http_client,
+                                           api_base_url=search_url)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def search(index):
+        async with semaphore:
+            return await service.asearch_book(f"async title {index}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(search(index) for index in range(searches)))
+    elapsed = time.perf_counter() - started
+    await http_client.aclose()
+    return elapsed, http_client.stats.snapshot()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--searches', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.2, help="Stub response delay in seconds.")
+    parser.add_argument('--workers', type=int, default=4, help="Sync worker threads.")
+    parser.add_argument('--concurrency', type=int, default=100, help="Async searches in flight.")
+    args = parser.parse_args()
+
+    results = {}
+    with override_settings(CACHES=BENCHMARK_CACHES), stub_in_subprocess(latency=args.latency) as search_url:
+        for mode, (elapsed, stats) in (
+                ('sync', run_sync(search_url, args.searches, args.workers)),
+                ('async', asyncio.run(run_async(search_url, args.searches, args.concurrency)))):
+            results[mode] = {
+                'seconds': round(elapsed, 3),
+                'searches_per_second': round(args.searches / elapsed, 1),
+                'p50_ms': round(stats['p50_seconds'] * 1000, 1),
+                'p99_ms': round(stats['p99_seconds'] * 1000, 1),
+                'errors': stats['errors'],
+            }
+    results['speedup'] = round(results['async']['searches_per_second'] / results['sync']['searches_per_second'], 1)
+    print(json.dumps({'args': vars(args), 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
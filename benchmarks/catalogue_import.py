@@ -0,0 +1,59 @@
+"""
+Measures the import of a generated OpenLibrary editions dump into the catalogue, in lines per second.
+
+The dump is written to a temporary directory and imported into a throwaway test database created
+from the configured one, so it never touches real data; use PostgreSQL for numbers comparable to
+production. Each ``--workers`` value is measured on an empty catalogue.
+
+Example Usage:
+    python -m benchmarks.catalogue_import --editions 1000000 --workers 0 --workers 3
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Bookflow.settings')
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment, teardown_test_environment  # noqa: E402
+
+from rental.models import Book  # noqa: E402
+from services.catalogue_import import CatalogueDumpImporter  # noqa: E402
+from test.openlibrary_stub import write_edition_dump  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--editions', type=int, default=200000, help="Distinct editions in the generated dump.")
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--workers', type=int, action='append', help="Parsing processes; can be repeated.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'ol_dump_editions.txt.gz')
+        started = time.perf_counter()
+        lines = write_edition_dump(path, args.editions)
+        print(f"Wrote {lines} lines in {time.perf_counter() - started:.1f}s")
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            for workers in args.workers or [0]:
+                Book.objects.all().delete()
+                importer = CatalogueDumpImporter(batch_size=args.batch_size, workers=workers)
+                started = time.perf_counter()
+                result = importer.run(path, restart=True)
+                elapsed = time.perf_counter() - started
+                print(f"workers={workers:<3} {elapsed:8.1f} s {result.lines / elapsed:10.0f} lines/s "
+                      f"{Book.objects.count():10d} books")
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+
+if __name__ == '__main__':
+    main()
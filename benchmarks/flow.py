@@ -0,0 +1,254 @@
+"""
+Drives the login -> search -> rent -> extend flow through the app's URLs and reports per-view latency.
+
+Each virtual user runs ``--flows`` flows one after another with its own test client, and
+``--users`` virtual users run at once. Searches go to a local OpenLibrary stub with configurable
+latency and payload size, and draw their titles from a pool of ``--queries`` titles so repeat
+searches exercise the caches. The run uses a throwaway test database created from the configured
+one, so it never touches real data; use PostgreSQL for numbers comparable to production.
+
+Results are printed, or written with ``--output``, as JSON. ``--compare`` checks the run against a
+previous results file and exits with status 1 when a view's p95 latency or the throughput regressed
+by more than ``--threshold``.
+
+Example Usage:
+    python -m benchmarks.flow --users 8 --flows 25 --latency 0.1 --docs 20 --output flow.json
+    python -m benchmarks.flow --users 8 --flows 25 --compare flow.json
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Bookflow.settings')
+django.setup()
+
+from django.db import connection, connections  # noqa: E402
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.test.utils import setup_test_environment, teardown_test_environment  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from services.http_client import LatencyStats  # noqa: E402
+from services.load_data import SyntheticDataGenerator  # noqa: E402
+from student.models import Student  # noqa: E402
+from test.openlibrary_stub import make_docs, stub_in_subprocess  # noqa: E402
+
+# Seconds a SQLite connection waits for another thread's write to finish
+SQLITE_BUSY_TIMEOUT = 30
+VIEWS = ('login', 'book_search', 'book_rent', 'book_rent_extension')
+BENCHMARK_SETTINGS = {
+    'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark'}},
+    # The manifest storage needs collectstatic to have run
+    'STORAGES': {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    },
+}
+
+
+class FlowRecorder:
+    """
+    Collects the latency and errors of every request, per view.
+
+    Attributes:
+        stats (dict[str, LatencyStats]): The latency of each view.
+    """
+
+    def __init__(self, window):
+        self.stats = {view: LatencyStats(window=window) for view in VIEWS}
+
+    def request(self, view, send, expected_status=200):
+        started = time.perf_counter()
+        try:
+            response = send()
+        except Exception:
+            self.stats[view].record(time.perf_counter() - started, ok=False)
+            raise
+        self.stats[view].record(time.perf_counter() - started, ok=response.status_code == expected_status)
+        return response
+
+    def report(self, elapsed):
+        results = {}
+        for view, stats in self.stats.items():
+            snapshot = stats.snapshot()
+            results[view] = {
+                'requests': snapshot['calls'],
+                'errors': snapshot['errors'],
+                'requests_per_second': round(snapshot['calls'] / elapsed, 1) if elapsed else 0.0,
+                'mean_ms': round(snapshot['mean_seconds'] * 1000, 2),
+                'p50_ms': round(snapshot['p50_seconds'] * 1000, 2),
+                'p95_ms': round(snapshot['p95_seconds'] * 1000, 2),
+                'p99_ms': round(snapshot['p99_seconds'] * 1000, 2),
+                'max_ms': round(snapshot['max_seconds'] * 1000, 2),
+            }
+        return results
+
+
+def begin_immediate(self):
+    self.cursor().execute('BEGIN IMMEDIATE')
+
+
+def use_sqlite_for_concurrent_users():
+    """
+    Lets the virtual users share the SQLite benchmark database.
+
+    A deferred ``BEGIN`` takes the write lock at the first write of a transaction that has already
+    read, and SQLite fails that at once with "database is locked" when another thread holds the
+    lock, ignoring the busy timeout. Taking the lock at ``BEGIN IMMEDIATE`` makes the writers queue
+    for it instead, as the ``transaction_mode`` option of Django 5.1 does. WAL mode keeps readers
+    outside transactions from blocking the writer.
+    """
+    connection.settings_dict['OPTIONS']['timeout'] = SQLITE_BUSY_TIMEOUT
+    SQLiteDatabaseWrapper._start_transaction_under_autocommit = begin_immediate
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode=WAL')
+
+
+def run_flow(client, recorder, student_id, username, password, title):
+    """
+    Logs in, searches for ``title``, rents the first result and extends the rental.
+    """
+    recorder.request('login', lambda: client.post(reverse('login'), {'username': username, 'password': password}),
+                     expected_status=302)
+
+    response = recorder.request('book_search', lambda: client.post(reverse('book_search'), {'search_query': title}))
+    results = response.context['search_results'] if response.context else []
+    if not results:
+        return
+    book = results[0]
+
+    return_date = datetime.datetime.today() + datetime.timedelta(days=30)
+    response = recorder.request('book_rent', lambda: client.post(reverse('book_rent'), {
+        'student_id': student_id,
+        'title': book['title'],
+        'author': (book.get('author_name') or ['BOOKFLOW'])[0],
+        'page_count': book.get('number_of_pages_median') or 100,
+        'isbn': (book.get('isbn') or ['124567890'])[0],
+        'return_date': return_date.strftime('%B %d, %Y, %I:%M %p'),
+    }))
+    rental = response.context['book_rented'] if response.context else None
+    if rental is None:
+        return
+
+    new_return_date = (return_date + datetime.timedelta(days=14)).strftime('%Y-%m-%d')
+    recorder.request('book_rent_extension', lambda: client.post(reverse('book_rent_extension'), {
+        'rental_id': rental.rental_id,
+        'return_date': new_return_date,
+    }))
+
+
+def run_user(recorder, username, password, titles, flows, seed):
+    rng = random.Random(seed)
+    client = Client()
+    try:
+        student_id = Student.objects.get(username=username).student_id
+        for _ in range(flows):
+            try:
+                run_flow(client, recorder, student_id, username, password, rng.choice(titles))
+            except Exception as exc:
+                print(f"Flow of {username} failed: {exc!r}", file=sys.stderr)
+    finally:
+        connections.close_all()
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """
+    Returns the regressions of ``results`` against ``baseline``: p95 latencies and throughput that
+    got worse by more than ``threshold`` (a fraction).
+    """
+    regressions = []
+    for view in VIEWS:
+        before = baseline['results'].get(view, {}).get('p95_ms')
+        after = results['results'][view]['p95_ms']
+        if before and after > before * (1 + threshold):
+            regressions.append(f"{view} p95 {before} ms -> {after} ms")
+    before = baseline['flows_per_second']
+    after = results['flows_per_second']
+    if before and after < before * (1 - threshold):
+        regressions.append(f"throughput {before} -> {after} flows/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=4, help="Virtual users running at once.")
+    parser.add_argument('--flows', type=int, default=10, help="Flows run by each virtual user.")
+    parser.add_argument('--latency', type=float, default=0.05, help="Stub response delay in seconds.")
+    parser.add_argument('--docs', type=int, default=10, help="Docs in every stub search response.")
+    parser.add_argument('--queries', type=int, default=50, help="Distinct search titles.")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="Write the results to this file instead of printing them.")
+    parser.add_argument('--compare', help="A previous results file to check this run against.")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Regression tolerance for --compare, as a fraction.")
+    args = parser.parse_args()
+
+    setup_test_environment()
+    if connection.vendor == 'sqlite':
+        # The shared in-memory test database locks whole tables against concurrent writers
+        connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.mkdtemp(), 'benchmark.sqlite3')
+    old_name = connection.creation.create_test_db(verbosity=0)
+    if connection.vendor == 'sqlite':
+        use_sqlite_for_concurrent_users()
+    try:
+        with stub_in_subprocess(latency=args.latency, docs=make_docs(args.docs)) as search_url, \
+                override_settings(OPENLIBRARY_SEARCH_URL=search_url, **BENCHMARK_SETTINGS):
+            generator = SyntheticDataGenerator(tag='bench', seed=args.seed)
+            generator.create_students(args.users)
+            titles = [f"Benchmark Title {index}" for index in range(args.queries)]
+
+            recorder = FlowRecorder(window=args.users * args.flows)
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.users) as executor:
+                for index in range(args.users):
+                    executor.submit(run_user, recorder, f'bench-student{index}', generator.password, titles,
+                                    args.flows, args.seed + index)
+            elapsed = time.perf_counter() - started
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    flows = recorder.stats['login'].calls
+    results = {
+        'commit': git_commit(),
+        'args': vars(args),
+        'seconds': round(elapsed, 3),
+        'flows': flows,
+        'flows_per_second': round(flows / elapsed, 2) if elapsed else 0.0,
+        'results': recorder.report(elapsed),
+    }
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output + '\n')
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
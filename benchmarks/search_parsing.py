@@ -0,0 +1,105 @@
+"""
+Compares the old and the slim parsing of OpenLibrary search responses: parse time and peak memory.
+
+The "parse" rows decode a large search response held in memory: the old way with ``json.loads`` on
+the whole body keeping every doc, the slim way incrementally into SearchDocs. The "fetch" rows run
+whole searches against a local stub: the old request without ``fields`` read with
+``response.json()``, and the service's request for the needed fields only, streamed. Peak memory is
+measured with tracemalloc and excludes the payload held by the benchmark itself.
+
+Record a real response with
+``curl 'https://openlibrary.org/search.json?title=the+lord+of+the+rings' -o lotr.json``
+and pass it with ``--payload``, or let the benchmark generate one.
+
+Example Usage:
+    python -m benchmarks.search_parsing --docs 100 --isbns 200
+    python -m benchmarks.search_parsing --payload lotr.json --limit 20
+"""
+import argparse
+import json
+import os
+import time
+import tracemalloc
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Bookflow.settings')
+django.setup()
+
+import requests  # noqa: E402
+
+from services.book_rental_service import OpenLibraryBookRentalService  # noqa: E402
+from services.http_client import PooledHTTPClient  # noqa: E402
+from services.search_cache import SearchResultCache  # noqa: E402
+from services.search_docs import parse_search_response  # noqa: E402
+from test.openlibrary_stub import make_full_docs, stub_in_subprocess  # noqa: E402
+
+
+def measure(function, repeat):
+    """
+    Returns the best wall time of ``repeat`` calls and the peak memory allocated by one call.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - started)
+        del result
+    tracemalloc.start()
+    try:
+        result = function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    del result
+    return best, peak
+
+
+def row(name, seconds, peak, baseline=None):
+    speedup = f"  {baseline[0] / seconds:5.1f}x faster, {baseline[1] / peak:5.1f}x less memory" if baseline else ''
+    print(f"{name:<20} {seconds * 1000:9.2f} ms {peak / 1024:10.0f} KiB{speedup}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--payload', help="A recorded search.json response; generated when not given.")
+    parser.add_argument('--docs', type=int, default=100, help="Docs in the generated payload.")
+    parser.add_argument('--isbns', type=int, default=200, help="ISBNs of every generated doc.")
+    parser.add_argument('--limit', type=int, default=20, help="Docs kept by the slim parser.")
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.payload:
+        with open(args.payload, 'rb') as file:
+            body = file.read()
+        docs = json.loads(body)['docs']
+    else:
+        docs = make_full_docs(args.docs, isbns=args.isbns)
+        body = json.dumps({'numFound': len(docs), 'start': 0, 'docs': docs}).encode('utf-8')
+    chunk_size = OpenLibraryBookRentalService.RESPONSE_CHUNK_SIZE
+    print(f"Payload: {len(docs)} docs, {len(body) / 1024:.0f} KiB")
+
+    old = measure(lambda: json.loads(body.decode('utf-8'))['docs'], args.repeat)
+    row('parse old', *old)
+    row('parse slim', *measure(lambda: parse_search_response(
+        (body[start:start + chunk_size] for start in range(0, len(body), chunk_size)), limit=args.limit),
+        args.repeat), baseline=old)
+
+    with stub_in_subprocess(docs=docs) as search_url:
+        session = requests.Session()
+        http_client = PooledHTTPClient()
+        service = OpenLibraryBookRentalService(search_cache=SearchResultCache(), http_client=http_client,
+                                               api_base_url=search_url, search_limit=args.limit)
+        try:
+            old = measure(lambda: session.get(search_url, params={'title': 'benchmark'}).json()['docs'],
+                          args.repeat)
+            row('fetch old', *old)
+            row('fetch slim', *measure(lambda: service._fetch_search_results('benchmark'), args.repeat),
+                baseline=old)
+        finally:
+            session.close()
+            http_client.close()
+
+
+if __name__ == '__main__':
+    main()
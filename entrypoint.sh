@@ -1,16 +1,8 @@
 #!/usr/bin/env bash
+set -e
 
-# Collect static files
-python manage.py collectstatic --noinput
+# Collect static files, migrate and seed; each step is skipped when nothing it depends on changed
+python manage.py startup
 
-# Apply database migrations
-python manage.py migrate --noinput
-
-# Seed database
-python manage.py shell -c "from seed import seed_students; seed_students.create_staff_students(); seed_students.create_students()"
-
-# test
-python manage.py test
-
-# Start Gunicorn server
-gunicorn -b :8000 Bookflow.wsgi
+# Serve with the settings of Bookflow/gunicorn_conf.py; the test suite is not run on boot
+exec gunicorn -c Bookflow/gunicorn_conf.py Bookflow.asgi
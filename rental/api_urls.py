@@ -0,0 +1,16 @@
+from django.urls import path
+
+from rental.api_views import AutocompleteView, SearchView, RentalListView, BulkRentView, ExtendRentalsView, RentalExtensionView, \
+    RentalReturnView
+
+app_name = 'api_v1'
+
+urlpatterns = [
+    path('search/', SearchView.as_view(), name='search'),
+    path('autocomplete/', AutocompleteView.as_view(), name='autocomplete'),
+    path('rentals/', RentalListView.as_view(), name='rentals'),
+    path('rentals/bulk/', BulkRentView.as_view(), name='rentals_bulk'),
+    path('rentals/extend/', ExtendRentalsView.as_view(), name='rentals_extend'),
+    path('rentals/<uuid:rental_id>/extend/', RentalExtensionView.as_view(), name='rental_extend'),
+    path('rentals/<uuid:rental_id>/return/', RentalReturnView.as_view(), name='rental_return'),
+]
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import uuid
+
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import Http404
+from rest_framework import status
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from rental.models import Book, Rental
+from rental.pagination import KeysetCursorPagination
+from rental.serializers import BulkRentSerializer, ExtendedRentalSerializer, ExtendRentalsSerializer, \
+    RentalExtensionSerializer, RentalSerializer, RentSerializer, SearchResultSerializer, SuggestionSerializer
+from rental.utils import active_rentals_filter
+from rental.views import RentedBooksPageMixin, not_modified, tag_response
+from services.autocomplete import get_book_autocomplete
+from services.book_rental_service import OpenLibraryBookRentalService
+from services.panel_cache import get_panel_cache
+from student.models import Student
+
+
+def get_student_id(request, student_id=None):
+    """
+    Returns the student a request acts for: the signed in one, or any student for staff.
+
+    Raises:
+        ValidationError: When the student id is not a UUID or there is no such student.
+        PermissionDenied: When a student other than the signed in one is asked for by non-staff.
+    """
+    if isinstance(student_id, str):
+        try:
+            student_id = uuid.UUID(student_id)
+        except ValueError:
+            raise ValidationError({'student_id': ["Must be a valid UUID."]})
+    if student_id is None or student_id == request.user.pk:
+        return request.user.pk
+    if not request.user.is_staff:
+        raise PermissionDenied("Only staff can act for other students.")
+    if not Student.objects.filter(pk=student_id).exists():
+        raise ValidationError({'student_id': ["No such student."]})
+    return student_id
+
+
+def with_book_titles(rentals):
+    """
+    Loads the titles of the books of newly written rentals with one query.
+    """
+    prefetch_related_objects(rentals, Prefetch('book_id', queryset=Book.objects.only('book_id', 'title')))
+    return rentals
+
+
+class SearchView(APIView):
+    """
+    Searches the catalogue and OpenLibrary for the title given as ``q``.
+
+    The ETag is a hash of the response: a matching ``If-None-Match`` only saves sending the body,
+    since the search runs in full to compute it. ``degraded`` is true when OpenLibrary could not be
+    searched and only local or cached results are returned.
+    """
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({'q': ["This query parameter is required."]})
+        results = OpenLibraryBookRentalService().search_book(query)
+        data = {'results': SearchResultSerializer(results, many=True).data,
+                'degraded': getattr(results, 'degraded', False)}
+        raw = json.dumps(data, sort_keys=True, separators=(',', ':'))
+        etag = f'"{hashlib.sha1(raw.encode("utf-8")).hexdigest()}"'
+        return not_modified(request, etag) or tag_response(Response(data), etag)
+
+
+class AutocompleteView(APIView):
+    """
+    Suggests catalogue books whose title or author has a word starting with ``q``.
+
+    Answered from the in-memory index of the worker, without a database query or an OpenLibrary
+    search, so it can be called on every keystroke. ``limit`` caps the suggestions at 20.
+    """
+    MAX_LIMIT = 20
+
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        try:
+            limit = min(int(request.query_params.get('limit', 0)), self.MAX_LIMIT)
+        except ValueError:
+            raise ValidationError({'limit': ["A valid integer is required."]})
+        suggestions = get_book_autocomplete().suggest(query, limit=limit if limit > 0 else None)
+        response = Response({'results': SuggestionSerializer(suggestions, many=True).data})
+        response['Cache-Control'] = 'private, max-age=60'
+        return response
+
+
+class RentalListView(APIView):
+    """
+    Lists the rentals of a student newest first, or rents one book.
+
+    GET reads the ``student_id`` (staff only), ``active``, ``cursor`` and ``page_size`` query
+    parameters. Its ETag follows the rental summary version of the student, so a conditional GET
+    of an unchanged listing is answered with a 304 after one lookup by primary key.
+    """
+    pagination_class = KeysetCursorPagination
+    ordering = ('-created', '-rental_id')
+
+    def get(self, request):
+        student_id = get_student_id(request, request.query_params.get('student_id'))
+        active = request.query_params.get('active') == '1'
+        paginator = self.pagination_class()
+
+        summary = RentedBooksPageMixin.get_rental_summary(student_id)
+        panel_cache = get_panel_cache()
+        key = panel_cache.make_key(summary.pk, summary.version, active=active,
+                                   cursor=request.query_params.get('cursor'))
+        etag = panel_cache.make_etag(key, 'api:v1:rentals', paginator.get_page_size(request))
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+
+        rentals = (Rental.objects.select_related('book_id').filter(student_id_id=student_id)
+                   .only(*RentalSerializer.ONLY_FIELDS))
+        if active:
+            rentals = rentals.filter(active_rentals_filter())
+        page = paginator.paginate_queryset(rentals, request, view=self)
+        return tag_response(paginator.get_paginated_response(RentalSerializer(page, many=True).data), etag)
+
+    def post(self, request):
+        serializer = RentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        rental = OpenLibraryBookRentalService().rent_book(
+            student_id=get_student_id(request, data.get('student_id')), title=data['title'], author=data['author'],
+            page_count=data['page_count'], isbn=data['isbn'], return_date=data['return_date'])
+        return Response(RentalSerializer(with_book_titles([rental])[0]).data, status=status.HTTP_201_CREATED)
+
+
+class BulkRentView(APIView):
+    """
+    Rents many books to one student in one transaction.
+    """
+
+    def post(self, request):
+        serializer = BulkRentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        rentals = OpenLibraryBookRentalService().rent_books_bulk(
+            student_id=get_student_id(request, data.get('student_id')), books=data['books'],
+            return_date=data['return_date'])
+        return Response({'results': RentalSerializer(with_book_titles(rentals), many=True).data},
+                        status=status.HTTP_201_CREATED)
+
+
+class ExtendRentalsView(APIView):
+    """
+    Extends the rentals of the signed in student that are not due yet by a number of days, in one
+    transaction.
+    """
+
+    def post(self, request):
+        serializer = ExtendRentalsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        rentals = OpenLibraryBookRentalService().extend_rentals(request.user.pk, **serializer.validated_data)
+        return Response({'results': ExtendedRentalSerializer(rentals, many=True).data})
+
+
+class RentalExtensionView(APIView):
+    """
+    Moves the return date of one rental of the signed in student; staff can extend any rental.
+    """
+
+    def post(self, request, rental_id):
+        serializer = RentalExtensionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        rentals = Rental.objects.filter(rental_id=rental_id)
+        if not request.user.is_staff:
+            rentals = rentals.filter(student_id=request.user)
+        if not rentals.exists():
+            raise Http404("No such rental.")
+        rental = OpenLibraryBookRentalService().rent_extension(rental_id,
+                                                               serializer.validated_data['return_date'].isoformat())
+        return Response(ExtendedRentalSerializer(rental).data)
+
+
+class RentalReturnView(APIView):
+    """
+    Marks one rental as returned; only staff take books back.
+    """
+
+    def post(self, request, rental_id):
+        if not request.user.is_staff:
+            raise PermissionDenied("Only staff can return rentals.")
+        rentals = Rental.objects.filter(rental_id=rental_id)
+        if not rentals.exists():
+            raise Http404("No such rental.")
+        OpenLibraryBookRentalService().return_rentals(rentals)
+        rental = rentals.select_related('book_id').only(*RentalSerializer.ONLY_FIELDS).get()
+        return Response(RentalSerializer(rental).data)
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class RentalConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'rental'
+
+    def ready(self):
+        # Registers the query timer on every database connection
+        import services.metrics  # noqa: F401
+        # Creates the rental summary of every new student
+        import services.rental_summary  # noqa: F401
@@ -0,0 +1,39 @@
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import REDIRECT_FIELD_NAME
+from django.contrib.auth.views import redirect_to_login
+from django.shortcuts import resolve_url
+
+
+def async_user_passes_test(test_func, login_url=None, redirect_field_name=REDIRECT_FIELD_NAME):
+    """
+    Async counterpart of ``user_passes_test`` for the methods of async class-based views.
+
+    The user is loaded with ``request.auser()`` and stored on ``request.user`` so templates can
+    read it without a synchronous database query.
+
+    Args:
+        test_func (callable): Receives the user and returns True when access is allowed.
+        login_url (str): Where to redirect failing users. Defaults to ``settings.LOGIN_URL``.
+        redirect_field_name (str): The query parameter holding the original URL.
+    """
+
+    def decorator(view_method):
+        @wraps(view_method)
+        async def _wrapped_view(view, request, *args, **kwargs):
+            user = await request.auser()
+            request.user = user
+            if test_func(user):
+                return await view_method(view, request, *args, **kwargs)
+            return redirect_to_login(request.get_full_path(), resolve_url(login_url or settings.LOGIN_URL),
+                                     redirect_field_name)
+
+        return _wrapped_view
+
+    return decorator
+
+
+async_login_required = async_user_passes_test(lambda user: user.is_authenticated)
+async_staff_member_required = async_user_passes_test(lambda user: user.is_active and user.is_staff,
+                                                     login_url='login')
@@ -1,10 +1,19 @@
+import csv
 import datetime
 
 from django import forms
+from django.urls import reverse_lazy
+
+from student.models import Student
 
 
 class BookSearchForm(forms.Form):
-    search_query = forms.CharField(label='Search for a book', widget=forms.TextInput(attrs={'class': 'form-control'}))
+    """
+    Searches for a book; the text box suggests catalogue books while typing, see book_autocomplete.html.
+    """
+    search_query = forms.CharField(label='Search for a book', widget=forms.TextInput(attrs={
+        'class': 'form-control', 'list': 'book-suggestions', 'autocomplete': 'off',
+        'data-autocomplete-url': reverse_lazy('api_v1:autocomplete')}))
 
 
 class BookRentalForm(forms.Form):
@@ -23,11 +32,94 @@ class BookRentalForm(forms.Form):
             self.fields['student_id'] = forms.CharField(label='Student ID', max_length=10, initial=user_id)
 
 
+class BulkBookRentalForm(forms.Form):
+    """
+    Rents a class set of books to one student.
+
+    Books are entered one per line as ``ISBN, Title, Author, Page Count``; the whole batch is
+    validated before anything is rented.
+    """
+    MAX_BOOKS = 500
+
+    student_id = forms.UUIDField(label='Student ID')
+    return_date = forms.CharField(label='Return Date',
+                                  initial=(datetime.datetime.today() + datetime.timedelta(days=30)
+                                           ).strftime('%B %d, %Y, %I:%M %p'))
+    books = forms.CharField(label='Books (ISBN, Title, Author, Page Count per line)',
+                            widget=forms.Textarea(attrs={'rows': 15, 'cols': 80}))
+
+    def clean_student_id(self):
+        student_id = self.cleaned_data['student_id']
+        if not Student.objects.filter(student_id=student_id).exists():
+            raise forms.ValidationError('No student with this ID.')
+        return student_id
+
+    def clean_return_date(self):
+        return_date = self.cleaned_data['return_date']
+        try:
+            datetime.datetime.strptime(return_date, '%B %d, %Y, %I:%M %p')
+        except ValueError:
+            raise forms.ValidationError('Use the format "Month day, Year, Hour:Minute AM/PM".')
+        return return_date
+
+    def clean_books(self):
+        lines = [line for line in self.cleaned_data['books'].splitlines() if line.strip()]
+        if len(lines) > self.MAX_BOOKS:
+            raise forms.ValidationError(f'At most {self.MAX_BOOKS} books can be rented at once.')
+
+        books, errors = [], []
+        for line_number, row in enumerate(csv.reader(lines, skipinitialspace=True), start=1):
+            if len(row) != 4:
+                errors.append(f'Line {line_number}: expected ISBN, Title, Author, Page Count.')
+                continue
+            isbn, title, author, page_count = (value.strip() for value in row)
+            if not title:
+                errors.append(f'Line {line_number}: the title is required.')
+            if len(isbn) > 13:
+                errors.append(f'Line {line_number}: the ISBN has more than 13 characters.')
+            if not page_count.isdigit() or int(page_count) < 1:
+                errors.append(f'Line {line_number}: the page count must be a positive number.')
+                continue
+            books.append({'isbn': isbn, 'title': title[:250], 'author': author[:250], 'page_count': int(page_count)})
+        if errors:
+            raise forms.ValidationError(errors)
+        if not books:
+            raise forms.ValidationError('Enter at least one book.')
+        return books
+
+
 class BookRentalExtensionForm(forms.Form):
     rental_id = forms.CharField(label='Student ID', max_length=250)
     return_date = forms.CharField(label='Return Date')
 
 
+class BulkRentalExtensionForm(forms.Form):
+    """
+    Extends every active rental of the signed in student by the same number of days.
+    """
+    days = forms.IntegerField(label='Days', min_value=1, max_value=90, initial=14)
+
+
+class RentalExportForm(forms.Form):
+    """
+    Filters the rentals exported by staff; every filter is optional.
+
+    The date range applies to the day the rentals were made, both days included.
+    """
+    format = forms.ChoiceField(choices=(('csv', 'CSV'), ('jsonl', 'JSON lines')), required=False)
+    student_id = forms.UUIDField(label='Student ID', required=False)
+    created_from = forms.DateField(label='Rented from', required=False)
+    created_to = forms.DateField(label='Rented until', required=False)
+    overdue = forms.BooleanField(label='Only overdue rentals', required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        created_from, created_to = cleaned_data.get('created_from'), cleaned_data.get('created_to')
+        if created_from and created_to and created_from > created_to:
+            raise forms.ValidationError('The start date must not be after the end date.')
+        return cleaned_data
+
+
 class LoginForm(forms.Form):
     username = forms.CharField(label='Username', max_length=250)
     password = forms.CharField(label='Password', widget=forms.PasswordInput)
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from services.load_data import SyntheticDataGenerator
+
+
+class Command(BaseCommand):
+    help = "Generates students, books and rentals for load and scale testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=10000, help="Number of students to create.")
+        parser.add_argument('--books', type=int, default=50000, help="Number of books to create.")
+        parser.add_argument('--rentals', type=int, default=1000000, help="Number of rentals to create.")
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help="Number of rows built and inserted per transaction.")
+        parser.add_argument('--tag', help="Prefix of the generated usernames; random by default.")
+        parser.add_argument('--password', default='password', help="Password of every generated student.")
+        parser.add_argument('--seed', type=int, help="Random seed, for repeatable data.")
+
+    def handle(self, *args, **options):
+        generator = SyntheticDataGenerator(chunk_size=options['chunk_size'], tag=options['tag'],
+                                           password=options['password'], seed=options['seed'])
+
+        started = time.perf_counter()
+        result = generator.generate(students=options['students'], books=options['books'],
+                                    rentals=options['rentals'])
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result.students} students, {result.books} books and {result.rentals} rentals "
+            f"in {elapsed:.1f}s (tag {generator.tag!r})."
+        ))
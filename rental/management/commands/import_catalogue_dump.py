@@ -0,0 +1,41 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from services.catalogue_import import EDITION_TYPE, WORK_TYPE, CatalogueDumpImporter
+
+
+class Command(BaseCommand):
+    help = "Imports the books of an OpenLibrary editions or works dump into the catalogue, resuming where it stopped."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="The dump file: gzipped or plain, tab separated or JSON lines.")
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help="Number of lines parsed and written per transaction.")
+        # One core is left to this process, which writes the parsed batches
+        parser.add_argument('--workers', type=int, default=max(0, min(4, (os.cpu_count() or 1) - 1)),
+                            help="Number of parsing processes; 0 parses in this process.")
+        parser.add_argument('--type', action='append', dest='types', choices=[EDITION_TYPE, WORK_TYPE],
+                            help=f"Record type to import; can be repeated. Defaults to {EDITION_TYPE}.")
+        parser.add_argument('--update-existing', action='store_true',
+                            help="Overwrite books already in the catalogue instead of leaving them alone.")
+        parser.add_argument('--restart', action='store_true',
+                            help="Ignore the checkpoint of an interrupted import and start over.")
+        parser.add_argument('--max-lines', type=int,
+                            help="Stop after about this many lines; the next run resumes after them.")
+
+    def handle(self, *args, **options):
+        importer = CatalogueDumpImporter(batch_size=options['batch_size'], workers=options['workers'],
+                                         types=options['types'] or [EDITION_TYPE],
+                                         update_existing=options['update_existing'])
+
+        started = time.perf_counter()
+        result = importer.run(options['path'], restart=options['restart'], max_lines=options['max_lines'])
+        elapsed = time.perf_counter() - started
+
+        resumed = f" from byte {result.resumed_from}" if result.resumed_from else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"Read {result.lines} lines{resumed} in {elapsed:.1f}s ({result.lines / max(elapsed, 1e-9):.0f} lines/s): "
+            f"{result.books} books written, {result.skipped} lines skipped, stopped at byte {result.offset}."
+        ))
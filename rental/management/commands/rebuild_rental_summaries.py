@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from services.rental_summary import rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = "Checks the rental summary of every student against their rentals and rewrites the wrong ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true',
+                            help="Only report the mismatched summaries; exits with status 1 if there are any.")
+        parser.add_argument('--student', action='append', dest='student_ids', metavar='STUDENT_ID',
+                            help="Only check this student_id; can be repeated.")
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Number of students checked per transaction.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        result = rebuild_summaries(student_ids=options['student_ids'], batch_size=options['batch_size'],
+                                   verify_only=options['verify'])
+        elapsed = time.perf_counter() - started
+
+        message = (f"Checked {result.checked} rental summaries in {elapsed:.1f}s: "
+                   f"{result.mismatched} mismatched, {result.fixed} fixed.")
+        if options['verify'] and result.mismatched:
+            self.stderr.write(self.style.ERROR(message))
+            raise SystemExit(1)
+        self.stdout.write(self.style.SUCCESS(message))
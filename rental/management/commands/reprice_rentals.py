@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from rental.models import Rental
+from services.book_rental_service import OpenLibraryBookRentalService
+from services.pricing import BulkFeeEngine
+
+
+class Command(BaseCommand):
+    help = "Recomputes the fee of every rental with the current pricing policy."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=20000,
+                            help="Number of rentals read and priced at a time.")
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Number of rentals written per UPDATE statement.")
+        parser.add_argument('--student', help="Only reprice the rentals of this student_id.")
+        parser.add_argument('--dry-run', action='store_true', help="Report the changes without saving them.")
+
+    def handle(self, *args, **options):
+        engine = BulkFeeEngine(cost_per_page=OpenLibraryBookRentalService.COST_PER_PAGE,
+                               chunk_size=options['chunk_size'], write_batch_size=options['batch_size'])
+        queryset = Rental.objects.all()
+        if options['student']:
+            queryset = queryset.filter(student_id_id=options['student'])
+
+        started = time.perf_counter()
+        result = engine.reprice(queryset, dry_run=options['dry_run'])
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Scanned {result.scanned} rentals in {elapsed:.1f}s "
+            f"({result.scanned / elapsed if elapsed else 0:.0f}/s): "
+            f"{result.changed} changed, {result.updated} updated."
+        ))
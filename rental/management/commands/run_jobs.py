@@ -0,0 +1,46 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from services.jobs import get_job_runner
+from services.overdue_fees import get_overdue_fee_accrual
+
+
+class Command(BaseCommand):
+    help = ("Runs the periodic jobs, such as the overdue fee accrual, in a loop. "
+            "SIGTERM or Ctrl-C stops it at the next checkpoint.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Run the due jobs once and exit.")
+        parser.add_argument('--job', action='append', dest='names', metavar='NAME',
+                            help="Only run this job; can be repeated.")
+        parser.add_argument('--force', action='store_true',
+                            help="With --once, start the jobs even if their interval has not passed.")
+
+    def get_jobs(self):
+        return [get_overdue_fee_accrual()]
+
+    def handle(self, *args, **options):
+        jobs = self.get_jobs()
+        if options['names']:
+            unknown = set(options['names']) - {job.name for job in jobs}
+            if unknown:
+                raise CommandError(f"Unknown job(s): {', '.join(sorted(unknown))}")
+            jobs = [job for job in jobs if job.name in options['names']]
+        runner = get_job_runner(jobs)
+
+        def stop(signum, frame):
+            self.stdout.write("Stopping at the next checkpoint...")
+            runner.stop()
+
+        previous = {signum: signal.signal(signum, stop) for signum in (signal.SIGTERM, signal.SIGINT)}
+        try:
+            if options['once']:
+                finished = [job.name for job in jobs if runner.run(job, force=options['force'])]
+                self.stdout.write(self.style.SUCCESS(f"Finished: {', '.join(finished) or 'nothing due'}."))
+            else:
+                runner.run_forever(poll_interval=getattr(settings, 'JOB_RUNNER', {}).get('POLL_INTERVAL', 30))
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
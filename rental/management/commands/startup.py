@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from services.startup import default_steps, run_startup
+
+
+class Command(BaseCommand):
+    help = ("Prepares the app for serving: collects static files, migrates and seeds, skipping every "
+            "step whose inputs did not change since it last ran.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='append', default=[], metavar='STEP',
+                            help="Run this step even if it is current; can be repeated.")
+
+    def handle(self, *args, **options):
+        steps = default_steps()
+        unknown = set(options['force']) - {step.name for step in steps}
+        if unknown:
+            raise CommandError(f"Unknown step(s): {', '.join(sorted(unknown))}")
+
+        results = run_startup(steps, force=options['force'])
+        summary = ', '.join(f"{result.name} {'ran' if result.ran else 'skipped'} ({result.seconds:.2f}s)"
+                            for result in results)
+        self.stdout.write(self.style.SUCCESS(f"Startup: {summary}."))
@@ -0,0 +1,54 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from services.metrics import get_metrics_registry, server_timing_enabled, start_request_timings, \
+    stop_request_timings
+
+
+class RequestMetricsMiddleware:
+    """
+    Records the wall, database, OpenLibrary and render time of every request per view name.
+
+    The timings are added to the response as a ``Server-Timing`` header, unless
+    ``REQUEST_METRICS['SERVER_TIMING']`` is False, and aggregated in the process metrics registry
+    served by the metrics view. Put it first in MIDDLEWARE so the other middleware is timed too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.registry = get_metrics_registry()
+        self.server_timing = server_timing_enabled()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        timings, token = start_request_timings()
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_request_timings(token)
+        return self.finish(request, response, timings, started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        timings, token = start_request_timings()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stop_request_timings(token)
+        return self.finish(request, response, timings, started)
+
+    def finish(self, request, response, timings, started):
+        total_seconds = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match is not None else 'unresolved'
+        self.registry.observe(view, response.status_code, total_seconds, timings)
+        if self.server_timing:
+            response['Server-Timing'] = timings.server_timing(total_seconds)
+        return response
@@ -0,0 +1,79 @@
+import re
+from collections import defaultdict
+
+from django.db import migrations, models
+
+# A frozen copy of the catalogue key rules in rental.utils at the time of this migration, so later
+# changes to them cannot change what this migration does.
+ISBN_CHARACTERS = re.compile(r'[^0-9X]')
+NON_WORD = re.compile(r'[\W_]+')
+BATCH_SIZE = 1000
+
+
+def normalise_isbn(isbn):
+    if not isbn:
+        return None
+    cleaned = ISBN_CHARACTERS.sub('', str(isbn).upper())
+    if len(cleaned) == 10 and cleaned[:9].isdigit():
+        body = '978' + cleaned[:9]
+        total = sum(int(digit) * (1 if index % 2 == 0 else 3) for index, digit in enumerate(body))
+        return body + str((10 - total % 10) % 10)
+    if len(cleaned) == 13 and cleaned.isdigit():
+        return cleaned
+    return None
+
+
+def normalise_text(value):
+    return NON_WORD.sub(' ', str(value or '')).strip().casefold()
+
+
+def make_catalogue_key(isbn, title, author):
+    normalised_isbn = normalise_isbn(isbn)
+    if normalised_isbn:
+        return f"isbn:{normalised_isbn}"
+    title, author = normalise_text(title), normalise_text(author)
+    if not title:
+        return None
+    return f"title:{title[:255]}|{author[:255]}"
+
+
+def merge_duplicate_books(apps, schema_editor):
+    """
+    Collapses books that share a catalogue key into the oldest of them.
+
+    Rentals of the duplicates are re-pointed to the surviving book, the duplicates are deleted and
+    every book gets its catalogue key.
+    """
+    Book = apps.get_model('rental', 'Book')
+    Rental = apps.get_model('rental', 'Rental')
+    groups = defaultdict(list)
+    books = Book.objects.order_by('created', 'book_id').values_list('book_id', 'isbn', 'title', 'author')
+    for book_id, isbn, title, author in books.iterator(chunk_size=BATCH_SIZE):
+        groups[make_catalogue_key(isbn, title, author)].append(book_id)
+
+    keyed_books = []
+    for key, book_ids in groups.items():
+        if key is None:
+            continue
+        survivor, duplicates = book_ids[0], book_ids[1:]
+        if duplicates:
+            Rental.objects.filter(book_id__in=duplicates).update(book_id=survivor)
+            Book.objects.filter(book_id__in=duplicates).delete()
+        keyed_books.append(Book(book_id=survivor, catalogue_key=key))
+    Book.objects.bulk_update(keyed_books, ['catalogue_key'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='catalogue_key',
+            field=models.CharField(blank=True, editable=False, max_length=520, null=True),
+        ),
+        migrations.RunPython(merge_duplicate_books, migrations.RunPython.noop),
+    ]
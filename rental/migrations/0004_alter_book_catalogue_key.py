@@ -0,0 +1,18 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Kept apart from 0003 so PostgreSQL has no pending FK trigger events from the merge
+    # when the unique index is built.
+
+    dependencies = [
+        ('rental', '0003_book_catalogue_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='book',
+            name='catalogue_key',
+            field=models.CharField(blank=True, editable=False, max_length=520, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.14 on 2026-10-18 19:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0004_alter_book_catalogue_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(fields=['student_id', '-created', '-rental_id'], name='rental_student_created_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+from django.db import migrations
+
+# The DDL is frozen here rather than built from services.local_search, so later changes to the
+# service cannot change what this migration does. The PostgreSQL index expression must stay equal
+# to the SearchVector('title', 'author', config='simple') the search queries, or it is not used.
+FORWARD_SQL = {
+    'postgresql': [
+        'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+        'CREATE INDEX "book_search_vector_idx" ON "Book" USING gin '
+        '((to_tsvector(\'simple\'::regconfig, COALESCE("title", \'\') || \' \' || COALESCE("author", \'\'))))',
+    ],
+    # An external content FTS5 table kept in sync with the Book table by triggers
+    'sqlite': [
+        'CREATE VIRTUAL TABLE book_fts USING fts5(title, author, isbn, content="Book", content_rowid=rowid)',
+        'CREATE TRIGGER book_fts_ai AFTER INSERT ON "Book" BEGIN '
+        'INSERT INTO book_fts(rowid, title, author, isbn) VALUES (new.rowid, new.title, new.author, new.isbn); END',
+        'CREATE TRIGGER book_fts_ad AFTER DELETE ON "Book" BEGIN '
+        'INSERT INTO book_fts(book_fts, rowid, title, author, isbn) '
+        "VALUES ('delete', old.rowid, old.title, old.author, old.isbn); END",
+        'CREATE TRIGGER book_fts_au AFTER UPDATE ON "Book" BEGIN '
+        'INSERT INTO book_fts(book_fts, rowid, title, author, isbn) '
+        "VALUES ('delete', old.rowid, old.title, old.author, old.isbn); "
+        'INSERT INTO book_fts(rowid, title, author, isbn) VALUES (new.rowid, new.title, new.author, new.isbn); END',
+        "INSERT INTO book_fts(book_fts) VALUES ('rebuild')",
+    ],
+}
+REVERSE_SQL = {
+    'postgresql': ['DROP INDEX IF EXISTS book_search_vector_idx'],
+    'sqlite': [
+        'DROP TRIGGER IF EXISTS book_fts_ai',
+        'DROP TRIGGER IF EXISTS book_fts_ad',
+        'DROP TRIGGER IF EXISTS book_fts_au',
+        'DROP TABLE IF EXISTS book_fts',
+    ],
+}
+
+
+def run_sql_for_vendor(statements):
+    # Other databases get no index and fall back to icontains lookups
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0005_rental_student_created_idx'),
+    ]
+
+    operations = [
+        # PostgreSQL full-text index, or an FTS5 table on SQLite
+        migrations.RunPython(run_sql_for_vendor(FORWARD_SQL), run_sql_for_vendor(REVERSE_SQL)),
+    ]
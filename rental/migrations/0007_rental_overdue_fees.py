@@ -0,0 +1,61 @@
+# Generated by Django 5.0.14 on 2026-10-18 19:50
+
+import django_extensions.db.fields
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def mark_past_rentals_returned(apps, schema_editor):
+    # Rentals were considered over once their return date passed; keep them out of the overdue scan
+    Rental = apps.get_model('rental', 'Rental')
+    Rental.objects.filter(return_date__lt=timezone.now()).update(returned_at=F('return_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0006_book_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobState',
+            fields=[
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('run_started_at', models.DateTimeField(blank=True, null=True)),
+                ('cursor', models.TextField(blank=True, null=True)),
+                ('last_finished_at', models.DateTimeField(blank=True, null=True)),
+                ('lease_until', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Job state',
+                'verbose_name_plural': 'Job states',
+                'db_table': 'JobState',
+            },
+        ),
+        migrations.AddField(
+            model_name='rental',
+            name='overdue_days',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='rental',
+            name='overdue_fee',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=200),
+        ),
+        migrations.AddField(
+            model_name='rental',
+            name='returned_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(mark_past_rentals_returned, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(condition=models.Q(('returned_at__isnull', True)), fields=['return_date', 'rental_id'], name='rental_unreturned_due_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.0.14 on 2026-10-18 19:54
+
+import django.db.models.deletion
+from django.conf import settings
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_summaries(apps, schema_editor):
+    Rental = apps.get_model('rental', 'Rental')
+    StudentRentalSummary = apps.get_model('rental', 'StudentRentalSummary')
+    Student = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    rows = (Rental.objects.filter(student_id__isnull=False).order_by().values('student_id')
+            .annotate(active_rentals=Count('pk', filter=Q(returned_at__isnull=True)), total_rentals=Count('pk'),
+                      outstanding_fees=Sum(Coalesce('fee_amount', Value(Decimal(0))) + F('overdue_fee'),
+                                           output_field=DecimalField()),
+                      last_rented_at=Max('created')))
+    summaries = {row.pop('student_id'): row for row in rows.iterator(chunk_size=2000)}
+    StudentRentalSummary.objects.bulk_create(
+        (StudentRentalSummary(student_id_id=pk, **summaries.get(pk, {}))
+         for pk in Student.objects.values_list('pk', flat=True).iterator(chunk_size=2000)),
+        batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0007_rental_overdue_fees'),
+        ('student', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentRentalSummary',
+            fields=[
+                ('student_id', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rental_summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('active_rentals', models.PositiveIntegerField(default=0)),
+                ('total_rentals', models.PositiveIntegerField(default=0)),
+                ('outstanding_fees', models.DecimalField(decimal_places=2, default=0, max_digits=200)),
+                ('last_rented_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Student rental summary',
+                'verbose_name_plural': 'Student rental summaries',
+                'db_table': 'StudentRentalSummary',
+            },
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-18 20:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0008_student_rental_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentrentalsummary',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0009_rental_summary_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['modified'], name='book_modified_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(fields=['created'], name='rental_created_idx'),
+        ),
+    ]
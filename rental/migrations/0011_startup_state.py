@@ -0,0 +1,40 @@
+# Generated by Django 5.0.14 on 2026-10-18 21:35
+
+import django_extensions.db.fields
+from django.db import migrations, models
+
+
+def move_seed_fingerprint(apps, schema_editor):
+    # The seed step used to keep its fingerprint in the cursor of a JobState row
+    JobState = apps.get_model('rental', 'JobState')
+    StartupState = apps.get_model('rental', 'StartupState')
+    state = JobState.objects.filter(name='startup:seed').first()
+    if state is not None:
+        if state.cursor:
+            StartupState.objects.create(name='seed', fingerprint=state.cursor)
+        state.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0010_book_modified_idx_rental_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StartupState',
+            fields=[
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('fingerprint', models.CharField(max_length=64)),
+            ],
+            options={
+                'verbose_name': 'Startup state',
+                'verbose_name_plural': 'Startup states',
+                'db_table': 'StartupState',
+            },
+        ),
+        migrations.RunPython(move_seed_fingerprint, migrations.RunPython.noop),
+    ]
@@ -3,6 +3,7 @@ import uuid
 from django.db import models
 from django_extensions.db.models import TimeStampedModel
 
+from rental.utils import make_catalogue_key
 from student.models import Student
 
 
@@ -16,15 +17,19 @@ class Book(TimeStampedModel, models.Model):
         author (CharField): Author of the book.
         page_count (PositiveIntegerField): Number of pages in the book.
         isbn (CharField): ISBN (International Standard Book Number) of the book.
+        catalogue_key (CharField): Unique key of the book: its normalised ISBN-13, or its
+            normalised title and author when it has no valid ISBN.
         available_copies (PositiveIntegerField): Number of available copies of the book.
 
     Methods:
         __str__: Returns a human-readable representation of the book.
+        save: Fills in the catalogue key before saving.
 
     Meta:
         db_table (str): Specifies the database table name for the model.
         verbose_name (str): Human-readable name for a single instance of the model.
         verbose_name_plural (str): Human-readable name for the model in plural form.
+        indexes (list): Serves the incremental refresh of the autocomplete index from ``modified``.
     """
 
     book_id = models.UUIDField(primary_key=True,
@@ -41,6 +46,16 @@ class Book(TimeStampedModel, models.Model):
     isbn = models.CharField(max_length=13,
                             blank=True,
                             null=True)
+    catalogue_key = models.CharField(max_length=520,
+                                     unique=True,
+                                     blank=True,
+                                     null=True,
+                                     editable=False)
+
+    def save(self, *args, **kwargs):
+        if self.catalogue_key is None:
+            self.catalogue_key = make_catalogue_key(isbn=self.isbn, title=self.title, author=self.author)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         """
@@ -56,6 +71,9 @@ class Book(TimeStampedModel, models.Model):
         db_table = "Book"
         verbose_name = "Book"
         verbose_name_plural = "Books"
+        indexes = [
+            models.Index(fields=['modified'], name='book_modified_idx'),
+        ]
 
 
 class Rental(TimeStampedModel, models.Model):
@@ -66,12 +84,18 @@ class Rental(TimeStampedModel, models.Model):
         rental_id (UUIDField): Unique identifier for the rental.
         student_id (ForeignKey): Foreign key to the associated student.
         book_id (ForeignKey): Foreign key to the associated book.
-        return_date (DateTimeField): Date and time when the book is returned.
+        return_date (DateTimeField): Date and time when the book is due back.
+        fee_amount (DecimalField): The rental fee, priced when the book is rented or the rental extended.
+        returned_at (DateTimeField): When the book came back; null while it is still out.
+        overdue_days (PositiveIntegerField): The full days late the overdue fee has been accrued for.
+        overdue_fee (DecimalField): The late fee accrued by the ``accrue_overdue_fees`` job.
 
     Meta:
         db_table (str): Specifies the database table name for the model.
         verbose_name (str): Human-readable name for a single instance of the model.
         verbose_name_plural (str): Human-readable name for the model in plural form.
+        indexes (list): Serves the newest-first, keyset paginated rentals of a student, the scan of
+            unreturned rentals by due date, and the rentals created since a point in time.
     """
     rental_id = models.UUIDField(primary_key=True,
                                  default=uuid.uuid4,
@@ -92,8 +116,115 @@ class Rental(TimeStampedModel, models.Model):
                                      max_digits=200,
                                      blank=True,
                                      null=True)
+    returned_at = models.DateTimeField(blank=True,
+                                       null=True)
+    overdue_days = models.PositiveIntegerField(default=0)
+    overdue_fee = models.DecimalField(decimal_places=2,
+                                      max_digits=200,
+                                      default=0)
 
     class Meta:
         db_table = "Rental"
         verbose_name = "Rental"
         verbose_name_plural = "Rentals"
+        indexes = [
+            models.Index(fields=['student_id', '-created', '-rental_id'], name='rental_student_created_idx'),
+            # Only the few rentals still out are indexed, not the whole rental history
+            models.Index(fields=['return_date', 'rental_id'], condition=models.Q(returned_at__isnull=True),
+                         name='rental_unreturned_due_idx'),
+            models.Index(fields=['created'], name='rental_created_idx'),
+        ]
+
+
+class StudentRentalSummary(models.Model):
+    """
+    The rental totals of a student, kept up to date by every write to their rentals.
+
+    Rows are changed with ``F()`` deltas in the transaction of the rental write, through
+    ``services.rental_summary``, so reading the totals of a student is a primary key lookup.
+    ``manage.py rebuild_rental_summaries`` recomputes them from the Rental table.
+
+    Attributes:
+        student_id (OneToOneField): The student, also the primary key.
+        active_rentals (PositiveIntegerField): The rentals not returned yet, overdue ones included.
+        total_rentals (PositiveIntegerField): All the rentals of the student.
+        outstanding_fees (DecimalField): The rental and overdue fees of all the rentals.
+        last_rented_at (DateTimeField): When the student last rented a book.
+        version (PositiveBigIntegerField): Bumped by every change to the rentals of the student;
+            versions the cached rented books panel.
+    """
+    student_id = models.OneToOneField(Student,
+                                      on_delete=models.CASCADE,
+                                      primary_key=True,
+                                      related_name='rental_summary')
+    active_rentals = models.PositiveIntegerField(default=0)
+    total_rentals = models.PositiveIntegerField(default=0)
+    outstanding_fees = models.DecimalField(decimal_places=2,
+                                           max_digits=200,
+                                           default=0)
+    last_rented_at = models.DateTimeField(blank=True,
+                                          null=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Rental summary of {self.student_id_id}"
+
+    class Meta:
+        db_table = "StudentRentalSummary"
+        verbose_name = "Student rental summary"
+        verbose_name_plural = "Student rental summaries"
+
+
+class JobState(TimeStampedModel, models.Model):
+    """
+    The progress of a periodic job run by the ``run_jobs`` command.
+
+    The cursor is written in the same transaction as the work of each batch, so a runner that
+    stops mid-run resumes after the last committed batch, with the same ``run_started_at``.
+
+    Attributes:
+        name (CharField): The name of the job.
+        run_started_at (DateTimeField): The time the current run works as of; null between runs.
+        cursor (TextField): Where the current run stopped; null at the start of a run.
+        last_finished_at (DateTimeField): When the last complete run finished.
+        lease_until (DateTimeField): Other runners leave the job alone until this time.
+    """
+    name = models.CharField(max_length=100,
+                            primary_key=True)
+    run_started_at = models.DateTimeField(blank=True,
+                                          null=True)
+    cursor = models.TextField(blank=True,
+                              null=True)
+    last_finished_at = models.DateTimeField(blank=True,
+                                            null=True)
+    lease_until = models.DateTimeField(blank=True,
+                                       null=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        db_table = "JobState"
+        verbose_name = "Job state"
+        verbose_name_plural = "Job states"
+
+
+class StartupState(TimeStampedModel, models.Model):
+    """
+    The fingerprint a startup step last ran for, written by ``manage.py startup``.
+
+    Attributes:
+        name (CharField): The name of the step.
+        fingerprint (CharField): The digest of what the step depended on when it last ran.
+    """
+    name = models.CharField(max_length=100,
+                            primary_key=True)
+    fingerprint = models.CharField(max_length=64)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        db_table = "StartupState"
+        verbose_name = "Startup state"
+        verbose_name_plural = "Startup states"
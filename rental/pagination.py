@@ -0,0 +1,177 @@
+import base64
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    """
+    One page of a keyset paginated queryset.
+
+    Iterating the page yields its items. ``next_cursor`` is passed back to
+    ``KeysetPaginator.page`` to fetch the following page.
+
+    Attributes:
+        items (list): The objects on this page.
+        next_cursor (str | None): The cursor of the next page, or None on the last page.
+        cursor (str | None): The cursor this page was fetched with.
+    """
+
+    def __init__(self, items, next_cursor, cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.cursor = cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def is_first(self):
+        return self.cursor is None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+
+class KeysetPaginator:
+    """
+    Paginates a queryset on a unique ordering without OFFSET.
+
+    Each page is fetched with a ``WHERE a >= x AND (a > x OR (a = x AND b > y))`` condition on the
+    ordering columns, flipped for descending fields. The leading bound is redundant but lets the
+    database start an index range scan at the cursor, which it cannot do from the OR alone, so with
+    an index on the filter columns plus the ordering the cost of a page does not depend on how deep
+    it is. The last ordering field must be unique to break ties.
+
+    Attributes:
+        queryset (QuerySet): The rows to paginate.
+        per_page (int): The number of rows per page.
+        ordering (tuple[str]): Model field names, prefixed with ``-`` for descending order.
+    """
+
+    def __init__(self, queryset, per_page=20, ordering=('-created', '-pk')):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = ordering
+        opts = queryset.model._meta
+        self.fields = [opts.pk if name.lstrip('-') == 'pk' else opts.get_field(name.lstrip('-'))
+                       for name in ordering]
+
+    def encode_cursor(self, item):
+        values = [getattr(item, field.attname) for field in self.fields]
+        raw = json.dumps([value.isoformat() if isinstance(value, datetime.datetime) else str(value)
+                          for value in values])
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, cursor):
+        """
+        Returns the ordering values of a cursor.
+
+        Raises:
+            InvalidCursor: When the cursor was not produced by ``encode_cursor``.
+        """
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+            if not isinstance(values, list) or len(values) != len(self.fields):
+                raise ValueError(cursor)
+            return [field.to_python(value) for field, value in zip(self.fields, values)]
+        except (ValueError, UnicodeError, ValidationError) as exc:
+            raise InvalidCursor(cursor) from exc
+
+    def after(self, values):
+        """
+        Builds the condition selecting the rows that sort after ``values``.
+
+        The OR of the ties is ANDed with an inclusive bound on the first ordering field, which the
+        database can use as the start of an index range.
+        """
+        condition = None
+        for index in reversed(range(len(self.ordering))):
+            name = self.ordering[index]
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            step = Q(**{f'{self.fields[index].name}__{lookup}': values[index]})
+            if condition is not None:
+                step |= Q(**{self.fields[index].name: values[index]}) & condition
+            condition = step
+        if len(self.ordering) > 1:
+            lookup = 'lte' if self.ordering[0].startswith('-') else 'gte'
+            condition = Q(**{f'{self.fields[0].name}__{lookup}': values[0]}) & condition
+        return condition
+
+    def page(self, cursor=None):
+        """
+        Fetches the page that starts after ``cursor``; an invalid cursor returns the first page.
+
+        Args:
+            cursor (str | None): The ``next_cursor`` of the previous page.
+
+        Returns:
+            KeysetPage: The page.
+        """
+        queryset = self.queryset.order_by(*self.ordering)
+        if cursor:
+            try:
+                values = self.decode_cursor(cursor)
+            except InvalidCursor:
+                cursor = None
+            else:
+                queryset = queryset.filter(self.after(values))
+
+        items = list(queryset[:self.per_page + 1])
+        next_cursor = None
+        if len(items) > self.per_page:
+            items = items[:self.per_page]
+            next_cursor = self.encode_cursor(items[-1])
+        return KeysetPage(items, next_cursor, cursor or None)
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    DRF pagination over ``KeysetPaginator``.
+
+    Reads the ``cursor`` and ``page_size`` query parameters and answers with the ``next`` link,
+    the ``next_cursor`` and the ``results`` of the page. The view may set ``ordering``.
+    """
+    page_size = 50
+    max_page_size = 200
+    ordering = ('-created', '-pk')
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        paginator = KeysetPaginator(queryset, per_page=self.get_page_size(request),
+                                    ordering=getattr(view, 'ordering', self.ordering))
+        self.page = paginator.page(request.query_params.get(self.cursor_query_param))
+        return self.page.items
+
+    def get_next_link(self):
+        if not self.page.has_next:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.page.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'next_cursor': self.page.next_cursor, 'results': data})
@@ -0,0 +1,95 @@
+from rest_framework import serializers
+
+from rental.forms import BulkBookRentalForm
+from rental.models import Rental
+
+
+class SearchResultSerializer(serializers.Serializer):
+    """
+    A book of a search result; reads SearchDocs and plain OpenLibrary docs alike.
+    """
+    title = serializers.CharField()
+    authors = serializers.ListField(source='author_name', child=serializers.CharField(), required=False)
+    page_count = serializers.IntegerField(source='number_of_pages_median', allow_null=True, required=False)
+    isbn = serializers.ListField(child=serializers.CharField(), required=False)
+    source = serializers.CharField(allow_null=True, required=False)
+
+
+class SuggestionSerializer(serializers.Serializer):
+    """
+    A catalogue book suggested for a typed prefix.
+    """
+    book_id = serializers.UUIDField()
+    title = serializers.CharField()
+    author = serializers.CharField(allow_null=True)
+    rentals = serializers.IntegerField()
+
+
+class RentalSerializer(serializers.ModelSerializer):
+    """
+    A rental with the title of its book.
+
+    Querysets should load only ``ONLY_FIELDS``, with the book selected.
+    """
+    ONLY_FIELDS = ('rental_id', 'book_id', 'created', 'return_date', 'fee_amount', 'overdue_days', 'overdue_fee',
+                   'returned_at', 'book_id__title')
+
+    title = serializers.CharField(source='book_id.title', read_only=True)
+
+    class Meta:
+        model = Rental
+        fields = ('rental_id', 'book_id', 'title', 'created', 'return_date', 'fee_amount', 'overdue_days',
+                  'overdue_fee', 'returned_at')
+        read_only_fields = fields
+
+
+class ExtendedRentalSerializer(RentalSerializer):
+    """
+    A rental after an extension, which loads only the columns it writes.
+    """
+
+    class Meta(RentalSerializer.Meta):
+        fields = ('rental_id', 'book_id', 'title', 'return_date', 'fee_amount')
+        read_only_fields = fields
+
+
+class BookSerializer(serializers.Serializer):
+    title = serializers.CharField(max_length=250)
+    author = serializers.CharField(max_length=250, allow_blank=True, default='')
+    page_count = serializers.IntegerField(min_value=1)
+    isbn = serializers.CharField(max_length=13, allow_blank=True, default='')
+
+
+class RentSerializer(BookSerializer):
+    """
+    Rents one book; only staff may rent for another student.
+    """
+    student_id = serializers.UUIDField(required=False)
+    return_date = serializers.DateTimeField()
+
+
+class BulkRentSerializer(serializers.Serializer):
+    """
+    Rents many books to one student in one transaction; only staff may rent for another student.
+    """
+    student_id = serializers.UUIDField(required=False)
+    return_date = serializers.DateTimeField()
+    books = BookSerializer(many=True, allow_empty=False)
+
+    def validate_books(self, books):
+        if len(books) > BulkBookRentalForm.MAX_BOOKS:
+            raise serializers.ValidationError(f'At most {BulkBookRentalForm.MAX_BOOKS} books can be rented at once.')
+        return books
+
+
+class ExtendRentalsSerializer(serializers.Serializer):
+    """
+    Extends the active rentals of the signed in student, or only the listed ones, by a number of days.
+    """
+    days = serializers.IntegerField(min_value=1, max_value=90)
+    rental_ids = serializers.ListField(child=serializers.UUIDField(), required=False, allow_empty=False,
+                                       max_length=BulkBookRentalForm.MAX_BOOKS)
+
+
+class RentalExtensionSerializer(serializers.Serializer):
+    return_date = serializers.DateField()
@@ -1,15 +1,24 @@
-from django.urls import path
+from django.db import transaction
+from django.urls import include, path
 
-from rental.views import LoginView, LogoutView, BookSearchView, BookRentView, BookRentExtensionView, BorrowedBooksView, \
-    StudentListView
+from rental.views import LoginView, LogoutView, BookRentView, BookRentExtensionView, StudentListView, \
+    AsyncBookSearchView, AsyncBorrowedBooksView, BookBulkRentView, MetricsView, RentalExportView
 
 urlpatterns = [
     path('', LoginView.as_view(), name='login'),
     path('', LogoutView.as_view(), name='logout'),
-    path('book-search/', BookSearchView.as_view(), name='book_search'),
+    # Async views cannot run inside ATOMIC_REQUESTS transactions
+    path('book-search/', transaction.non_atomic_requests(AsyncBookSearchView.as_view()), name='book_search'),
     path('book-rent/', BookRentView.as_view(), name='book_rent'),
     path('book-rent-extension/', BookRentExtensionView.as_view(), name='book_rent_extension'),
     #Admin
+    path('admin/book-rent-bulk/', BookBulkRentView.as_view(), name='book_rent_bulk'),
+    path('admin/metrics/', MetricsView.as_view(), name='metrics'),
+    path('admin/rentals/export/', transaction.non_atomic_requests(RentalExportView.as_view()),
+         name='admin_export_rentals'),
     path('admin/list-students/', StudentListView.as_view(), name='admin_list_students'),
-    path('admin/borrowed-books/<uuid:student_id>/', BorrowedBooksView.as_view(), name='admin_borrowed_books'),
+    path('admin/borrowed-books/<uuid:student_id>/', transaction.non_atomic_requests(AsyncBorrowedBooksView.as_view()),
+         name='admin_borrowed_books'),
+    # JSON API
+    path('api/v1/', include('rental.api_urls')),
 ]
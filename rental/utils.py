@@ -0,0 +1,78 @@
+import re
+
+from django.db.models import Q
+
+ISBN_CHARACTERS = re.compile(r'[^0-9X]')
+NON_WORD = re.compile(r'[\W_]+')
+
+
+def isbn10_to_isbn13(isbn10):
+    """
+    Converts a 10 digit ISBN to its 978-prefixed 13 digit form.
+
+    Args:
+        isbn10 (str): A cleaned ISBN-10; only the first nine digits are used.
+
+    Returns:
+        str: The ISBN-13.
+    """
+    body = '978' + isbn10[:9]
+    total = sum(int(digit) * (1 if index % 2 == 0 else 3) for index, digit in enumerate(body))
+    return body + str((10 - total % 10) % 10)
+
+
+def normalise_isbn(isbn):
+    """
+    Normalises an ISBN so the hyphenated, ISBN-10 and ISBN-13 forms of a book compare equal.
+
+    Args:
+        isbn (str): The ISBN as entered or returned by OpenLibrary.
+
+    Returns:
+        str | None: The ISBN-13, or None when the value is not a 10 or 13 character ISBN.
+    """
+    if not isbn:
+        return None
+    cleaned = ISBN_CHARACTERS.sub('', str(isbn).upper())
+    if len(cleaned) == 10 and cleaned[:9].isdigit():
+        return isbn10_to_isbn13(cleaned)
+    if len(cleaned) == 13 and cleaned.isdigit():
+        return cleaned
+    return None
+
+
+def normalise_text(value):
+    """
+    Lower-cases a title or author name and collapses punctuation and whitespace.
+    """
+    return NON_WORD.sub(' ', str(value or '')).strip().casefold()
+
+
+def make_catalogue_key(isbn=None, title=None, author=None):
+    """
+    Builds the key that identifies a book in the catalogue.
+
+    Books with a valid ISBN are keyed by the normalised ISBN-13, other books by their normalised
+    title and author.
+
+    Returns:
+        str | None: The key, or None when there is nothing to identify the book by.
+    """
+    normalised_isbn = normalise_isbn(isbn)
+    if normalised_isbn:
+        return f"isbn:{normalised_isbn}"
+    title, author = normalise_text(title), normalise_text(author)
+    if not title:
+        return None
+    return f"title:{title[:255]}|{author[:255]}"
+
+
+def active_rentals_filter():
+    """
+    Builds the condition matching rentals that are still out: those not returned, overdue ones
+    included, as counted by ``StudentRentalSummary.active_rentals``.
+
+    Returns:
+        Q: The condition on Rental.
+    """
+    return Q(returned_at__isnull=True)
@@ -1,18 +1,51 @@
+import asyncio
 import datetime
+from decimal import Decimal
 
+from asgiref.sync import sync_to_async
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
+from django.db.models import DecimalField, F, Q, Value
+from django.db.models.functions import Coalesce
+from django.http import HttpResponse, StreamingHttpResponse
+from django.middleware.csrf import get_token
 from django.shortcuts import render, redirect
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.utils.decorators import method_decorator
 from django.views import View
 
-from rental.models import Rental
+from rental.decorators import async_login_required, async_staff_member_required
+from rental.models import Rental, StudentRentalSummary
+from rental.pagination import KeysetPaginator
+from rental.utils import active_rentals_filter
 from services.book_rental_service import OpenLibraryBookRentalService
-from rental.forms import BookSearchForm, BookRentalForm, LoginForm, BookRentalExtensionForm
+from services.metrics import get_metrics_registry
+from services.panel_cache import CSRF_PLACEHOLDER, get_panel_cache
+from services.rental_export import RentalExport, day_range
+from rental.forms import BookSearchForm, BookRentalForm, LoginForm, BookRentalExtensionForm, BulkBookRentalForm, \
+    BulkRentalExtensionForm, RentalExportForm
 from student.models import Student
 
 
+def not_modified(request, etag):
+    """
+    Returns a 304 response when the request already holds the page tagged etag, otherwise None.
+    """
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        tag_response(response, etag)
+    return response
+
+
+def tag_response(response, etag):
+    response['ETag'] = etag
+    # Browsers keep the page but revalidate it, getting a 304 until it changes
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
 class LoginView(View):
     """
     Class-based view for user login.
@@ -48,7 +81,90 @@ class LogoutView(View):
         return redirect('login')  # Redirect to the login page after logout
 
 
-class BookSearchView(View):
+class RentedBooksPageMixin:
+    """
+    Pages the rented books of a student newest first and caches the rendered panel.
+
+    Reads the ``cursor`` and ``active`` query parameters; ``active=1`` hides rentals whose return
+    date has passed. The panel is cached under the summary version of the student, and GETs of the
+    page are answered with a 304 while the ETag of the page has not changed.
+    """
+    rented_books_per_page = 20
+    # The columns the rented books panel renders
+    rented_books_fields = ('rental_id', 'created', 'return_date', 'fee_amount', 'overdue_days', 'overdue_fee',
+                           'book_id__title')
+    rented_books_panel_template = 'rented_books_panel.html'
+
+    def get_rented_books_page(self, request, student):
+        """
+        Returns one page of the rentals returned by ``get_rented_books``.
+
+        Args:
+            request: The request holding the pagination query parameters.
+            student: The student, or the id of the student, whose rentals are listed.
+
+        Returns:
+            KeysetPage: The page of rentals.
+        """
+        rentals = self.get_rented_books(student)
+        if request.GET.get('active') == '1':
+            rentals = rentals.filter(active_rentals_filter())
+        paginator = KeysetPaginator(rentals, per_page=self.rented_books_per_page,
+                                    ordering=('-created', '-rental_id'))
+        return paginator.page(request.GET.get('cursor'))
+
+    @staticmethod
+    def get_rental_summary(student):
+        """
+        Returns the StudentRentalSummary of a student, read by primary key; a zero one if there is none.
+        """
+        student_id = getattr(student, 'pk', student)
+        summary = StudentRentalSummary.objects.filter(pk=student_id).first()
+        return summary or StudentRentalSummary(student_id_id=student_id)
+
+    def get_rented_books_panel(self, request, student, summary=None):
+        """
+        Returns the template context of the rented books panel: the summary and the rendered panel.
+
+        The panel is rendered once per summary version and page, then read from the panel cache; the
+        page of rentals is only queried on a miss and is then in the context as ``rented_books``.
+
+        Args:
+            request: The request holding the pagination query parameters.
+            student: The student, or the id of the student, whose rentals are listed.
+            summary (StudentRentalSummary | None): The summary, when already read.
+        """
+        summary = summary or self.get_rental_summary(student)
+        panel_cache = get_panel_cache()
+        key = self.get_rented_books_panel_key(request, summary)
+        context = {'rental_summary': summary}
+        html = panel_cache.get(key)
+        if html is None:
+            # The rentals are read after the summary, so they are never older than its version
+            context['rented_books'] = self.get_rented_books_page(request, student)
+            html = render_to_string(self.rented_books_panel_template,
+                                    {**context, 'active': request.GET.get('active') == '1',
+                                     'csrf_input': CSRF_PLACEHOLDER})
+            panel_cache.set(key, html)
+        context['rented_books_panel'] = panel_cache.insert_csrf(html, request)
+        return context
+
+    @staticmethod
+    def get_rented_books_panel_key(request, summary):
+        return get_panel_cache().make_key(summary.pk, summary.version, active=request.GET.get('active') == '1',
+                                          cursor=request.GET.get('cursor'))
+
+    def get_rented_books_etag(self, request, summary):
+        """
+        Returns the ETag of a GET of the page: it changes with the panel, the signed in user and their CSRF secret.
+        """
+        # get_token sets the CSRF secret the page will be rendered with, when the request has none yet
+        get_token(request)
+        return get_panel_cache().make_etag(self.get_rented_books_panel_key(request, summary), self.template_name,
+                                           request.user.pk, request.META['CSRF_COOKIE'])
+
+
+class BookSearchView(RentedBooksPageMixin, View):
     """
     Class-based view for book searching.
     """
@@ -56,18 +172,23 @@ class BookSearchView(View):
 
     @method_decorator(login_required)
     def get(self, request):
+        summary = self.get_rental_summary(request.user)
+        etag = self.get_rented_books_etag(request, summary)
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
         search_form = BookSearchForm()
-        rented_books = self.get_rented_books(request.user)
-        return render(request, self.template_name,
-                      {'search_form': search_form,
-                       'search_results': [],
-                       'rented_books': rented_books,
-                       'user': request.user.student_id})
+        panel = self.get_rented_books_panel(request, request.user, summary)
+        return tag_response(render(request, self.template_name,
+                                        {'search_form': search_form,
+                                         'search_results': [],
+                                         **panel,
+                                         'user': request.user.student_id}), etag)
 
     @method_decorator(login_required)
     def post(self, request):
         search_form = BookSearchForm(request.POST)
-        rented_books = self.get_rented_books(request.user)
+        panel = self.get_rented_books_panel(request, request.user)
         default_return_date = datetime.datetime.today() + datetime.timedelta(days=30)
         if search_form.is_valid():
             search_query = search_form.cleaned_data['search_query']
@@ -76,13 +197,13 @@ class BookSearchView(View):
             return render(request, self.template_name,
                           {'search_form': search_form,
                            'search_results': book_search_result,
-                           'rented_books': rented_books,
+                           **panel,
                            'user': request.user.student_id,
                            'default_return_date': default_return_date.strftime('%B %d, %Y, %I:%M %p')})
         return render(request, self.template_name,
                       {'search_form': search_form,
                        'search_results': [],
-                       'rented_books': rented_books,
+                       **panel,
                        'user': request.user.student_id,
                        'default_return_date': default_return_date})
 
@@ -98,7 +219,57 @@ class BookSearchView(View):
         """
         # Implement logic to fetch rented books for the user from the database or any other source
 
-        return Rental.objects.select_related('book_id').filter(student_id=user).order_by('-created')
+        return (Rental.objects.select_related('book_id').filter(student_id=user)
+                .only(*self.rented_books_fields).order_by('-created', '-rental_id'))
+
+
+class AsyncBookSearchView(BookSearchView):
+    """
+    Async version of BookSearchView.
+
+    The OpenLibrary search is awaited on the event loop and the rented books query runs
+    concurrently with it instead of after it.
+    """
+
+    @async_login_required
+    async def get(self, request):
+        summary = await sync_to_async(self.get_rental_summary)(request.user)
+        etag = self.get_rented_books_etag(request, summary)
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+        search_form = BookSearchForm()
+        panel = await sync_to_async(self.get_rented_books_panel)(request, request.user, summary)
+        return tag_response(render(request, self.template_name,
+                                        {'search_form': search_form,
+                                         'search_results': [],
+                                         **panel,
+                                         'user': request.user.student_id}), etag)
+
+    @async_login_required
+    async def post(self, request):
+        search_form = BookSearchForm(request.POST)
+        default_return_date = datetime.datetime.today() + datetime.timedelta(days=30)
+        if search_form.is_valid():
+            search_query = search_form.cleaned_data['search_query']
+            book_search = OpenLibraryBookRentalService()
+            panel, book_search_result = await asyncio.gather(
+                sync_to_async(self.get_rented_books_panel)(request, request.user),
+                book_search.asearch_book(search_query),
+            )
+            return render(request, self.template_name,
+                          {'search_form': search_form,
+                           'search_results': book_search_result,
+                           **panel,
+                           'user': request.user.student_id,
+                           'default_return_date': default_return_date.strftime('%B %d, %Y, %I:%M %p')})
+        panel = await sync_to_async(self.get_rented_books_panel)(request, request.user)
+        return render(request, self.template_name,
+                      {'search_form': search_form,
+                       'search_results': [],
+                       **panel,
+                       'user': request.user.student_id,
+                       'default_return_date': default_return_date})
 
 
 class BookRentView(View):
@@ -122,9 +293,37 @@ class BookRentView(View):
         return render(request, self.template_name, {'book_rented': None, 'rent_form': rent_form})
 
 
+class BookBulkRentView(View):
+    """
+    Admin view to rent a class set of books to one student in a single transaction.
+    """
+    template_name = 'book_rent_bulk.html'
+
+    @method_decorator(staff_member_required(login_url='login'))
+    def get(self, request):
+        rent_form = BulkBookRentalForm(initial={'student_id': request.GET.get('student_id')})
+        return render(request, self.template_name, {'rentals': None, 'rent_form': rent_form})
+
+    @method_decorator(staff_member_required(login_url='login'))
+    def post(self, request):
+        rent_form = BulkBookRentalForm(request.POST)
+        if rent_form.is_valid():
+            book_service = OpenLibraryBookRentalService()
+            rentals = book_service.rent_books_bulk(**rent_form.cleaned_data)
+            return render(request, self.template_name,
+                          {'rentals': rentals,
+                           'books': rent_form.cleaned_data['books'],
+                           'student_id': rent_form.cleaned_data['student_id'],
+                           'rent_form': BulkBookRentalForm()})
+        return render(request, self.template_name, {'rentals': None, 'rent_form': rent_form})
+
+
 class BookRentExtensionView(View):
     """
-    Class-based view for book rental.
+    Class-based view for book rental extensions.
+
+    Posting ``rental_id`` and ``return_date`` moves the return date of one rental; posting ``days``
+    extends every active rental of the signed in student by that many days.
     """
     template_name = 'book_rent_extension.html'
 
@@ -135,6 +334,8 @@ class BookRentExtensionView(View):
 
     @method_decorator(login_required)
     def post(self, request):
+        if 'days' in request.POST:
+            return self.extend_all(request)
         extension_form = BookRentalExtensionForm(request.POST)
         if extension_form.is_valid():
             book_service = OpenLibraryBookRentalService()
@@ -142,21 +343,103 @@ class BookRentExtensionView(View):
             return render(request, self.template_name, {'book_rented': book_rented, 'rent_form': extension_form})
         return render(request, self.template_name, {'book_rented': None, 'rent_form': extension_form})
 
+    def extend_all(self, request):
+        """
+        Extends all the active rentals of the signed in student.
+        """
+        bulk_form = BulkRentalExtensionForm(request.POST)
+        if bulk_form.is_valid():
+            book_service = OpenLibraryBookRentalService()
+            rentals = book_service.extend_rentals(request.user.student_id, days=bulk_form.cleaned_data['days'])
+            return render(request, self.template_name,
+                          {'book_rented': None, 'rentals_extended': rentals, 'bulk_form': bulk_form,
+                           'total_fees': sum(rental.fee_amount for rental in rentals)})
+        return render(request, self.template_name, {'book_rented': None, 'bulk_form': bulk_form})
+
 
 class StudentListView(View):
     """
-    Admin view to display a list of students and their borrowed books.
+    Admin view to list students with their active rental count and outstanding fees.
+
+    Students are paged by username and can be filtered by a username or email prefix; the
+    counts are read from the StudentRentalSummary row of each student, joined in the page query.
     """
     template_name = 'admin/list_students.html'
+    students_per_page = 50
 
     @method_decorator(staff_member_required(login_url='login'))
     def get(self, request):
-        students = Student.objects.all()
+        query = request.GET.get('q', '').strip()
+        paginator = KeysetPaginator(self.get_students(query), per_page=self.students_per_page,
+                                    ordering=('username',))
+        students = paginator.page(request.GET.get('cursor'))
+
+        return render(request, self.template_name, {'students': students, 'query': query})
+
+    def get_students(self, query=''):
+        """
+        Helper method to get the students to list.
+
+        Args:
+            query (str): Only students whose username or email starts with it are returned.
 
-        return render(request, self.template_name, {'students': students})
+        Returns:
+            QuerySet: Students annotated with ``active_rentals`` and ``outstanding_fees``.
+        """
+        # Kept up to date by every write to rentals; a student without rentals may have no row yet
+        students = Student.objects.only('student_id', 'username', 'email').annotate(
+            active_rentals=Coalesce(F('rental_summary__active_rentals'), 0),
+            outstanding_fees=Coalesce(F('rental_summary__outstanding_fees'), Value(Decimal(0)),
+                                      output_field=DecimalField()),
+        )
+        if query:
+            # Case sensitive so that the varchar_pattern_ops indexes PostgreSQL keeps for the unique
+            # username and email columns can serve the prefix match
+            students = students.filter(Q(username__startswith=query) | Q(email__startswith=query))
+        return students
+
+
+class MetricsView(View):
+    """
+    Admin view serving the request metrics of this worker in the Prometheus text format.
+    """
+
+    @method_decorator(staff_member_required(login_url='login'))
+    def get(self, request):
+        return HttpResponse(get_metrics_registry().render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 
-class BorrowedBooksView(View):
+class RentalExportView(View):
+    """
+    Admin view streaming rentals as CSV or JSON lines, filtered by the query parameters of
+    RentalExportForm: ``format``, ``student_id``, ``created_from``, ``created_to`` and ``overdue``.
+
+    The response starts with the first block of rows and streams the rest as they are read, so an
+    export of any size takes constant memory. It is async because Django's ASGI handler buffers
+    synchronous streaming iterators.
+    """
+    chunk_size = 2000
+
+    @async_staff_member_required
+    async def get(self, request):
+        form = RentalExportForm(request.GET)
+        if not form.is_valid():
+            return HttpResponse(form.errors.as_text(), status=400, content_type='text/plain; charset=utf-8')
+        filters = form.cleaned_data
+        created_from, created_to = day_range(filters['created_from'], filters['created_to'])
+        export = RentalExport(format=filters['format'] or 'csv',
+                              student_ids=[filters['student_id']] if filters['student_id'] else None,
+                              created_from=created_from, created_to=created_to, overdue=filters['overdue'],
+                              chunk_size=self.chunk_size)
+        response = StreamingHttpResponse(export.ablocks(), content_type=export.content_type)
+        response['Content-Disposition'] = f'attachment; filename="{export.filename}"'
+        # Keeps proxies from holding the stream back until it ends
+        response['X-Accel-Buffering'] = 'no'
+        patch_cache_control(response, private=True, no_store=True)
+        return response
+
+
+class BorrowedBooksView(RentedBooksPageMixin, View):
     """
     Admin view to display borrowed books for a specific student.
     """
@@ -164,21 +447,26 @@ class BorrowedBooksView(View):
 
     @method_decorator(staff_member_required(login_url='login'))
     def get(self, request, student_id):
+        summary = self.get_rental_summary(student_id)
+        etag = self.get_rented_books_etag(request, summary)
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
         search_form = BookSearchForm()
-        rented_books = self.get_rented_books(student_id)
+        panel = self.get_rented_books_panel(request, student_id, summary)
 
         # return render(request, self.template_name, {'student': student, 'rented_books': rented_books})
 
-        return render(request, self.template_name,
-                      {'search_form': search_form,
-                       'search_results': [],
-                       'rented_books': rented_books,
-                       'user': student_id})
+        return tag_response(render(request, self.template_name,
+                                        {'search_form': search_form,
+                                         'search_results': [],
+                                         **panel,
+                                         'user': student_id}), etag)
 
     @method_decorator(staff_member_required(login_url='login'))
     def post(self, request, student_id):
         search_form = BookSearchForm(request.POST)
-        rented_books = self.get_rented_books(student_id)
+        panel = self.get_rented_books_panel(request, student_id)
         default_return_date = datetime.datetime.today() + datetime.timedelta(days=30)
         if search_form.is_valid():
             search_query = search_form.cleaned_data['search_query']
@@ -187,13 +475,13 @@ class BorrowedBooksView(View):
             return render(request, self.template_name,
                           {'search_form': search_form,
                            'search_results': book_search_result,
-                           'rented_books': rented_books,
+                           **panel,
                            'user': student_id,
                            'default_return_date': default_return_date.strftime('%B %d, %Y, %I:%M %p')})
         return render(request, self.template_name,
                       {'search_form': search_form,
                        'search_results': [],
-                       'rented_books': rented_books,
+                       **panel,
                        'user': student_id,
                        'default_return_date': default_return_date})
 
@@ -209,4 +497,54 @@ class BorrowedBooksView(View):
         """
         # Implement logic to fetch rented books for the user from the database or any other source
 
-        return Rental.objects.select_related('book_id').filter(student_id_id=student_id).order_by('-created')
\ No newline at end of file
+        return (Rental.objects.select_related('book_id').filter(student_id_id=student_id)
+                .only(*self.rented_books_fields).order_by('-created', '-rental_id'))
+
+
+class AsyncBorrowedBooksView(BorrowedBooksView):
+    """
+    Async version of BorrowedBooksView.
+
+    The OpenLibrary search is awaited on the event loop and the rented books query runs
+    concurrently with it instead of after it.
+    """
+
+    @async_staff_member_required
+    async def get(self, request, student_id):
+        summary = await sync_to_async(self.get_rental_summary)(student_id)
+        etag = self.get_rented_books_etag(request, summary)
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+        search_form = BookSearchForm()
+        panel = await sync_to_async(self.get_rented_books_panel)(request, student_id, summary)
+        return tag_response(render(request, self.template_name,
+                                        {'search_form': search_form,
+                                         'search_results': [],
+                                         **panel,
+                                         'user': student_id}), etag)
+
+    @async_staff_member_required
+    async def post(self, request, student_id):
+        search_form = BookSearchForm(request.POST)
+        default_return_date = datetime.datetime.today() + datetime.timedelta(days=30)
+        if search_form.is_valid():
+            search_query = search_form.cleaned_data['search_query']
+            book_search = OpenLibraryBookRentalService()
+            panel, book_search_result = await asyncio.gather(
+                sync_to_async(self.get_rented_books_panel)(request, student_id),
+                book_search.asearch_book(search_query),
+            )
+            return render(request, self.template_name,
+                          {'search_form': search_form,
+                           'search_results': book_search_result,
+                           **panel,
+                           'user': student_id,
+                           'default_return_date': default_return_date.strftime('%B %d, %Y, %I:%M %p')})
+        panel = await sync_to_async(self.get_rented_books_panel)(request, student_id)
+        return render(request, self.template_name,
+                      {'search_form': search_form,
+                       'search_results': [],
+                       **panel,
+                       'user': student_id,
+                       'default_return_date': default_return_date})
@@ -0,0 +1,403 @@
+import heapq
+import logging
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count, Max
+
+from rental.models import Book, Rental
+from rental.utils import normalise_text
+from services.search_cache import LRUTTLCache
+
+logger = logging.getLogger(__name__)
+
+# Separates the title from the author in the indexed text; never part of a normalised query
+FIELD_SEPARATOR = '\0'
+# Entries pack the book position above the offset of a word start in its text
+OFFSET_BITS = 16
+OFFSET_MASK = (1 << OFFSET_BITS) - 1
+# Matches the separator before every word but the first
+WORD_START = re.compile(f'[ {FIELD_SEPARATOR}](?=.)', re.DOTALL)
+# Entries are sorted in buckets sharing this many leading characters, one bucket at a time
+BUCKET_KEY_LENGTH = 2
+
+
+class Suggestion:
+    """
+    A book suggested for a typed prefix.
+
+    Attributes:
+        book_id (UUID): The id of the book.
+        title (str): The title of the book.
+        author (str | None): The author of the book.
+        rentals (int): The number of times the book was rented.
+    """
+    __slots__ = ('book_id', 'title', 'author', 'rentals')
+
+    def __init__(self, book_id, title, author, rentals):
+        self.book_id = book_id
+        self.title = title
+        self.author = author
+        self.rentals = rentals
+
+
+class AutocompleteSnapshot:
+    """
+    An immutable prefix index over the titles and authors of the catalogue.
+
+    Every book has a normalised text, its title and author joined by ``FIELD_SEPARATOR``. The index
+    is a sorted array with one entry per word start in those texts, like a suffix array cut at word
+    boundaries, so a prefix query is two binary searches and matches from any word on. Matches are
+    ranked by rental count. A short prefix of a large catalogue matches too many entries to rank, so
+    past ``RANKED_WALK_MIN_MATCHES`` the books are walked most rented first until enough match, and
+    the results of such prefixes are memoised.
+
+    Attributes:
+        book_ids (list[UUID]): The book at each position.
+        titles (list[str]): The title shown for each book.
+        authors (list[str | None]): The author shown for each book.
+        texts (list[str]): The normalised text indexed for each book.
+        rentals (array): The rental count of each book.
+        entries (array): The packed ``(position, offset)`` of every word start, sorted by the text
+            that follows it.
+        positions (dict): Maps book ids to positions.
+        ranking (array): The positions of all books, most rented first, then by text.
+    """
+    MEMO_MIN_MATCHES = 256
+    RANKED_WALK_MIN_MATCHES = 1024
+
+    def __init__(self, book_ids, titles, authors, texts, rentals, entries):
+        self.book_ids = book_ids
+        self.titles = titles
+        self.authors = authors
+        self.texts = texts
+        self.rentals = rentals
+        self.entries = entries
+        self.positions = {book_id: position for position, book_id in enumerate(book_ids)}
+        self.ranking = array('L', sorted(range(len(book_ids)), key=self.rank))
+        self._memo = LRUTTLCache(max_entries=4096, max_age=float('inf'))
+
+    @staticmethod
+    def word_starts(text):
+        return [0] + [match.end() for match in WORD_START.finditer(text)]
+
+    @classmethod
+    def entries_for(cls, position, text):
+        return [(position << OFFSET_BITS) | offset for offset in cls.word_starts(text)[:OFFSET_MASK]]
+
+    def rank(self, position):
+        return -self.rentals[position], self.texts[position]
+
+    def suffix(self, entry):
+        return self.texts[entry >> OFFSET_BITS][entry & OFFSET_MASK:]
+
+    def sort_entries(self, entries):
+        """
+        Sorts entries by their suffix without holding a copy of every suffix at once.
+
+        Entries are split into buckets by the first characters of their suffix and the buckets are
+        sorted one after the other, so only the suffixes of the largest bucket are alive at a time.
+        """
+        buckets = defaultdict(lambda: array('Q'))
+        texts = self.texts
+        for entry in entries:
+            offset = entry & OFFSET_MASK
+            buckets[texts[entry >> OFFSET_BITS][offset:offset + BUCKET_KEY_LENGTH]].append(entry)
+        sorted_entries = array('Q')
+        for key in sorted(buckets):
+            sorted_entries.extend(sorted(buckets.pop(key), key=self.suffix))
+        return sorted_entries
+
+    @classmethod
+    def build(cls, books, rentals):
+        """
+        Builds a snapshot from ``(book_id, title, author)`` rows and a map of book ids to rental counts.
+        """
+        book_ids, titles, authors, texts, entries = [], [], [], [], array('Q')
+        for book_id, title, author in books:
+            text = make_text(title, author)
+            if not text:
+                continue
+            entries.extend(cls.entries_for(len(book_ids), text))
+            book_ids.append(book_id)
+            titles.append(title)
+            authors.append(author)
+            texts.append(text)
+        snapshot = cls(book_ids, titles, authors, texts,
+                       array('Q', (rentals.get(book_id, 0) for book_id in book_ids)), array('Q'))
+        snapshot.entries = snapshot.sort_entries(entries)
+        return snapshot
+
+    def with_changes(self, books, rentals):
+        """
+        Returns a new snapshot with changed books and added rental counts applied.
+
+        Only the entries of changed books are re-sorted; they are merged into the rest in one pass.
+
+        Args:
+            books (list[tuple]): ``(book_id, title, author)`` of added or changed books.
+            rentals (dict): Maps book ids to the number of rentals to add.
+        """
+        book_ids, titles, authors, texts = list(self.book_ids), list(self.titles), list(self.authors), list(self.texts)
+        counts = array('Q', self.rentals)
+        positions = dict(self.positions)
+        changed = set()
+        new_entries = []
+        for book_id, title, author in books:
+            text = make_text(title, author)
+            position = positions.get(book_id)
+            if position is None:
+                if not text:
+                    continue
+                position = positions[book_id] = len(book_ids)
+                book_ids.append(book_id)
+                titles.append(title)
+                authors.append(author)
+                texts.append(text)
+                counts.append(0)
+            else:
+                changed.add(position)
+                titles[position], authors[position], texts[position] = title, author, text
+            if text:
+                new_entries.extend(self.entries_for(position, text))
+        for book_id, count in rentals.items():
+            position = positions.get(book_id)
+            if position is not None:
+                counts[position] += count
+
+        snapshot = AutocompleteSnapshot(book_ids, titles, authors, texts, counts, self.entries)
+        if new_entries or changed:
+            kept = (entry for entry in self.entries if entry >> OFFSET_BITS not in changed)
+            snapshot.entries = array('Q', heapq.merge(kept, snapshot.sort_entries(new_entries), key=snapshot.suffix))
+        return snapshot
+
+    def __len__(self):
+        return len(self.book_ids)
+
+    def has_book(self, book_id, title, author):
+        """
+        Returns True when the book is indexed with this title and author.
+        """
+        position = self.positions.get(book_id)
+        if position is None:
+            return not make_text(title, author)
+        return self.titles[position] == title and self.authors[position] == author
+
+    def suggest(self, query, limit=10):
+        """
+        Returns the most rented books with a word of the title or author starting with the query.
+
+        Args:
+            query (str): The typed text; matched as a phrase prefix after normalisation.
+            limit (int): The maximum number of suggestions.
+
+        Returns:
+            list[Suggestion]: Most rented first, then by title.
+        """
+        prefix = normalise_text(query)
+        if not prefix:
+            return []
+        memoised = self._memo.get((prefix, limit))
+        if memoised is not None:
+            return memoised[0]
+
+        start = bisect_left(self.entries, prefix, key=self.suffix)
+        end = bisect_left(self.entries, prefix + '\U0010ffff', lo=start, key=self.suffix)
+        if end - start >= self.RANKED_WALK_MIN_MATCHES:
+            ranked = self._walk_ranking(prefix, limit)
+        else:
+            matches = {entry >> OFFSET_BITS for entry in self.entries[start:end]}
+            ranked = heapq.nsmallest(limit, matches, key=self.rank)
+        suggestions = [Suggestion(self.book_ids[position], self.titles[position], self.authors[position],
+                                  self.rentals[position]) for position in ranked]
+        if end - start >= self.MEMO_MIN_MATCHES:
+            self._memo.set((prefix, limit), suggestions)
+        return suggestions
+
+    def _walk_ranking(self, prefix, limit):
+        """
+        Returns the first ``limit`` books in ranking order with a word starting with the prefix.
+        """
+        word_prefixes = (' ' + prefix, FIELD_SEPARATOR + prefix)
+        ranked = []
+        for position in self.ranking:
+            text = self.texts[position]
+            if text.startswith(prefix) or word_prefixes[0] in text or word_prefixes[1] in text:
+                ranked.append(position)
+                if len(ranked) == limit:
+                    break
+        return ranked
+
+
+def make_text(title, author):
+    title, author = normalise_text(title), normalise_text(author)
+    if not title and not author:
+        return ''
+    return f"{title}{FIELD_SEPARATOR}{author}" if author else title
+
+
+class BookAutocomplete:
+    """
+    Suggests catalogue books for typed prefixes from an in-memory index, kept per process.
+
+    The index is built on a background thread, started by ``warm`` when a worker forks or else by the
+    first lookup; lookups get no suggestions until it is ready. Afterwards, a lookup more than
+    ``refresh_interval`` seconds after the last refresh starts one in the background and is answered
+    from the current snapshot meanwhile. A refresh reads the books modified and the rentals created
+    since the previous one; every ``full_reload_interval`` seconds the index is rebuilt instead,
+    which drops deleted books and corrects counts of rentals that committed out of order. Rebuilds
+    happen outside the lock and the new snapshot is swapped in when done.
+
+    Attributes:
+        refresh_interval (float): Seconds between incremental refreshes.
+        full_reload_interval (float): Seconds between full rebuilds.
+        limit (int): The default number of suggestions.
+        min_query_length (int): Shorter queries get no suggestions.
+    """
+
+    def __init__(self, refresh_interval=60, full_reload_interval=3600, limit=10, min_query_length=2):
+        self.refresh_interval = refresh_interval
+        self.full_reload_interval = full_reload_interval
+        self.limit = limit
+        self.min_query_length = min_query_length
+        self._snapshot = None
+        self._book_watermark = None
+        self._rental_watermark = None
+        # The first lookup starts a build; after a failed one, the next lookup past the interval retries
+        self._refreshed_at = float('-inf')
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._refreshing_lock = threading.Lock()
+
+    def suggest(self, query, limit=None):
+        """
+        Returns up to ``limit`` books for a typed prefix; see ``AutocompleteSnapshot.suggest``.
+        """
+        if len(query.strip()) < self.min_query_length:
+            return []
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return []
+        return snapshot.suggest(query, limit or self.limit)
+
+    def snapshot(self):
+        """
+        Returns the current snapshot, or None while the first one is being built.
+
+        Starts the first build, or a refresh once one is due, on a background thread.
+        """
+        if time.monotonic() - self._refreshed_at >= self.refresh_interval:
+            self._refresh_in_background()
+        return self._snapshot
+
+    def warm(self):
+        """
+        Starts building the index in the background unless it is already built.
+        """
+        if self._snapshot is None:
+            self._refresh_in_background()
+
+    def refresh(self):
+        """
+        Applies the changes since the last refresh, or rebuilds the index when a full reload is due.
+        """
+        if self._snapshot is None or time.monotonic() - self._loaded_at >= self.full_reload_interval:
+            self._load()
+            return
+        with self._lock:
+            books = Book.objects.all()
+            if self._book_watermark is not None:
+                # Rows saved in the same instant as the watermark are read again and skipped below
+                books = books.filter(modified__gte=self._book_watermark)
+            rentals = Rental.objects.filter(book_id__isnull=False)
+            if self._rental_watermark is not None:
+                rentals = rentals.filter(created__gt=self._rental_watermark)
+            rows = list(books.values_list('book_id', 'title', 'author', 'modified'))
+            new_rentals = self._rental_counts(rentals)
+
+            snapshot = self._snapshot
+            changed_books = [(book_id, title, author) for book_id, title, author, _ in rows
+                             if not snapshot.has_book(book_id, title, author)]
+            if changed_books or new_rentals:
+                self._snapshot = snapshot.with_changes(changed_books, new_rentals[0] if new_rentals else {})
+            if rows:
+                self._book_watermark = max(row[3] for row in rows)
+            if new_rentals:
+                self._rental_watermark = new_rentals[1]
+            self._refreshed_at = time.monotonic()
+
+    def _load(self):
+        started = time.perf_counter()
+        book_watermark = Book.objects.aggregate(latest=Max('modified'))['latest']
+        counts = self._rental_counts(Rental.objects.filter(book_id__isnull=False))
+        books = Book.objects.values_list('book_id', 'title', 'author').iterator(chunk_size=10000)
+        snapshot = AutocompleteSnapshot.build(books, counts[0] if counts else {})
+        with self._lock:
+            self._snapshot = snapshot
+            self._book_watermark = book_watermark
+            self._rental_watermark = counts[1] if counts else None
+            self._loaded_at = self._refreshed_at = time.monotonic()
+        logger.info("Built the autocomplete index of %s books in %.2fs", len(snapshot), time.perf_counter() - started)
+
+    @staticmethod
+    def _rental_counts(rentals):
+        """
+        Returns the rentals per book and the latest creation time among them, or None when there are none.
+        """
+        latest = rentals.aggregate(latest=Max('created'))['latest']
+        if latest is None:
+            return None
+        counts = rentals.filter(created__lte=latest).values_list('book_id').annotate(count=Count('pk'))
+        return dict(counts.order_by()), latest
+
+    def _refresh_in_background(self):
+        with self._refreshing_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def refresh():
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Refreshing the autocomplete index failed")
+                # Try again after the next interval rather than on every lookup
+                self._refreshed_at = time.monotonic()
+            finally:
+                self._refreshing = False
+                connections.close_all()
+
+        threading.Thread(target=refresh, name='autocomplete-refresh', daemon=True).start()
+
+    def clear(self):
+        with self._lock:
+            self._snapshot = None
+            self._book_watermark = self._rental_watermark = None
+            self._refreshed_at = float('-inf')
+
+
+_autocomplete = None
+_autocomplete_lock = threading.Lock()
+
+
+def get_book_autocomplete():
+    """
+    Returns the process wide BookAutocomplete configured by ``settings.BOOK_AUTOCOMPLETE``.
+    """
+    global _autocomplete
+    if _autocomplete is None:
+        with _autocomplete_lock:
+            if _autocomplete is None:
+                options = getattr(settings, 'BOOK_AUTOCOMPLETE', {})
+                _autocomplete = BookAutocomplete(refresh_interval=options.get('REFRESH_INTERVAL', 60),
+                                                 full_reload_interval=options.get('FULL_RELOAD_INTERVAL', 3600),
+                                                 limit=options.get('LIMIT', 10),
+                                                 min_query_length=options.get('MIN_QUERY_LENGTH', 2))
+    return _autocomplete
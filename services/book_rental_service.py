@@ -1,12 +1,28 @@
+import asyncio
 import calendar
 import datetime
+import threading
 from datetime import timedelta
 
+import aiohttp
 import requests
+from django.conf import settings
+from django.db import connections, transaction
 from django.http import HttpResponse
+from django.utils import timezone
 import logging
 
-from rental.models import Book, Rental
+from rental.models import Rental
+from rental.utils import active_rentals_filter
+from services.catalogue import get_book_catalogue
+from services.circuit_breaker import CircuitBreaker, get_openlibrary_circuit_breaker
+from services.http_client import get_async_http_client, get_http_client
+from services.local_search import get_local_book_search
+from services.overdue_fees import get_overdue_fee_accrual
+from services.rental_summary import RentalSummaryDeltas
+from services.search_cache import get_search_cache, off_request_thread
+from services.search_docs import SEARCH_FIELDS, SearchResults, parse_search_response
+from services.single_flight import get_single_flight
 
 # Set up logging configuration
 logging.basicConfig(level=logging.INFO)
@@ -19,8 +35,24 @@ class OpenLibraryBookRentalService:
 
     Attributes:
         api_base_url (str): The base URL for OpenLibrary API.
+        search_cache (SearchResultCache): The tiered cache used for search results.
+        http_client (PooledHTTPClient): The keep-alive client used to call OpenLibrary.
+        async_http_client (AsyncPooledHTTPClient): The client used by the async search path.
+        single_flight (SingleFlight): Coalesces concurrent identical searches into one upstream call.
+        catalogue (BookCatalogue): Resolves rented books to their deduplicated catalogue entry.
+        local_search (LocalBookSearch): Searches the books already in the catalogue.
+        search_limit (int): The maximum number of docs asked of OpenLibrary per search.
+        circuit_breaker (CircuitBreaker): Stops calling OpenLibrary while most calls to it fail.
+        latency_budget (float): Seconds an OpenLibrary search may take, retries included.
 
     Methods:
+        search_book: Searches the catalogue and OpenLibrary for a title.
+        asearch_book: Async version of search_book for ASGI views.
+        rent_book: Rents a book to a student.
+        rent_books_bulk: Rents many books to a student in one transaction.
+        rent_extension: Moves the return date of one rental.
+        extend_rentals: Extends the active rentals of a student in one transaction.
+        return_rentals: Marks rentals as returned and settles their overdue fees.
         initiate_new_rental: Initiates a new book rental by fetching book details from OpenLibrary.
         calculate_rental_cost: Calculates the rental cost based on the number of pages.
         save_rental_details: Saves rental details in the system or database.
@@ -31,30 +63,257 @@ class OpenLibraryBookRentalService:
     """
     OPEN_LIBRARY_API_BASE_URL = "https://openlibrary.org/search.json"
     COST_PER_PAGE = 0.01
-
-    def __init__(self):
-        self.api_base_url = self.OPEN_LIBRARY_API_BASE_URL
+    BULK_BATCH_SIZE = 500
+    # The only columns an extension writes
+    EXTENSION_FIELDS = ('return_date', 'fee_amount', 'overdue_days', 'overdue_fee', 'modified')
+    # The only columns a return writes
+    RETURN_FIELDS = ('returned_at', 'overdue_days', 'overdue_fee', 'modified')
+    RESPONSE_CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, search_cache=None, http_client=None, async_http_client=None, single_flight=None,
+                 catalogue=None, local_search=None, api_base_url=None, search_limit=None, circuit_breaker=None,
+                 latency_budget=None):
+        self.api_base_url = (api_base_url
+                             or getattr(settings, 'OPENLIBRARY_SEARCH_URL', self.OPEN_LIBRARY_API_BASE_URL))
+        self.search_limit = search_limit or getattr(settings, 'OPENLIBRARY_SEARCH_LIMIT', 20)
+        self.search_cache = search_cache or get_search_cache()
+        self.http_client = http_client or get_http_client()
+        self.async_http_client = async_http_client or get_async_http_client()
+        self.single_flight = single_flight or get_single_flight()
+        self.catalogue = catalogue or get_book_catalogue()
+        self.local_search = local_search or get_local_book_search()
+        self.circuit_breaker = circuit_breaker or get_openlibrary_circuit_breaker()
+        self.latency_budget = latency_budget or getattr(settings, 'OPENLIBRARY_SEARCH_LATENCY_BUDGET', 4.0)
 
     def search_book(self, title: str):
+        """
+        Searches for books with the given title in the catalogue and on OpenLibrary.
+
+        Books already in the catalogue are found locally. OpenLibrary is only searched when there
+        are fewer than ``local_search.min_results`` local matches, and its results are merged
+        after the local ones. When OpenLibrary fails or its circuit is open, the local matches
+        are returned on their own, flagged as degraded.
+
+        Args:
+            title (str): The title of the book to search for.
+
+        Returns:
+            SearchResults: The books of the search result
+        """
+        local_docs = self.local_search.search_docs(title)
+        if len(local_docs) >= self.local_search.min_results:
+            return SearchResults(local_docs)
+        upstream_docs = self._search_upstream(title)
+        return SearchResults(self.local_search.merge(local_docs, upstream_docs), degraded=upstream_docs.degraded)
+
+    def _search_upstream(self, title):
         """
         Searches for books with the given title on OpenLibrary.
 
+        Results are served from the search cache when possible. A stale entry is returned
+        immediately and refreshed from OpenLibrary in the background, unless the circuit is open.
+        Concurrent searches for the same title share a single upstream call.
+
+        Returns:
+            SearchResults: The docs, empty and degraded when OpenLibrary could not be searched.
+        """
+        cache_key = self._search_cache_key(title)
+        cached = self.search_cache.get(cache_key)
+        if cached is not None:
+            return self._serve_cached(cached, lambda: self._revalidate_in_background(cache_key, title))
+
+        book_data = self.single_flight.do(cache_key, lambda: self._fetch_and_cache(cache_key, title),
+                                          shared_result=lambda: self.search_cache.get_shared(cache_key))
+        return SearchResults(book_data or (), degraded=book_data is None)
+
+    def _serve_cached(self, cached, revalidate):
+        if not cached.is_stale:
+            return SearchResults(cached.value)
+        if self.circuit_breaker.state == CircuitBreaker.OPEN:
+            # Keep serving it until OpenLibrary is probed again
+            return SearchResults(cached.value, degraded=True)
+        revalidate()
+        return SearchResults(cached.value)
+
+    def _fetch_and_cache(self, cache_key, title):
+        book_data = self._fetch_search_results(title)
+        if book_data is not None:
+            self.search_cache.set(cache_key, book_data)
+        return book_data
+
+    def _search_params(self, title):
+        """
+        Returns the query of a search, asking OpenLibrary for only the fields the application reads.
+        """
+        return {'title': title, 'fields': ','.join(SEARCH_FIELDS), 'limit': self.search_limit}
+
+    def _search_cache_key(self, title):
+        """
+        Returns the search cache key of a title, covering every parameter sent upstream so that a
+        change of the field list or the limit does not serve results in the old shape.
+        """
+        params = self._search_params(title)
+        return self.search_cache.make_key(params.pop('title'), **params)
+
+    def _fetch_search_results(self, title):
+        """
+        Fetches the search results for a title from OpenLibrary.
+
+        The body is streamed and decoded one doc at a time into compact SearchDocs, so neither the
+        raw body nor its full decoded tree is ever held in memory. The call is bounded by
+        ``latency_budget`` and its outcome is recorded on the circuit breaker; while the circuit is
+        open no call is made.
+
         Args:
             title (str): The title of the book to search for.
 
         Returns:
-            book_data (json): A dictionary containing the books of the search result
+            list[SearchDoc] | None: The docs of the search result, or None when the upstream call
+                failed or was not made.
+        """
+        if not self.circuit_breaker.allow_request():
+            logger.info("OpenLibrary circuit is open, not searching for %r", title)
+            return None
+        try:
+            response = self.http_client.get(self.api_base_url, params=self._search_params(title), stream=True,
+                                            budget=self.latency_budget)
+            with response:
+                if response.status_code == HttpResponse.status_code:  # 200 OK
+                    docs = parse_search_response(response.iter_content(self.RESPONSE_CHUNK_SIZE),
+                                                 limit=self.search_limit)
+                    self.circuit_breaker.record_success()
+                    return docs
+        except (requests.RequestException, ValueError) as exc:
+            self.circuit_breaker.record_failure()
+            logger.warning("OpenLibrary search for %r failed: %s", title, exc)
+            return None
+        self.circuit_breaker.record_failure()
+        logger.warning("OpenLibrary search for %r failed with status %s", title, response.status_code)
+        return None
+
+    _revalidating = set()
+    _revalidating_lock = threading.Lock()
+
+    def _revalidate_in_background(self, cache_key, title):
+        """
+        Refreshes a stale cache entry on a daemon thread, at most once per key at a time.
         """
+        with self._revalidating_lock:
+            if cache_key in self._revalidating:
+                return
+            self._revalidating.add(cache_key)
+
+        def revalidate():
+            try:
+                book_data = self._fetch_search_results(title)
+                if book_data is not None:
+                    self.search_cache.set(cache_key, book_data)
+            except Exception:
+                logger.exception("Background revalidation of %r failed", title)
+            finally:
+                with self._revalidating_lock:
+                    self._revalidating.discard(cache_key)
+
+        threading.Thread(target=revalidate, name='openlibrary-revalidate', daemon=True).start()
+
+    async def asearch_book(self, title: str):
+        """
+        Async version of ``search_book``.
 
-        search_url = f"{self.api_base_url}?title={title}"
-        response = requests.get(search_url)
+        The upstream call is awaited on the event loop, so a single ASGI worker can keep many
+        searches in flight at once. The local lookup and the shared cache tier run on threads of
+        their own rather than the thread the request shares with its other sync work, so a view
+        gathering this search with a database query does not hold OpenLibrary back until the query
+        is done.
 
-        if response.status_code == HttpResponse.status_code:  # 200 OK
-            # Step 2: Extract book details from the JSON response
-            book_data = response.json()
-            return book_data.get('docs', [])
-        else:
-            return []
+        Args:
+            title (str): The title of the book to search for.
+
+        Returns:
+            SearchResults: The books of the search result
+        """
+        local_docs = await off_request_thread(self._search_local_docs)(title)
+        if len(local_docs) >= self.local_search.min_results:
+            return SearchResults(local_docs)
+        upstream_docs = await self._asearch_upstream(title)
+        return SearchResults(self.local_search.merge(local_docs, upstream_docs), degraded=upstream_docs.degraded)
+
+    def _search_local_docs(self, title):
+        try:
+            return self.local_search.search_docs(title)
+        finally:
+            # The thread is not one Django closes connections on
+            connections.close_all()
+
+    async def _asearch_upstream(self, title):
+        """
+        Async version of ``_search_upstream``.
+        """
+        cache_key = self._search_cache_key(title)
+        cached = await self.search_cache.aget(cache_key)
+        if cached is not None:
+            return self._serve_cached(cached, lambda: self._arevalidate_in_background(cache_key, title))
+
+        book_data = await self.single_flight.ado(cache_key, lambda: self._afetch_and_cache(cache_key, title),
+                                                 shared_result=lambda: self.search_cache.aget_shared(cache_key))
+        return SearchResults(book_data or (), degraded=book_data is None)
+
+    async def _afetch_and_cache(self, cache_key, title):
+        book_data = await self._afetch_search_results(title)
+        if book_data is not None:
+            await self.search_cache.aset(cache_key, book_data)
+        return book_data
+
+    async def _afetch_search_results(self, title):
+        """
+        Async version of ``_fetch_search_results``.
+
+        The async client reads the body before returning, so only the decoding is incremental.
+        """
+        if not self.circuit_breaker.allow_request():
+            logger.info("OpenLibrary circuit is open, not searching for %r", title)
+            return None
+        try:
+            response = await self.async_http_client.get(self.api_base_url, params=self._search_params(title),
+                                                        budget=self.latency_budget)
+            if response.status == HttpResponse.status_code:  # 200 OK
+                docs = await response.json(loads=lambda text: parse_search_response([text], limit=self.search_limit))
+                self.circuit_breaker.record_success()
+                return docs
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as exc:
+            self.circuit_breaker.record_failure()
+            logger.warning("OpenLibrary search for %r failed: %s", title, exc)
+            return None
+        self.circuit_breaker.record_failure()
+        logger.warning("OpenLibrary search for %r failed with status %s", title, response.status)
+        return None
+
+    _background_tasks = set()
+
+    def _arevalidate_in_background(self, cache_key, title):
+        """
+        Refreshes a stale cache entry in a task on the running loop, at most once per key at a time.
+        """
+        with self._revalidating_lock:
+            if cache_key in self._revalidating:
+                return
+            self._revalidating.add(cache_key)
+
+        async def revalidate():
+            try:
+                book_data = await self._afetch_search_results(title)
+                if book_data is not None:
+                    await self.search_cache.aset(cache_key, book_data)
+            except Exception:
+                logger.exception("Background revalidation of %r failed", title)
+            finally:
+                with self._revalidating_lock:
+                    self._revalidating.discard(cache_key)
+
+        # Keep a reference so the task is not garbage collected before it finishes
+        task = asyncio.get_running_loop().create_task(revalidate())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
 
     def rent_book(self, student_id, title, author, page_count, isbn, return_date):
         """
@@ -66,33 +325,74 @@ class OpenLibraryBookRentalService:
             author (str): The name of the author of the book
             page_count (int): The number of pages in the book.
             isbn (str): The ISBN of the book
-            return_date (str): The date the student_id wants to return the book as a string
+            return_date (str | datetime): The date the student_id wants to return the book as a string
                 in the format 'Month day, Year, Hour:Minute AM/PM'
 
         Returns:
             book (object): The rented book
         """
-        # Create the rented book in the database
-        book = Book(title=title, author=author, page_count=page_count, isbn=isbn)
-        book.save()
+        # Reuse the catalogue entry of the book, creating it on its first rental
+        book_id = self.catalogue.get_or_create_book_id(title=title, author=author, page_count=page_count, isbn=isbn)
 
         # Parse the return date string to a timezone-aware datetime object
-        return_date_format = '%B %d, %Y, %I:%M %p'
-        return_date = datetime.datetime.strptime(return_date, return_date_format)
+        return_date = self.parse_return_date(return_date)
+
+        # Price the rental before inserting it so it is written with a single query
+        rent = Rental(student_id_id=student_id, book_id_id=book_id, return_date=return_date)
+        rent.fee_amount = self.calculate_rental_cost(number_of_pages=page_count, rented_date=timezone.now(),
+                                                     return_date=return_date)
+        with transaction.atomic():
+            rent.save()
+            deltas = RentalSummaryDeltas()
+            deltas.rented(rent.student_id_id, rent.fee_amount, rent.created)
+            deltas.apply()
 
-        # Create the Rental object in the database
-        rent = Rental(student_id_id=student_id, book_id=book, return_date=return_date)
-        rent.save()
+        return rent
 
-        # Calculate cost
-        rented_date = rent.created  # Assuming rent.created represents the rented date
-        rent_amount = self.calculate_rental_cost(number_of_pages=page_count, rented_date=rented_date,
-                                                 return_date=return_date)
+    def rent_books_bulk(self, student_id, books, return_date):
+        """
+        Rents many books to a student in one transaction.
 
-        # Save rental details
-        self.save_rental_details(rent, rent_amount)
+        The whole batch is priced in memory and inserted with ``bulk_create``, so the number of
+        queries does not grow with the number of books.
 
-        return rent
+        Args:
+            student_id (str): The student_id that wants to rent the books
+            books (list[dict]): The books to rent, each with ``title``, ``author``, ``page_count``
+                and ``isbn`` keys.
+            return_date (str | datetime): The date the books will be returned, in the format
+                'Month day, Year, Hour:Minute AM/PM'
+
+        Returns:
+            list[Rental]: The created rentals, in the order of ``books``.
+        """
+        return_date = self.parse_return_date(return_date)
+        with transaction.atomic():
+            book_ids = self.catalogue.get_or_create_book_ids(books)
+            rented_date = timezone.now()
+            rentals = [
+                Rental(student_id_id=student_id, book_id_id=book_id, return_date=return_date,
+                       fee_amount=self.calculate_rental_cost(number_of_pages=book['page_count'],
+                                                             rented_date=rented_date, return_date=return_date))
+                for book, book_id in zip(books, book_ids)
+            ]
+            Rental.objects.bulk_create(rentals, batch_size=self.BULK_BATCH_SIZE)
+            deltas = RentalSummaryDeltas()
+            for rental in rentals:
+                deltas.rented(rental.student_id_id, rental.fee_amount, rental.created)
+            deltas.apply()
+        return rentals
+
+    @staticmethod
+    def parse_return_date(return_date):
+        """
+        Parses a return date in the format 'Month day, Year, Hour:Minute AM/PM'; datetimes, as
+        validated by the JSON API, are returned as they are.
+        """
+        if isinstance(return_date, datetime.datetime):
+            return return_date
+        return_date_format = '%B %d, %Y, %I:%M %p'
+        return datetime.datetime.strptime(return_date, return_date_format)
 
     @staticmethod
     def calculate_rental_cost(number_of_pages, rented_date, return_date):
@@ -144,18 +444,115 @@ class OpenLibraryBookRentalService:
 
         Args:
             rental_id (id): The rent object id
-            return_date (Date): The new return date.
+            return_date (str): The new return date, in the format 'YYYY-MM-DD'.
 
         Returns:
-            None
+            Rental: The extended rental.
+
+        Raises:
+            Rental.DoesNotExist: When there is no rental with this id.
         """
         return_date_format = '%Y-%m-%d'
-        return_date = datetime.datetime.strptime(return_date, return_date_format)
-
-        rental_object = Rental.objects.get(rental_id=rental_id)
-        fee_amount = self.calculate_rental_cost(number_of_pages=rental_object.book_id.page_count,
-                                                rented_date=rental_object.created, return_date=return_date)
-        rental_object.fee_amount = fee_amount
-        rental_object.return_date = return_date
-        rental_object.save()
-        return rental_object
+        return_date = timezone.make_aware(datetime.datetime.strptime(return_date, return_date_format))
+
+        rentals = self._reprice_rentals(Rental.objects.filter(rental_id=rental_id), lambda rental: return_date)
+        if not rentals:
+            raise Rental.DoesNotExist(f"No rental with id {rental_id}.")
+        return rentals[0]
+
+    def extend_rentals(self, student_id, days=14, rental_ids=None):
+        """
+        Extends the active rentals of a student that are not due yet by the same number of days, in one
+        transaction. Overdue rentals are left to ``rent_extension``, which sets an explicit date.
+
+        Args:
+            student_id (str): The student whose rentals are extended.
+            days (int): The number of days added to every return date.
+            rental_ids (list | None): Only extend these rentals of the student; all that are due later when None.
+
+        Returns:
+            list[Rental]: The extended rentals, with their new return date and fee.
+        """
+        rentals = Rental.objects.filter(active_rentals_filter(), student_id=student_id,
+                                        return_date__gte=timezone.now())
+        if rental_ids is not None:
+            rentals = rentals.filter(rental_id__in=rental_ids)
+        extension = timedelta(days=days)
+        return self._reprice_rentals(rentals, lambda rental: rental.return_date + extension)
+
+    def _reprice_rentals(self, rentals, new_return_date):
+        """
+        Moves the return date of rentals and reprices them with one SELECT and one UPDATE.
+
+        The rentals are locked, in primary key order so concurrent batches cannot deadlock, until the
+        transaction commits; a concurrent extension of the same rental waits and then sees the new
+        return date. The overdue fee of a rental that was already late is recomputed against the new
+        return date in the same transaction, so it drops to nothing when the rental is no longer late.
+
+        Args:
+            rentals (QuerySet): The rentals to extend.
+            new_return_date (callable): Returns the new return date of a rental.
+
+        Returns:
+            list[Rental]: The updated rentals.
+        """
+        with transaction.atomic():
+            rentals = list(rentals.select_related('book_id').select_for_update(of=('self',))
+                           .only('rental_id', 'student_id', 'created', 'return_date', 'returned_at', 'fee_amount',
+                                 'overdue_days', 'overdue_fee', 'modified', 'book_id__title', 'book_id__page_count')
+                           .order_by('rental_id'))
+            modified = timezone.now()
+            accrual = get_overdue_fee_accrual()
+            deltas = RentalSummaryDeltas()
+            for rental in rentals:
+                rental.return_date = new_return_date(rental)
+                page_count = rental.book_id.page_count if rental.book_id else None
+                fee_amount = self.calculate_rental_cost(number_of_pages=page_count or 0,
+                                                        rented_date=rental.created,
+                                                        return_date=rental.return_date)
+                deltas.fee_changed(rental.student_id_id, rental.fee_amount, fee_amount)
+                rental.fee_amount = fee_amount
+                overdue_days = accrual.days_late(rental.return_date, rental.returned_at or modified)
+                overdue_fee = accrual.fee(overdue_days)
+                deltas.fee_changed(rental.student_id_id, rental.overdue_fee, overdue_fee)
+                rental.overdue_days, rental.overdue_fee = overdue_days, overdue_fee
+                # bulk_update does not touch auto_now fields
+                rental.modified = modified
+            Rental.objects.bulk_update(rentals, self.EXTENSION_FIELDS, batch_size=self.BULK_BATCH_SIZE)
+            deltas.apply()
+        return rentals
+
+    def return_rentals(self, rentals, returned_at=None):
+        """
+        Marks rentals as returned, with one SELECT and one UPDATE.
+
+        The overdue fee of a late rental is settled up to the return: the full days late it had not
+        been charged for yet by the ``accrue_overdue_fees`` job are added, so the fee no longer grows.
+        Rentals already returned are left as they are.
+
+        Args:
+            rentals (QuerySet): The rentals to return.
+            returned_at (datetime | None): When the books came back; defaults to now.
+
+        Returns:
+            list[Rental]: The rentals returned by this call.
+        """
+        returned_at = returned_at or timezone.now()
+        accrual = get_overdue_fee_accrual()
+        with transaction.atomic():
+            # Locked in primary key order, like extensions, so concurrent returns cannot deadlock
+            rentals = list(rentals.filter(returned_at__isnull=True).select_for_update()
+                           .only('rental_id', 'student_id', 'return_date', 'returned_at', 'overdue_days',
+                                 'overdue_fee', 'modified')
+                           .order_by('rental_id'))
+            deltas = RentalSummaryDeltas()
+            for rental in rentals:
+                days = accrual.days_late(rental.return_date, returned_at) if rental.return_date else 0
+                if days > rental.overdue_days:
+                    deltas.fee_changed(rental.student_id_id, rental.overdue_fee, accrual.fee(days))
+                    rental.overdue_days, rental.overdue_fee = days, accrual.fee(days)
+                deltas.returned(rental.student_id_id)
+                rental.returned_at = rental.modified = returned_at
+            Rental.objects.bulk_update(rentals, self.RETURN_FIELDS, batch_size=self.BULK_BATCH_SIZE)
+            deltas.apply()
+        return rentals
@@ -0,0 +1,139 @@
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from rental.models import Book
+from rental.utils import make_catalogue_key
+from services.search_cache import LRUTTLCache
+
+
+class BookCatalogue:
+    """
+    Upserts books into the catalogue, one row per catalogue key.
+
+    Keys already resolved in this process are remembered, so repeat rentals of a book skip the
+    lookup query entirely. Keys are only remembered once the transaction that created or read
+    the row has committed, so a rolled back insert is never cached.
+
+    Attributes:
+        book_ids (LRUTTLCache): Maps catalogue keys to book ids.
+    """
+
+    def __init__(self, max_entries=10000, max_age=24 * 60 * 60):
+        self.book_ids = LRUTTLCache(max_entries=max_entries, max_age=max_age)
+
+    def get_or_create_book_id(self, title, author, page_count, isbn):
+        """
+        Returns the id of the catalogue entry for a book, creating the entry when it is new.
+
+        Args:
+            title (str): The title of the book.
+            author (str): The name of the author of the book.
+            page_count (int): The number of pages in the book.
+            isbn (str): The ISBN of the book in any common format.
+
+        Returns:
+            UUID: The book_id of the catalogue entry.
+        """
+        key = make_catalogue_key(isbn=isbn, title=title, author=author)
+        if key is None:
+            # Nothing to deduplicate on; keep the book as its own row
+            return Book.objects.create(title=title, author=author, page_count=page_count, isbn=isbn).book_id
+
+        cached = self.book_ids.get(key)
+        if cached is not None:
+            return cached[0]
+
+        book, _ = Book.objects.get_or_create(
+            catalogue_key=key,
+            defaults={'title': title, 'author': author, 'page_count': page_count, 'isbn': isbn},
+        )
+        book_id = book.book_id
+        transaction.on_commit(lambda: self.book_ids.set(key, book_id))
+        return book_id
+
+    def get_or_create_book_ids(self, books):
+        """
+        Bulk version of ``get_or_create_book_id``.
+
+        Uses at most four queries however many books are given: one to look up the keys not
+        cached in this process, one to insert the missing books, one to read back their ids
+        (another request may have inserted some of them concurrently) and one to insert books
+        that have no catalogue key.
+
+        Args:
+            books (list[dict]): Books with ``title``, ``author``, ``page_count`` and ``isbn`` keys.
+
+        Returns:
+            list[UUID]: The book_id of each book, in the order given.
+        """
+        keys = [make_catalogue_key(isbn=book['isbn'], title=book['title'], author=book['author'])
+                for book in books]
+        book_ids = {}
+        missing = {}
+        for key, book in zip(keys, books):
+            if key is None or key in book_ids or key in missing:
+                continue
+            cached = self.book_ids.get(key)
+            if cached is not None:
+                book_ids[key] = cached[0]
+            else:
+                missing[key] = book
+
+        if missing:
+            found = dict(Book.objects.filter(catalogue_key__in=missing).values_list('catalogue_key', 'book_id'))
+            book_ids.update(found)
+            new_books = [Book(catalogue_key=key, title=book['title'], author=book['author'],
+                              page_count=book['page_count'], isbn=book['isbn'])
+                         for key, book in missing.items() if key not in found]
+            if new_books:
+                Book.objects.bulk_create(new_books, ignore_conflicts=True)
+                book_ids.update(Book.objects.filter(catalogue_key__in=[book.catalogue_key for book in new_books])
+                                .values_list('catalogue_key', 'book_id'))
+            resolved = {key: book_ids[key] for key in missing}
+            transaction.on_commit(lambda: self._remember(resolved))
+
+        # Books without a key are not deduplicated; each gets its own row
+        keyless = [Book(title=book['title'], author=book['author'], page_count=book['page_count'],
+                        isbn=book['isbn']) for key, book in zip(keys, books) if key is None]
+        if keyless:
+            Book.objects.bulk_create(keyless)
+        keyless_ids = iter(book.book_id for book in keyless)
+        return [book_ids[key] if key is not None else next(keyless_ids) for key in keys]
+
+    def _remember(self, book_ids):
+        for key, book_id in book_ids.items():
+            self.book_ids.set(key, book_id)
+
+    def forget(self, catalogue_key):
+        self.book_ids.delete(catalogue_key)
+
+    def clear(self):
+        self.book_ids.clear()
+
+
+_catalogue = None
+_catalogue_lock = threading.Lock()
+
+
+def get_book_catalogue():
+    """
+    Returns the process wide BookCatalogue sized by ``settings.BOOK_CATALOGUE_CACHE``.
+    """
+    global _catalogue
+    if _catalogue is None:
+        with _catalogue_lock:
+            if _catalogue is None:
+                options = getattr(settings, 'BOOK_CATALOGUE_CACHE', {})
+                _catalogue = BookCatalogue(max_entries=options.get('MAX_ENTRIES', 10000),
+                                           max_age=options.get('MAX_AGE', 24 * 60 * 60))
+    return _catalogue
+
+
+@receiver(post_delete, sender=Book)
+def forget_deleted_book(sender, instance, **kwargs):
+    if instance.catalogue_key and _catalogue is not None:
+        _catalogue.forget(instance.catalogue_key)
@@ -0,0 +1,277 @@
+import gzip
+import json
+import logging
+import os
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from rental.models import Book, JobState
+from rental.utils import make_catalogue_key, normalise_isbn
+
+logger = logging.getLogger(__name__)
+
+TITLE_MAX_LENGTH = Book._meta.get_field('title').max_length
+AUTHOR_MAX_LENGTH = Book._meta.get_field('author').max_length
+EDITION_TYPE = '/type/edition'
+WORK_TYPE = '/type/work'
+# Where the ISBNs are, best first: editions list both forms, search docs a single ``isbn`` list
+ISBN_FIELDS = ('isbn_13', 'isbn_10', 'isbn')
+
+
+def open_dump(path):
+    """
+    Opens a dump for reading bytes, decompressing it on the fly when its name ends in ``.gz``.
+    """
+    return gzip.open(path, 'rb') if str(path).endswith('.gz') else open(path, 'rb')
+
+
+def parse_dump_line(line, types=(EDITION_TYPE,)):
+    """
+    Turns one line of an OpenLibrary dump into the fields of a Book.
+
+    Both the tab separated dumps (type, key, revision, last modified, JSON record) and plain JSON
+    lines are read. Editions give their ISBN-13 or ISBN-10, normalised, and their page count;
+    works only have a title. The author is the first ``author_name`` when the record carries one,
+    else the ``by_statement`` of the edition, as the dumps only link authors by key.
+
+    Args:
+        line (bytes): The line, with or without its line break.
+        types (Iterable[str]): The record types to import.
+
+    Returns:
+        tuple | None: ``(catalogue_key, title, author, page_count, isbn)``, or None when the line
+            is of another type, is not valid JSON or has nothing to key the book by.
+    """
+    if line[:1] == b'{':
+        record_type, raw = None, line
+    else:
+        parts = line.split(b'\t', 4)
+        if len(parts) != 5:
+            return None
+        record_type, raw = parts[0].decode('utf-8', 'replace'), parts[4]
+        if record_type not in types:
+            return None
+    try:
+        record = json.loads(raw)
+    except ValueError:
+        return None
+    if not isinstance(record, dict):
+        return None
+    if record_type is None:
+        record_type = (record.get('type') or {}).get('key', EDITION_TYPE)
+        if record_type not in types:
+            return None
+
+    title = record.get('title')
+    if not isinstance(title, str) or not title.strip():
+        return None
+    title = title.strip()[:TITLE_MAX_LENGTH]
+    author_names = record.get('author_name')
+    author = author_names[0] if isinstance(author_names, list) and author_names else record.get('by_statement')
+    author = author.strip()[:AUTHOR_MAX_LENGTH] if isinstance(author, str) and author.strip() else None
+    isbn = None
+    for field in ISBN_FIELDS:
+        values = record.get(field) or ()
+        isbn = next(filter(None, map(normalise_isbn, [values] if isinstance(values, str) else values)), None)
+        if isbn:
+            break
+    page_count = record.get('number_of_pages') or record.get('number_of_pages_median')
+    if not isinstance(page_count, int) or page_count <= 0:
+        page_count = None
+    key = make_catalogue_key(isbn=isbn, title=title, author=author)
+    if key is None:
+        return None
+    return key, title, author, page_count, isbn
+
+
+def parse_dump_lines(lines, types=(EDITION_TYPE,)):
+    """
+    Parses a chunk of dump lines, keeping the first record of every catalogue key.
+
+    Returns:
+        tuple[list[tuple], int]: The parsed records and the number of lines skipped.
+    """
+    records = {}
+    skipped = 0
+    for line in lines:
+        record = parse_dump_line(line, types)
+        if record is None:
+            skipped += 1
+        elif record[0] not in records:
+            records[record[0]] = record
+    return list(records.values()), skipped
+
+
+class ImportResult:
+    """
+    Counts of a dump import.
+
+    Attributes:
+        lines (int): The number of lines read in this run.
+        books (int): The number of distinct books written, existing ones included.
+        skipped (int): The number of lines that were not books or could not be parsed.
+        offset (int): The byte offset of the uncompressed dump the import stopped at.
+        resumed_from (int): The byte offset the run started at.
+    """
+    __slots__ = ('lines', 'books', 'skipped', 'offset', 'resumed_from')
+
+    def __init__(self, resumed_from=0):
+        self.lines = 0
+        self.books = 0
+        self.skipped = 0
+        self.offset = resumed_from
+        self.resumed_from = resumed_from
+
+
+class CatalogueDumpImporter:
+    """
+    Streams an OpenLibrary dump into the Book catalogue.
+
+    The dump is read line by line, optionally parsed on a pool of worker processes, and written in
+    batches, so memory stays flat however large the dump is. Books are inserted with multi-row
+    ``INSERT ... ON CONFLICT`` statements on the unique catalogue key, built once per batch size:
+    ``bulk_create`` spends most of an import preparing each value. Books already in the catalogue
+    are left alone, or overwritten with ``update_existing``. Like ``bulk_create``, no signals are sent.
+
+    After every batch, the byte offset reached in the uncompressed dump is saved in a JobState row
+    in the same transaction as the books, so an interrupted import resumes after the last committed
+    batch. Gzipped dumps cannot seek, so resuming one decompresses and skips its first part.
+
+    Attributes:
+        batch_size (int): The number of lines parsed and written per transaction.
+        workers (int): The number of parsing processes; 0 parses in this process.
+        types (tuple[str]): The record types imported.
+        update_existing (bool): Overwrite the title, author, page count and ISBN of known books.
+    """
+    STATE_PREFIX = 'catalogue_import:'
+    INSERT_FIELDS = ('created', 'modified', 'book_id', 'title', 'author', 'page_count', 'isbn', 'catalogue_key')
+    UPDATE_FIELDS = ('title', 'author', 'page_count', 'isbn', 'modified')
+    # Rows per INSERT, keeping each statement well under PostgreSQL's 65535 parameters
+    INSERT_BATCH_SIZE = 2000
+
+    def __init__(self, batch_size=5000, workers=0, types=(EDITION_TYPE,), update_existing=False):
+        self.batch_size = batch_size
+        self.workers = workers
+        self.types = tuple(types)
+        self.update_existing = update_existing
+        self._statements = {}
+
+    def state_name(self, path):
+        return f"{self.STATE_PREFIX}{os.path.basename(path)}"[:JobState._meta.get_field('name').max_length]
+
+    def run(self, path, restart=False, max_lines=None):
+        """
+        Imports a dump, resuming from its checkpoint unless ``restart`` is set.
+
+        Args:
+            path (str): The path of the dump, gzipped or not.
+            restart (bool): Start from the beginning even when a checkpoint exists.
+            max_lines (int | None): Stop after about this many lines, at a batch boundary.
+
+        Returns:
+            ImportResult: The counts of this run.
+        """
+        name = self.state_name(path)
+        state, _ = JobState.objects.get_or_create(name=name)
+        if restart or state.run_started_at is None:
+            state.run_started_at = timezone.now()
+            state.cursor = None
+            state.save(update_fields=['run_started_at', 'cursor', 'modified'])
+        result = ImportResult(resumed_from=int(state.cursor or 0))
+        if result.resumed_from:
+            logger.info("Resuming the import of %s at byte %s", path, result.resumed_from)
+
+        with open_dump(path) as dump:
+            dump.seek(result.resumed_from)
+            for records, skipped, lines, offset in self._parsed_batches(dump, result.resumed_from, max_lines):
+                with transaction.atomic():
+                    self._write(records)
+                    JobState.objects.filter(name=name).update(cursor=str(offset), modified=timezone.now())
+                result.lines += lines
+                result.books += len(records)
+                result.skipped += skipped
+                result.offset = offset
+            finished = not dump.read(1)
+        if finished:
+            JobState.objects.filter(name=name).update(run_started_at=None, cursor=None,
+                                                      last_finished_at=timezone.now())
+        return result
+
+    def _batches(self, dump, offset, max_lines):
+        """
+        Yields ``(lines, end_offset)`` chunks of ``batch_size`` lines read from the dump.
+        """
+        lines = []
+        read = 0
+        for line in dump:
+            offset += len(line)
+            lines.append(line)
+            if len(lines) == self.batch_size:
+                read += len(lines)
+                yield lines, offset
+                lines = []
+                if max_lines is not None and read >= max_lines:
+                    return
+        if lines:
+            yield lines, offset
+
+    def _parsed_batches(self, dump, offset, max_lines):
+        """
+        Yields ``(records, skipped, lines, end_offset)`` per batch, in dump order.
+
+        With workers, at most two batches per worker are in flight, so a slow database holds back
+        the reading instead of letting parsed batches pile up.
+        """
+        if not self.workers:
+            for lines, end_offset in self._batches(dump, offset, max_lines):
+                yield (*parse_dump_lines(lines, self.types), len(lines), end_offset)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            pending = deque()
+            for lines, end_offset in self._batches(dump, offset, max_lines):
+                pending.append((pool.submit(parse_dump_lines, lines, self.types), len(lines), end_offset))
+                if len(pending) >= 2 * self.workers:
+                    future, count, batch_offset = pending.popleft()
+                    yield (*future.result(), count, batch_offset)
+            while pending:
+                future, count, batch_offset = pending.popleft()
+                yield (*future.result(), count, batch_offset)
+
+    def _write(self, records):
+        connection = connections[DEFAULT_DB_ALIAS]
+        fields = [Book._meta.get_field(name) for name in self.INSERT_FIELDS]
+        now = fields[0].get_db_prep_value(timezone.now(), connection)
+        pk = Book._meta.pk
+        rows = [(now, now, pk.get_db_prep_value(uuid.uuid4(), connection), title, author, page_count, isbn, key)
+                for key, title, author, page_count, isbn in records]
+        size = max(1, min(self.INSERT_BATCH_SIZE, connection.ops.bulk_batch_size(fields, rows)))
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), size):
+                chunk = rows[start:start + size]
+                cursor.execute(self._insert_sql(connection, len(chunk)), [value for row in chunk for value in row])
+
+    def _insert_sql(self, connection, rows):
+        """
+        Returns the statement inserting ``rows`` books, built once per number of rows.
+        """
+        statement = self._statements.get(rows)
+        if statement is not None:
+            return statement
+        quote = connection.ops.quote_name
+        columns = [Book._meta.get_field(name).column for name in self.INSERT_FIELDS]
+        if self.update_existing:
+            updates = ', '.join(f'{quote(column)} = EXCLUDED.{quote(column)}'
+                                for column in (Book._meta.get_field(name).column for name in self.UPDATE_FIELDS))
+            conflict = f'DO UPDATE SET {updates}'
+        else:
+            conflict = 'DO NOTHING'
+        values = ', '.join(['(' + ', '.join(['%s'] * len(columns)) + ')'] * rows)
+        statement = self._statements[rows] = (
+            f'INSERT INTO {quote(Book._meta.db_table)} ({", ".join(map(quote, columns))}) VALUES {values} '
+            f'ON CONFLICT ({quote(Book._meta.get_field("catalogue_key").column)}) {conflict}')
+        return statement
@@ -0,0 +1,165 @@
+import logging
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    A thread-safe circuit breaker driven by the error rate of a rolling time window.
+
+    While closed, every call is let through and its outcome counted in one second buckets. Once
+    at least ``min_calls`` calls of the last ``window`` seconds failed at ``failure_rate`` or more,
+    the circuit opens and calls fail fast for ``open_seconds``. It is then half-open: up to
+    ``half_open_probes`` calls are let through, and their outcome closes or reopens the circuit.
+    A probe that never reports back is given up on after another ``open_seconds``.
+
+    The state is kept per process, so each worker finds out about an outage on its own.
+
+    Attributes:
+        name (str): The name of the protected dependency, for logs.
+        window (int): Seconds of outcomes the error rate is computed over.
+        min_calls (int): The number of calls in the window below which the circuit stays closed.
+        failure_rate (float): The share of failed calls at which the circuit opens.
+        open_seconds (float): Seconds calls fail fast before the dependency is probed.
+        half_open_probes (int): The number of calls let through while half-open.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name='', window=30, min_calls=10, failure_rate=0.5, open_seconds=30, half_open_probes=1,
+                 clock=time.monotonic):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._clock = clock
+        self._lock = threading.Lock()
+        # [second, calls, failures] per second of the window, oldest first
+        self._buckets = deque()
+        self._state = self.CLOSED
+        self._changed_at = clock()
+        self._probes = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state(self._clock())
+
+    def allow_request(self):
+        """
+        Returns True when a call may be made; while half-open this takes one of the probe slots.
+        """
+        with self._lock:
+            now = self._clock()
+            state = self._current_state(now)
+            if state == self.CLOSED:
+                return True
+            if state == self.OPEN:
+                return False
+            if now - self._changed_at >= self.open_seconds:
+                # The probes were lost without an outcome, e.g. to an exception
+                self._changed_at = now
+                self._probes = 0
+            if self._probes >= self.half_open_probes:
+                return False
+            self._probes += 1
+            return True
+
+    def record_success(self):
+        with self._lock:
+            now = self._clock()
+            if self._current_state(now) == self.HALF_OPEN:
+                self._transition(self.CLOSED, now)
+            else:
+                self._count(now, failed=False)
+
+    def record_failure(self):
+        with self._lock:
+            now = self._clock()
+            state = self._current_state(now)
+            if state == self.HALF_OPEN:
+                self._transition(self.OPEN, now)
+            elif state == self.CLOSED:
+                calls, failures = self._count(now, failed=True)
+                if calls >= self.min_calls and failures >= self.failure_rate * calls:
+                    self._transition(self.OPEN, now)
+
+    def reset(self):
+        with self._lock:
+            self._transition(self.CLOSED, self._clock())
+
+    def snapshot(self):
+        """
+        Returns the state of the circuit and the calls and failures of the current window.
+        """
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            return {
+                'state': self._current_state(now),
+                'calls': sum(bucket[1] for bucket in self._buckets),
+                'failures': sum(bucket[2] for bucket in self._buckets),
+            }
+
+    def _current_state(self, now):
+        if self._state == self.OPEN and now - self._changed_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._changed_at = now
+            self._probes = 0
+        return self._state
+
+    def _transition(self, state, now):
+        if state != self._state:
+            logger.warning("Circuit %s is now %s", self.name, state)
+        self._state = state
+        self._changed_at = now
+        self._probes = 0
+        self._buckets.clear()
+
+    def _expire(self, now):
+        while self._buckets and self._buckets[0][0] <= int(now) - self.window:
+            self._buckets.popleft()
+
+    def _count(self, now, failed):
+        """
+        Counts one outcome and returns the calls and failures of the window.
+        """
+        second = int(now)
+        self._expire(now)
+        if not self._buckets or self._buckets[-1][0] != second:
+            self._buckets.append([second, 0, 0])
+        self._buckets[-1][1] += 1
+        self._buckets[-1][2] += failed
+        return sum(bucket[1] for bucket in self._buckets), sum(bucket[2] for bucket in self._buckets)
+
+
+_openlibrary_circuit_breaker = None
+_openlibrary_circuit_breaker_lock = threading.Lock()
+
+
+def get_openlibrary_circuit_breaker():
+    """
+    Returns the process wide CircuitBreaker configured by ``settings.OPENLIBRARY_CIRCUIT_BREAKER``.
+    """
+    global _openlibrary_circuit_breaker
+    if _openlibrary_circuit_breaker is None:
+        with _openlibrary_circuit_breaker_lock:
+            if _openlibrary_circuit_breaker is None:
+                options = getattr(settings, 'OPENLIBRARY_CIRCUIT_BREAKER', {})
+                _openlibrary_circuit_breaker = CircuitBreaker(
+                    name='openlibrary',
+                    window=options.get('WINDOW', 30),
+                    min_calls=options.get('MIN_CALLS', 10),
+                    failure_rate=options.get('FAILURE_RATE', 0.5),
+                    open_seconds=options.get('OPEN_SECONDS', 30),
+                    half_open_probes=options.get('HALF_OPEN_PROBES', 1),
+                )
+    return _openlibrary_circuit_breaker
@@ -0,0 +1,354 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+from collections import deque
+
+import aiohttp
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from services.metrics import record_http_call
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyStats:
+    """
+    Thread-safe latency recorder for outbound HTTP calls.
+
+    Keeps running totals plus a bounded window of recent samples used for percentiles.
+    """
+
+    def __init__(self, window=1024):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def record(self, seconds, ok=True, retries=0):
+        with self._lock:
+            self._samples.append(seconds)
+            self.calls += 1
+            self.errors += 0 if ok else 1
+            self.retries += retries
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+
+    def percentile(self, pct):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return 0.0
+        index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def snapshot(self):
+        """
+        Returns the recorded counters and the p50/p95/p99 latency in seconds.
+        """
+        with self._lock:
+            snapshot = {
+                'calls': self.calls,
+                'errors': self.errors,
+                'retries': self.retries,
+                'total_seconds': self.total_seconds,
+                'max_seconds': self.max_seconds,
+                'mean_seconds': self.total_seconds / self.calls if self.calls else 0.0,
+            }
+        for pct in (50, 95, 99):
+            snapshot[f'p{pct}_seconds'] = self.percentile(pct)
+        return snapshot
+
+
+class RetryPolicy:
+    """
+    Timeout, retry and latency bookkeeping shared by the sync and async HTTP clients.
+
+    Attributes:
+        max_retries (int): The number of retries after the first attempt.
+        stats (LatencyStats): Latency of every call, retries included.
+    """
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(self, pool_maxsize=10, connect_timeout=3.05, read_timeout=10, max_retries=2,
+                 backoff_factor=0.2, backoff_max=2.0):
+        self.pool_maxsize = pool_maxsize
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.stats = LatencyStats()
+
+    def backoff(self, attempt):
+        """
+        Returns the full-jitter delay in seconds before retry number ``attempt`` (starting at 0).
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff_factor * (2 ** attempt)))
+
+    def should_retry(self, status_code, attempt):
+        return status_code in self.RETRY_STATUSES and attempt < self.max_retries
+
+    @staticmethod
+    def remaining(deadline):
+        """
+        Returns the seconds left until a ``time.perf_counter()`` deadline, or None without one.
+        """
+        return None if deadline is None else deadline - time.perf_counter()
+
+    def cap_timeout(self, timeout, deadline):
+        """
+        Returns ``timeout`` cut to the seconds left until the deadline, if there is one.
+        """
+        if deadline is None:
+            return timeout
+        remaining = max(self.remaining(deadline), 0.001)
+        return remaining if timeout is None else min(timeout, remaining)
+
+    def has_budget(self, deadline, delay):
+        """
+        Returns True when another attempt can still start before the deadline after sleeping ``delay``.
+        """
+        return deadline is None or self.remaining(deadline) - delay > 0
+
+    def _record(self, started, ok, retries, url):
+        elapsed = time.perf_counter() - started
+        self.stats.record(elapsed, ok=ok, retries=retries)
+        record_http_call(elapsed)
+        logger.debug("GET %s took %.1f ms (ok=%s, retries=%s)", url, elapsed * 1000, ok, retries)
+
+
+class PooledHTTPClient(RetryPolicy):
+    """
+    A keep-alive HTTP client built on a pooled ``requests.Session``.
+
+    Every call is bounded by connect/read timeouts and retried a limited number of times with
+    full-jitter exponential backoff on connection errors, timeouts and retryable statuses.
+    The session is recreated after a fork so gunicorn workers never share sockets.
+
+    Attributes:
+        timeout (tuple): The ``(connect, read)`` timeout in seconds passed to requests.
+    """
+
+    def __init__(self, pool_maxsize=10, connect_timeout=3.05, read_timeout=10, max_retries=2,
+                 backoff_factor=0.2, backoff_max=2.0, pool_block=False):
+        super().__init__(pool_maxsize=pool_maxsize, connect_timeout=connect_timeout, read_timeout=read_timeout,
+                         max_retries=max_retries, backoff_factor=backoff_factor, backoff_max=backoff_max)
+        self.pool_block = pool_block
+        self.timeout = (connect_timeout, read_timeout)
+        self._session = None
+        self._session_pid = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """
+        Returns the session of the current process, creating it on first use.
+        """
+        pid = os.getpid()
+        if self._session is None or self._session_pid != pid:
+            with self._session_lock:
+                if self._session is None or self._session_pid != pid:
+                    self._session = self._build_session()
+                    self._session_pid = pid
+        return self._session
+
+    def _build_session(self):
+        session = requests.Session()
+        # Retries are handled in ``request`` so they can be jittered and counted
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_maxsize,
+                              pool_block=self.pool_block, max_retries=0)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def request(self, method, url, budget=None, **kwargs):
+        """
+        Sends a request, retrying transient failures.
+
+        With a ``budget``, the timeouts of every attempt are cut to the time left and no retry is
+        started that could not begin before it runs out. requests applies the read timeout to each
+        read of the socket, so a body trickling in can still take longer than the budget.
+
+        Args:
+            method (str): The HTTP method.
+            url (str): The URL to call.
+            budget (float | None): Seconds the call may take, retries and backoff included.
+            **kwargs: Passed on to ``requests.Session.request``.
+
+        Returns:
+            requests.Response: The last response received. Retryable statuses are returned
+                once the retries are used up.
+
+        Raises:
+            requests.RequestException: When the last attempt failed without a response.
+        """
+        timeout = kwargs.pop('timeout', self.timeout)
+        if not isinstance(timeout, tuple):
+            timeout = (timeout, timeout)
+        started = time.perf_counter()
+        deadline = None if budget is None else started + budget
+        attempt = 0
+        while True:
+            kwargs['timeout'] = tuple(self.cap_timeout(value, deadline) for value in timeout)
+            delay = self.backoff(attempt)
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries or not self.has_budget(deadline, delay):
+                    self._record(started, ok=False, retries=attempt, url=url)
+                    raise
+            else:
+                if not (self.should_retry(response.status_code, attempt) and self.has_budget(deadline, delay)):
+                    self._record(started, ok=response.ok, retries=attempt, url=url)
+                    return response
+                response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+class AsyncPooledHTTPClient(RetryPolicy):
+    """
+    The asyncio counterpart of PooledHTTPClient, built on ``aiohttp.ClientSession``.
+
+    aiohttp sessions are bound to the event loop they were created on, so one session is kept per
+    running loop. Under ASGI that is a single session per worker process.
+    """
+
+    def __init__(self, pool_maxsize=100, connect_timeout=3.05, read_timeout=10, max_retries=2,
+                 backoff_factor=0.2, backoff_max=2.0):
+        super().__init__(pool_maxsize=pool_maxsize, connect_timeout=connect_timeout, read_timeout=read_timeout,
+                         max_retries=max_retries, backoff_factor=backoff_factor, backoff_max=backoff_max)
+        self._sessions = weakref.WeakKeyDictionary()
+
+    @property
+    def session(self):
+        """
+        Returns the session of the running event loop, creating it on first use.
+        """
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_maxsize),
+                timeout=aiohttp.ClientTimeout(connect=self.connect_timeout, sock_read=self.read_timeout),
+            )
+            self._sessions[loop] = session
+        return session
+
+    async def request(self, method, url, budget=None, **kwargs):
+        """
+        Sends a request, retrying transient failures.
+
+        The body is read before returning so the connection goes straight back to the pool;
+        ``await response.json()`` works on the returned response.
+
+        Args:
+            method (str): The HTTP method.
+            url (str): The URL to call.
+            budget (float | None): Seconds the call may take, retries and backoff included. Unlike
+                the sync client, each attempt is bounded as a whole, body included.
+            **kwargs: Passed on to ``aiohttp.ClientSession.request``.
+
+        Returns:
+            aiohttp.ClientResponse: The last response received.
+
+        Raises:
+            aiohttp.ClientError | asyncio.TimeoutError: When the last attempt failed without a response.
+        """
+        started = time.perf_counter()
+        deadline = None if budget is None else started + budget
+        attempt = 0
+        while True:
+            if deadline is not None:
+                kwargs['timeout'] = aiohttp.ClientTimeout(total=self.cap_timeout(None, deadline),
+                                                          connect=self.cap_timeout(self.connect_timeout, deadline),
+                                                          sock_read=self.cap_timeout(self.read_timeout, deadline))
+            delay = self.backoff(attempt)
+            try:
+                async with self.session.request(method, url, **kwargs) as response:
+                    await response.read()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt >= self.max_retries or not self.has_budget(deadline, delay):
+                    self._record(started, ok=False, retries=attempt, url=url)
+                    raise
+            else:
+                if not (self.should_retry(response.status, attempt) and self.has_budget(deadline, delay)):
+                    self._record(started, ok=response.ok, retries=attempt, url=url)
+                    return response
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def get(self, url, **kwargs):
+        return await self.request('GET', url, **kwargs)
+
+    async def aclose(self):
+        """
+        Closes the session of the running event loop.
+        """
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.close()
+
+
+_http_client = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """
+    Returns the process wide PooledHTTPClient configured by ``settings.OPENLIBRARY_HTTP_CLIENT``.
+    """
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                options = getattr(settings, 'OPENLIBRARY_HTTP_CLIENT', {})
+                _http_client = PooledHTTPClient(
+                    pool_maxsize=options.get('POOL_MAXSIZE', 10),
+                    connect_timeout=options.get('CONNECT_TIMEOUT', 3.05),
+                    read_timeout=options.get('READ_TIMEOUT', 10),
+                    max_retries=options.get('MAX_RETRIES', 2),
+                    backoff_factor=options.get('BACKOFF_FACTOR', 0.2),
+                    backoff_max=options.get('BACKOFF_MAX', 2.0),
+                )
+    return _http_client
+
+
+_async_http_client = None
+
+
+def get_async_http_client():
+    """
+    Returns the process wide AsyncPooledHTTPClient configured by ``settings.OPENLIBRARY_HTTP_CLIENT``.
+    """
+    global _async_http_client
+    if _async_http_client is None:
+        with _http_client_lock:
+            if _async_http_client is None:
+                options = getattr(settings, 'OPENLIBRARY_HTTP_CLIENT', {})
+                _async_http_client = AsyncPooledHTTPClient(
+                    pool_maxsize=options.get('ASYNC_POOL_MAXSIZE', 100),
+                    connect_timeout=options.get('CONNECT_TIMEOUT', 3.05),
+                    read_timeout=options.get('READ_TIMEOUT', 10),
+                    max_retries=options.get('MAX_RETRIES', 2),
+                    backoff_factor=options.get('BACKOFF_FACTOR', 0.2),
+                    backoff_max=options.get('BACKOFF_MAX', 2.0),
+                )
+    return _async_http_client
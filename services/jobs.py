@@ -0,0 +1,132 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from rental.models import JobState
+
+logger = logging.getLogger(__name__)
+
+
+class JobRunner:
+    """
+    Runs periodic jobs in batches, with their progress checkpointed in the database.
+
+    A job is any object with a ``name``, an ``interval`` in seconds and a
+    ``run_batch(as_of, cursor)`` method that does one batch of work as of ``as_of``, starting after
+    ``cursor``, and returns the cursor to continue from, or None once the run is complete. Each
+    batch and its checkpoint commit together, so a run interrupted at any point resumes after the
+    last committed batch, with the same ``as_of``, and no batch is applied twice.
+
+    Several runners may share a database: a runner holds a job through a lease renewed at every
+    checkpoint, and takes over the job of a runner that died once its lease expires.
+
+    Attributes:
+        jobs (list): The jobs to run.
+        lease_seconds (int): How long a job stays held after each checkpoint.
+    """
+
+    def __init__(self, jobs, lease_seconds=300):
+        self.jobs = list(jobs)
+        self.lease_seconds = lease_seconds
+        self.stopping = False
+
+    def stop(self):
+        """
+        Makes the runner stop after the batch in progress.
+        """
+        self.stopping = True
+
+    def run_pending(self):
+        """
+        Runs or resumes every job that is due.
+
+        Returns:
+            list[str]: The names of the jobs that ran to completion.
+        """
+        finished = []
+        for job in self.jobs:
+            if self.stopping:
+                break
+            if self.run(job):
+                finished.append(job.name)
+        return finished
+
+    def run_forever(self, poll_interval=30):
+        """
+        Runs due jobs until ``stop`` is called.
+        """
+        while not self.stopping:
+            self.run_pending()
+            deadline = time.monotonic() + poll_interval
+            while not self.stopping and time.monotonic() < deadline:
+                time.sleep(min(1.0, poll_interval))
+
+    def run(self, job, force=False):
+        """
+        Runs or resumes one job, batch after batch, unless it is not due or held by another runner.
+
+        Args:
+            job: The job to run.
+            force (bool): Start a new run even if the interval since the last one has not passed.
+
+        Returns:
+            bool: True when the run completed.
+        """
+        state = self._claim(job, force)
+        if state is None:
+            return False
+        logger.info("Running %s as of %s%s", job.name, state.run_started_at,
+                    " from its checkpoint" if state.cursor else "")
+        cursor = state.cursor
+        while True:
+            with transaction.atomic():
+                cursor = job.run_batch(state.run_started_at, cursor)
+                if cursor is None:
+                    JobState.objects.filter(name=job.name).update(run_started_at=None, cursor=None, lease_until=None,
+                                                                  last_finished_at=timezone.now())
+                    logger.info("Finished %s", job.name)
+                    return True
+                JobState.objects.filter(name=job.name).update(cursor=cursor, lease_until=self._lease_until())
+            if self.stopping:
+                # Let the next runner resume from the checkpoint straight away
+                JobState.objects.filter(name=job.name).update(lease_until=None)
+                logger.info("Stopped %s at its checkpoint", job.name)
+                return False
+
+    def _lease_until(self):
+        return timezone.now() + timedelta(seconds=self.lease_seconds)
+
+    def _claim(self, job, force):
+        """
+        Takes the lease of a job that is due, starting a new run unless one is in progress.
+
+        Returns:
+            JobState | None: The state of the claimed job, or None when it is not to run now.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            JobState.objects.get_or_create(name=job.name)
+            state = JobState.objects.select_for_update().get(name=job.name)
+            if state.lease_until is not None and state.lease_until > now:
+                return None
+            if state.run_started_at is None:
+                if (not force and state.last_finished_at is not None
+                        and state.last_finished_at + timedelta(seconds=job.interval) > now):
+                    return None
+                state.run_started_at = now
+                state.cursor = None
+            state.lease_until = self._lease_until()
+            state.save(update_fields=['run_started_at', 'cursor', 'lease_until', 'modified'])
+        return state
+
+
+def get_job_runner(jobs):
+    """
+    Returns a JobRunner for ``jobs`` configured by the ``JOB_RUNNER`` setting.
+    """
+    config = getattr(settings, 'JOB_RUNNER', {})
+    return JobRunner(jobs, lease_seconds=config.get('LEASE_SECONDS', 300))
@@ -0,0 +1,307 @@
+import datetime
+import logging
+import secrets
+from contextlib import contextmanager
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from rental.models import Book, Rental, StudentRentalSummary
+from rental.utils import isbn10_to_isbn13
+from services.book_rental_service import OpenLibraryBookRentalService
+from services.pricing import BulkFeeEngine
+from student.models import Student
+
+logger = logging.getLogger(__name__)
+
+TITLE_WORDS = (
+    "shadow river empire night garden winter summer king queen city house sea star light stone fire "
+    "silent lost last first hidden golden broken secret wild dark bright distant forgotten little great "
+    "journey kingdom island forest mountain storm dream war peace heart song letter road tower"
+).split()
+FIRST_NAMES = "Ada Ben Chloe David Emma Felix Grace Hugo Iris Jack Kira Liam Maya Noah Olive Paul Quinn Rosa".split()
+LAST_NAMES = "Adams Baker Clark Diaz Evans Fisher Garcia Hughes Ito Jones Khan Lopez Moore Nguyen Okafor Patel".split()
+
+
+def zipf_weights(count, exponent):
+    """
+    Returns normalised Zipf weights, so a few items get most of the picks.
+    """
+    weights = np.arange(1, count + 1, dtype=np.float64) ** -exponent
+    return weights / weights.sum()
+
+
+@contextmanager
+def preserve_timestamps(*models):
+    """
+    Lets ``bulk_create`` write the given ``created`` and ``modified`` values instead of the current time.
+    """
+    fields = []
+    for model in models:
+        fields.append((model._meta.get_field('created'), 'auto_now_add'))
+        fields.append((model._meta.get_field('modified'), 'auto_now'))
+    saved = [(field, attribute, getattr(field, attribute)) for field, attribute in fields]
+    try:
+        for field, attribute, _ in saved:
+            setattr(field, attribute, False)
+        yield
+    finally:
+        for field, attribute, value in saved:
+            setattr(field, attribute, value)
+
+
+class GenerateResult:
+    """
+    Counts of a data generation run.
+
+    Attributes:
+        students (int): The number of students created.
+        books (int): The number of books created.
+        rentals (int): The number of rentals created.
+    """
+    __slots__ = ('students', 'books', 'rentals')
+
+    def __init__(self):
+        self.students = 0
+        self.books = 0
+        self.rentals = 0
+
+
+class SyntheticDataGenerator:
+    """
+    Fills the database with realistic students, books and rentals for load and scale testing.
+
+    Rows are built with NumPy in chunks and inserted with ``bulk_create``; each chunk is its own
+    transaction. Book popularity and student activity follow Zipf distributions, rental lengths
+    mix short, long and overdue rentals, and fees are priced with ``BulkFeeEngine``. Rentals past
+    their return date are returned on it, except ``OVERDUE_SHARE`` of them. Every student shares
+    one password hash. The rental summaries of the students are tallied alongside and inserted last.
+
+    Attributes:
+        chunk_size (int): The number of rows built and inserted at a time.
+        tag (str): Prefix of the generated usernames and emails, so repeated runs do not collide.
+        password (str): The password of every generated student.
+        rng (numpy.random.Generator): The random number generator; seed it for repeatable data.
+        now (datetime): The time rentals are generated relative to.
+    """
+    BOOK_POPULARITY_EXPONENT = 1.1
+    STUDENT_ACTIVITY_EXPONENT = 0.7
+    HISTORY_DAYS = 365
+    # Share of the rentals past their return date whose book never came back
+    OVERDUE_SHARE = 0.05
+
+    def __init__(self, chunk_size=5000, tag=None, password='password', seed=None, now=None):
+        self.chunk_size = chunk_size
+        self.tag = tag or secrets.token_hex(3)
+        self.password = password
+        self.rng = np.random.default_rng(seed)
+        self.now = now or timezone.now()
+        self.fee_engine = BulkFeeEngine(cost_per_page=OpenLibraryBookRentalService.COST_PER_PAGE)
+
+    def generate(self, students, books, rentals):
+        """
+        Creates the students, then the books, then the rentals between them.
+
+        Foreign key checks are switched off for the run where the database allows it (SQLite);
+        every rental references a row created earlier in the run, so they cannot be violated.
+
+        Args:
+            students (int): The number of students to create.
+            books (int): The number of books to create.
+            rentals (int): The number of rentals to create; needs at least one student and book.
+
+        Returns:
+            GenerateResult: The counts of the run.
+        """
+        result = GenerateResult()
+        with connection.constraint_checks_disabled(), preserve_timestamps(Student, Book, Rental):
+            student_ids = self.create_students(students)
+            result.students = len(student_ids)
+            book_ids, page_counts = self.create_books(books)
+            result.books = len(book_ids)
+            summaries = RentalTally(len(student_ids))
+            if rentals and student_ids and book_ids:
+                result.rentals = self.create_rentals(rentals, student_ids, book_ids, page_counts, summaries)
+            self.create_summaries(student_ids, summaries)
+        return result
+
+    @contextmanager
+    def _chunk_transaction(self):
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # Losing the last chunks on a crash is fine for generated data
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL synchronous_commit TO OFF')
+            yield
+
+    def _past_datetimes(self, count, days):
+        seconds = self.rng.integers(0, days * 24 * 60 * 60, size=count)
+        return [self.now - datetime.timedelta(seconds=int(offset)) for offset in seconds]
+
+    def create_students(self, count):
+        """
+        Creates ``count`` students with one shared password hash.
+
+        Returns:
+            list[UUID]: The student_id of each student.
+        """
+        password = make_password(self.password)
+        student_ids = []
+        for start in range(0, count, self.chunk_size):
+            size = min(self.chunk_size, count - start)
+            first_names = self.rng.choice(FIRST_NAMES, size=size)
+            last_names = self.rng.choice(LAST_NAMES, size=size)
+            joined = self._past_datetimes(size, self.HISTORY_DAYS * 3)
+            students = [
+                Student(username=f'{self.tag}-student{start + index}',
+                        email=f'{self.tag}-student{start + index}@load.bookflow.com',
+                        first_name=str(first_name), last_name=str(last_name), password=password,
+                        is_active=True, date_joined=date, created=date, modified=date)
+                for index, (first_name, last_name, date) in enumerate(zip(first_names, last_names, joined))
+            ]
+            with self._chunk_transaction():
+                Student.objects.bulk_create(students)
+            student_ids.extend(student.student_id for student in students)
+            logger.info("Created %s students", len(student_ids))
+        return student_ids
+
+    def create_books(self, count):
+        """
+        Creates ``count`` books with valid, random ISBNs.
+
+        Books whose ISBN is already in the catalogue are not inserted; the existing book is used.
+
+        Returns:
+            tuple[list[UUID], numpy.ndarray]: The book_id and page count of each book.
+        """
+        authors = [f"{first} {last}" for first in FIRST_NAMES for last in LAST_NAMES]
+        book_ids, page_counts = [], []
+        for start in range(0, count, self.chunk_size):
+            size = min(self.chunk_size, count - start)
+            numbers = np.unique(self.rng.integers(0, 10 ** 9, size=size))
+            pages = np.clip(self.rng.lognormal(mean=np.log(300), sigma=0.5, size=len(numbers)), 24, 1500)
+            words = self.rng.choice(TITLE_WORDS, size=(len(numbers), 3))
+            author_picks = self.rng.choice(len(authors), size=len(numbers), p=zipf_weights(len(authors), 0.8))
+            created = self._past_datetimes(len(numbers), self.HISTORY_DAYS * 2)
+
+            books = []
+            for number, page_count, title_words, author, date in zip(numbers.tolist(), pages.astype(int).tolist(),
+                                                                     words, author_picks.tolist(), created):
+                isbn = isbn10_to_isbn13(f'{number:09d}')
+                books.append(Book(title=' '.join(title_words).title(), author=authors[author],
+                                  page_count=page_count, isbn=isbn, catalogue_key=f'isbn:{isbn}',
+                                  created=date, modified=date))
+            with self._chunk_transaction():
+                Book.objects.bulk_create(books, ignore_conflicts=True)
+                # Read the ids back, as a book may already have been in the catalogue
+                stored = dict(Book.objects.filter(catalogue_key__in=[book.catalogue_key for book in books])
+                              .values_list('catalogue_key', 'book_id'))
+            book_ids.extend(stored[book.catalogue_key] for book in books)
+            page_counts.extend(book.page_count for book in books)
+            logger.info("Created %s books", len(book_ids))
+        return book_ids, np.array(page_counts, dtype=np.int64)
+
+    def rental_durations(self, count):
+        """
+        Draws rental lengths: mostly within the free first month, some paid, a few very long.
+
+        Returns:
+            numpy.ndarray: The length of each rental in seconds.
+        """
+        kind = self.rng.choice(3, size=count, p=[0.6, 0.3, 0.1])
+        low = np.array([7, 31, 91])[kind]
+        high = np.array([30, 90, 180])[kind]
+        return self.rng.integers(low * 86400, high * 86400 + 1)
+
+    def create_rentals(self, count, student_ids, book_ids, page_counts, summaries=None):
+        """
+        Creates ``count`` rentals of popular books by active students.
+
+        Args:
+            summaries (RentalTally | None): Tallies the rentals of each student when given.
+
+        Returns:
+            int: The number of rentals created.
+        """
+        # Shuffle so the popular books and students are not the first ones created
+        book_order = self.rng.permutation(len(book_ids))
+        student_order = self.rng.permutation(len(student_ids))
+        book_weights = zipf_weights(len(book_ids), self.BOOK_POPULARITY_EXPONENT)
+        student_weights = zipf_weights(len(student_ids), self.STUDENT_ACTIVITY_EXPONENT)
+        now = np.datetime64(self.now.replace(tzinfo=None), 'us')
+        fees = {}
+
+        created_count = 0
+        for start in range(0, count, self.chunk_size):
+            size = min(self.chunk_size, count - start)
+            books = book_order[self.rng.choice(len(book_ids), size=size, p=book_weights)]
+            students = student_order[self.rng.choice(len(student_ids), size=size, p=student_weights)]
+            created = now - self.rng.integers(0, self.HISTORY_DAYS * 86400, size=size).astype('timedelta64[s]')
+            return_dates = created + self.rental_durations(size).astype('timedelta64[s]')
+            cents = self.fee_engine.fee_cents(page_counts[books], created, return_dates)
+            returned = (return_dates < now) & (self.rng.random(size) >= self.OVERDUE_SHARE)
+
+            rentals = []
+            for student, book, rented, due, is_returned, fee in zip(students.tolist(), books.tolist(),
+                                                                    created.tolist(), return_dates.tolist(),
+                                                                    returned.tolist(), cents.tolist()):
+                if fee not in fees:
+                    fees[fee] = Decimal(fee).scaleb(-2)
+                rented = rented.replace(tzinfo=datetime.timezone.utc)
+                due = due.replace(tzinfo=datetime.timezone.utc)
+                rentals.append(Rental(student_id_id=student_ids[student], book_id_id=book_ids[book],
+                                      return_date=due, returned_at=due if is_returned else None,
+                                      fee_amount=fees[fee], created=rented, modified=rented))
+            with self._chunk_transaction():
+                Rental.objects.bulk_create(rentals)
+            if summaries is not None:
+                summaries.add(students, ~returned, cents, created)
+            created_count += len(rentals)
+            logger.info("Created %s rentals", created_count)
+        return created_count
+
+    def create_summaries(self, student_ids, summaries):
+        """
+        Inserts the rental summary of every student from their tally.
+        """
+        for start in range(0, len(student_ids), self.chunk_size):
+            rows = [StudentRentalSummary(student_id_id=student_id, **summaries.values(start + index))
+                    for index, student_id in enumerate(student_ids[start:start + self.chunk_size])]
+            with self._chunk_transaction():
+                StudentRentalSummary.objects.bulk_create(rows)
+        logger.info("Created %s rental summaries", len(student_ids))
+
+
+class RentalTally:
+    """
+    Per-student totals of generated rentals, in NumPy arrays indexed like the student ids.
+    """
+
+    def __init__(self, count):
+        self.active = np.zeros(count, dtype=np.int64)
+        self.total = np.zeros(count, dtype=np.int64)
+        self.fee_cents = np.zeros(count, dtype=np.int64)
+        self.last_rented = np.full(count, np.iinfo(np.int64).min, dtype=np.int64)
+
+    def add(self, students, active, fee_cents, created):
+        """
+        Adds a chunk of rentals, given as arrays of student index, active flag, fee and creation time.
+        """
+        self.total += np.bincount(students, minlength=len(self.total))
+        self.active += np.bincount(students, weights=active, minlength=len(self.active)).astype(np.int64)
+        np.add.at(self.fee_cents, students, np.asarray(fee_cents, dtype=np.int64))
+        np.maximum.at(self.last_rented, students, created.astype('datetime64[us]').astype(np.int64))
+
+    def values(self, index):
+        """
+        Returns the StudentRentalSummary fields of the student at ``index``.
+        """
+        last_rented = None
+        if self.total[index]:
+            last_rented = (np.datetime64(int(self.last_rented[index]), 'us').item()
+                           .replace(tzinfo=datetime.timezone.utc))
+        return {'active_rentals': int(self.active[index]), 'total_rentals': int(self.total[index]),
+                'outstanding_fees': Decimal(int(self.fee_cents[index])).scaleb(-2), 'last_rented_at': last_rented}
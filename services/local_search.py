@@ -0,0 +1,156 @@
+import threading
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db import connection
+from django.db.models import Q
+
+from rental.models import Book
+from rental.utils import make_catalogue_key, normalise_isbn, normalise_text
+from services.search_docs import SearchDoc
+
+# Created by the 0006_book_search_index migration
+SQLITE_FTS_TABLE = 'book_fts'
+
+
+def book_search_vector():
+    """
+    Returns the tsvector searched on PostgreSQL; the GIN index of the 0006_book_search_index migration
+    is built on this exact expression.
+    """
+    return SearchVector('title', 'author', config='simple')
+
+
+def book_to_doc(book):
+    """
+    Renders a book in the shape of an OpenLibrary search doc, so templates treat both alike.
+    """
+    return SearchDoc(book.title, [book.author] if book.author else [], book.page_count,
+                     [book.isbn] if book.isbn else [], source='local')
+
+
+def doc_catalogue_keys(doc):
+    """
+    Returns the catalogue keys an OpenLibrary search doc could be stored under.
+    """
+    keys = {make_catalogue_key(isbn=isbn) for isbn in doc.get('isbn') or []}
+    authors = doc.get('author_name') or [None]
+    keys.add(make_catalogue_key(title=doc.get('title'), author=authors[0]))
+    keys.discard(None)
+    return keys
+
+
+class LocalBookSearch:
+    """
+    Searches the books already in the catalogue.
+
+    Every word of the query must be the prefix of a word in the title, author or ISBN of a book.
+    Matches are ranked by relevance, with title matches ahead of author matches.
+
+    Attributes:
+        limit (int): The maximum number of books returned.
+        min_results (int): Searches with fewer local matches than this are also sent upstream.
+    """
+
+    def __init__(self, limit=20, min_results=5):
+        self.limit = limit
+        self.min_results = min_results
+
+    @staticmethod
+    def tokenize(query):
+        return normalise_text(query).split()
+
+    def search(self, query):
+        """
+        Returns the books matching a search query, best match first.
+
+        Args:
+            query (str): The words to search for, or an ISBN.
+
+        Returns:
+            list[Book]: At most ``limit`` books.
+        """
+        isbn = normalise_isbn(query)
+        if isbn is not None:
+            return list(Book.objects.filter(catalogue_key=f'isbn:{isbn}'))
+
+        tokens = self.tokenize(query)
+        if not tokens:
+            return []
+        if connection.vendor == 'postgresql':
+            return self._search_postgresql(query, tokens)
+        if connection.vendor == 'sqlite':
+            return self._search_sqlite(tokens)
+        return self._search_fallback(tokens)
+
+    def search_docs(self, query):
+        """
+        Returns the books matching a search query as OpenLibrary style search docs.
+        """
+        return [book_to_doc(book) for book in self.search(query)]
+
+    def _search_postgresql(self, query, tokens):
+        # Tokens only hold word characters, so they are safe to splice into a raw tsquery
+        search_query = SearchQuery(' & '.join(f'{token}:*' for token in tokens), config='simple',
+                                   search_type='raw')
+        vector = book_search_vector()
+        return list(Book.objects.annotate(search=vector)
+                    .filter(search=search_query)
+                    .annotate(rank=SearchRank(vector, search_query) + TrigramSimilarity('title', query))
+                    .order_by('-rank')[:self.limit])
+
+    def _search_sqlite(self, tokens):
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        table = Book._meta.db_table
+        # bm25 is lower for better matches; title matches weigh more than author or ISBN matches
+        return list(Book.objects.raw(
+            f'SELECT "{table}".* FROM {SQLITE_FTS_TABLE} '
+            f'JOIN "{table}" ON "{table}".rowid = {SQLITE_FTS_TABLE}.rowid '
+            f'WHERE {SQLITE_FTS_TABLE} MATCH %s ORDER BY bm25({SQLITE_FTS_TABLE}, 10.0, 5.0, 1.0) LIMIT %s',
+            [match, self.limit],
+        ))
+
+    def _search_fallback(self, tokens):
+        books = Book.objects.all()
+        for token in tokens:
+            books = books.filter(Q(title__icontains=token) | Q(author__icontains=token))
+        return list(books.order_by('title')[:self.limit])
+
+    def merge(self, local_docs, upstream_docs):
+        """
+        Merges local and upstream search docs into one ranked list.
+
+        Local matches come first in their rank order, followed by the upstream docs for books that
+        are not already in the catalogue, in upstream order.
+
+        Args:
+            local_docs (list[SearchDoc]): The docs returned by ``search_docs``.
+            upstream_docs (list[SearchDoc]): The docs returned by OpenLibrary.
+
+        Returns:
+            list[SearchDoc]: The merged docs.
+        """
+        if not local_docs:
+            return upstream_docs
+        seen = set()
+        for doc in local_docs:
+            seen |= doc_catalogue_keys(doc)
+        return local_docs + [doc for doc in upstream_docs if not doc_catalogue_keys(doc) & seen]
+
+
+_local_search = None
+_local_search_lock = threading.Lock()
+
+
+def get_local_book_search():
+    """
+    Returns the process wide LocalBookSearch configured by ``settings.BOOK_LOCAL_SEARCH``.
+    """
+    global _local_search
+    if _local_search is None:
+        with _local_search_lock:
+            if _local_search is None:
+                options = getattr(settings, 'BOOK_LOCAL_SEARCH', {})
+                _local_search = LocalBookSearch(limit=options.get('LIMIT', 20),
+                                                min_results=options.get('MIN_RESULTS', 5))
+    return _local_search
@@ -0,0 +1,253 @@
+import bisect
+import contextvars
+import threading
+import time
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates
+
+# Upper bounds in seconds, from a fast cached page to an upstream timeout
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+_current_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """
+    Time spent by one request in the database, in OpenLibrary calls and in template rendering.
+
+    The timings of the request being handled are reachable through ``current_timings``; the
+    context variable holding them follows the request into ``sync_to_async`` threads and tasks.
+
+    Attributes:
+        db_queries (int): The number of database queries run.
+        db_seconds (float): The time spent running them.
+        http_calls (int): The number of outbound HTTP calls made.
+        http_seconds (float): The time spent in them, retries included.
+        render_seconds (float): The time spent rendering templates.
+    """
+    __slots__ = ('db_queries', 'db_seconds', 'http_calls', 'http_seconds', 'render_seconds')
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.http_calls = 0
+        self.http_seconds = 0.0
+        self.render_seconds = 0.0
+
+    def server_timing(self, total_seconds):
+        """
+        Returns the value of the ``Server-Timing`` header for these timings.
+        """
+        return ', '.join([
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.db_queries} queries"',
+            f'http;dur={self.http_seconds * 1000:.1f};desc="{self.http_calls} OpenLibrary calls"',
+            f'render;dur={self.render_seconds * 1000:.1f}',
+            f'total;dur={total_seconds * 1000:.1f}',
+        ])
+
+
+def current_timings():
+    """
+    Returns the RequestTimings of the request being handled, or None outside a request.
+    """
+    return _current_timings.get()
+
+
+def start_request_timings():
+    """
+    Starts collecting timings for a request.
+
+    Returns:
+        tuple: The new RequestTimings and the token to pass to ``stop_request_timings``.
+    """
+    timings = RequestTimings()
+    return timings, _current_timings.set(timings)
+
+
+def stop_request_timings(token):
+    _current_timings.reset(token)
+
+
+def record_http_call(seconds):
+    """
+    Adds an outbound HTTP call to the timings of the current request, if any.
+    """
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.http_calls += 1
+        timings.http_seconds += seconds
+
+
+def time_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper adding every query to the timings of the current request, if any.
+    """
+    timings = _current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db_queries += 1
+        timings.db_seconds += time.perf_counter() - started
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+class TimedTemplate:
+    """
+    Wraps a template of the Django backend to add its render time to the current request.
+    """
+
+    def __init__(self, template):
+        self.template = template
+
+    def render(self, context=None, request=None):
+        timings = _current_timings.get()
+        if timings is None:
+            return self.template.render(context, request)
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            timings.render_seconds += time.perf_counter() - started
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    The Django template backend, with render times recorded in the request timings.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+class Histogram:
+    """
+    A Prometheus style cumulative histogram.
+
+    Attributes:
+        buckets (tuple): The upper bound of each bucket, ascending.
+        counts (list[int]): The number of observations in each bucket, plus one for +Inf.
+        sum (float): The sum of all observations.
+        count (int): The number of observations.
+    """
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Aggregates request timings per view name in this process and renders them for Prometheus.
+
+    Every worker process keeps its own registry; scrape each worker, or run one worker per
+    container, to see all requests.
+    """
+    HISTOGRAMS = {
+        'bookflow_request_duration_seconds': ("Wall time of the request.", DURATION_BUCKETS),
+        'bookflow_request_db_seconds': ("Time spent in database queries.", DURATION_BUCKETS),
+        'bookflow_request_db_queries': ("Database queries run by the request.", QUERY_COUNT_BUCKETS),
+        'bookflow_request_http_seconds': ("Time spent calling OpenLibrary.", DURATION_BUCKETS),
+        'bookflow_request_render_seconds': ("Time spent rendering templates.", DURATION_BUCKETS),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {name: {} for name in self.HISTOGRAMS}
+        self._requests = {}
+
+    def observe(self, view, status_code, total_seconds, timings):
+        """
+        Records one finished request.
+        """
+        values = {
+            'bookflow_request_duration_seconds': total_seconds,
+            'bookflow_request_db_seconds': timings.db_seconds,
+            'bookflow_request_db_queries': timings.db_queries,
+            'bookflow_request_http_seconds': timings.http_seconds,
+            'bookflow_request_render_seconds': timings.render_seconds,
+        }
+        status = f'{status_code // 100}xx'
+        with self._lock:
+            for name, value in values.items():
+                histogram = self._histograms[name].get(view)
+                if histogram is None:
+                    histogram = self._histograms[name][view] = Histogram(self.HISTOGRAMS[name][1])
+                histogram.observe(value)
+            self._requests[view, status] = self._requests.get((view, status), 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._histograms = {name: {} for name in self.HISTOGRAMS}
+            self._requests = {}
+
+    @staticmethod
+    def _label(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    def render(self):
+        """
+        Returns the metrics in the Prometheus text exposition format.
+        """
+        lines = ['# HELP bookflow_requests_total Requests handled, by view and status class.',
+                 '# TYPE bookflow_requests_total counter']
+        with self._lock:
+            for (view, status), count in sorted(self._requests.items()):
+                lines.append(f'bookflow_requests_total{{view="{self._label(view)}",status="{status}"}} {count}')
+            for name, (description, buckets) in self.HISTOGRAMS.items():
+                lines.append(f'# HELP {name} {description}')
+                lines.append(f'# TYPE {name} histogram')
+                for view, histogram in sorted(self._histograms[name].items()):
+                    label = f'view="{self._label(view)}"'
+                    cumulative = 0
+                    for bound, count in zip(buckets + ('+Inf',), histogram.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{{label},le="{bound}"}} {cumulative}')
+                    lines.append(f'{name}_sum{{{label}}} {histogram.sum}')
+                    lines.append(f'{name}_count{{{label}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_metrics_registry():
+    """
+    Returns the process wide MetricsRegistry.
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = MetricsRegistry()
+    return _registry
+
+
+def server_timing_enabled():
+    return getattr(settings, 'REQUEST_METRICS', {}).get('SERVER_TIMING', True)
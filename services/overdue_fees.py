@@ -0,0 +1,95 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils import timezone
+
+from rental.models import Rental
+from rental.pagination import KeysetPaginator
+from services.pricing import CENTS
+from services.rental_summary import RentalSummaryDeltas
+
+logger = logging.getLogger(__name__)
+
+
+class OverdueFeeAccrual:
+    """
+    A periodic job charging a fee for every full day an unreturned rental is past its return date.
+
+    Each batch reads the next ``batch_size`` overdue rentals in due date order, through the partial
+    index on unreturned rentals. The rentals whose accrued day count grew are written with one
+    UPDATE per day count; rentals due on the same day share it, so a batch takes a few statements.
+    The fee follows from the number of days late, so running the job again as of the same time
+    changes nothing, and a daily run only writes the one more day of each rental.
+
+    Attributes:
+        fee_per_day (Decimal): The fee charged per full day late.
+        batch_size (int): The number of rentals read per batch.
+        interval (int): The seconds between two runs.
+    """
+    name = 'accrue_overdue_fees'
+
+    def __init__(self, fee_per_day, batch_size=1000, interval=3600):
+        self.fee_per_day = Decimal(str(fee_per_day))
+        self.batch_size = batch_size
+        self.interval = interval
+
+    @staticmethod
+    def overdue_rentals(as_of):
+        """
+        Returns the unreturned rentals at least one full day late at ``as_of``.
+        """
+        return (Rental.objects
+                .filter(returned_at__isnull=True, return_date__lte=as_of - timedelta(days=1))
+                .only('rental_id', 'student_id', 'return_date', 'overdue_days', 'overdue_fee'))
+
+    @staticmethod
+    def days_late(return_date, as_of):
+        return max((as_of - return_date).days, 0)
+
+    def fee(self, days_late):
+        return (self.fee_per_day * days_late).quantize(CENTS)
+
+    def run_batch(self, as_of, cursor):
+        """
+        Accrues the fees of one batch of overdue rentals.
+
+        Args:
+            as_of (datetime): The time fees are accrued up to.
+            cursor (str | None): Where the previous batch stopped.
+
+        Returns:
+            str | None: The cursor of the next batch, or None after the last one.
+        """
+        # The batch stays locked until its checkpoint commits, so the summary deltas match the rows written
+        paginator = KeysetPaginator(self.overdue_rentals(as_of).select_for_update(), per_page=self.batch_size,
+                                    ordering=('return_date', 'rental_id'))
+        page = paginator.page(cursor)
+        rental_ids_by_days = defaultdict(list)
+        deltas = RentalSummaryDeltas()
+        for rental in page:
+            days = self.days_late(rental.return_date, as_of)
+            if days > rental.overdue_days:
+                rental_ids_by_days[days].append(rental.rental_id)
+                deltas.fee_changed(rental.student_id_id, rental.overdue_fee, self.fee(days))
+
+        modified = timezone.now()
+        for days, rental_ids in rental_ids_by_days.items():
+            # The guard keeps a stale batch from lowering a newer accrual
+            (Rental.objects.filter(rental_id__in=rental_ids, overdue_days__lt=days)
+             .update(overdue_days=days, overdue_fee=self.fee(days), modified=modified))
+        deltas.apply()
+        logger.info("Accrued overdue fees of %s of %s rentals",
+                    sum(len(rental_ids) for rental_ids in rental_ids_by_days.values()), len(page))
+        return page.next_cursor
+
+
+def get_overdue_fee_accrual():
+    """
+    Returns the OverdueFeeAccrual job configured by the ``OVERDUE_FEES`` setting.
+    """
+    config = getattr(settings, 'OVERDUE_FEES', {})
+    return OverdueFeeAccrual(fee_per_day=config.get('PER_DAY', '0.10'), batch_size=config.get('BATCH_SIZE', 1000),
+                             interval=config.get('INTERVAL', 3600))
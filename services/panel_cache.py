@@ -0,0 +1,108 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.middleware.csrf import get_token
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+# Stands in for the CSRF input of the request in cached fragments; the token differs per session
+CSRF_PLACEHOLDER = mark_safe('<!-- csrf_input -->')
+
+
+class RentedBooksPanelCache:
+    """
+    Caches the rendered rented books panel of a student under versioned keys.
+
+    Keys hold the ``StudentRentalSummary.version`` of the student, which every write to their
+    rentals bumps in its own transaction, so entries are never invalidated: a write makes the next
+    read miss and the old entries age out. The listing of active rentals only also changes as
+    return dates pass, so its keys carry a time bucket of ``active_ttl`` seconds.
+
+    Attributes:
+        cache_alias (str): The Django cache holding the fragments.
+        timeout (int): Seconds a fragment is kept.
+        active_ttl (int): Seconds the active rentals listing may lag behind passing return dates.
+    """
+    KEY_PREFIX = 'rental:panel:v1'
+
+    def __init__(self, cache_alias='default', timeout=24 * 60 * 60, active_ttl=60):
+        self.cache_alias = cache_alias
+        self.timeout = timeout
+        self.active_ttl = active_ttl
+
+    @property
+    def cache(self):
+        # Looked up per call so that overridden CACHES settings are honoured
+        return caches[self.cache_alias]
+
+    def make_key(self, student_id, version, active=False, cursor=None, now=None):
+        """
+        Builds the key of one page of the panel of a student.
+
+        Args:
+            student_id: The student whose rentals are listed.
+            version (int): The summary version of the student.
+            active (bool): Whether only active rentals are listed.
+            cursor (str | None): The keyset cursor of the page.
+            now (float): The epoch time; defaults to ``time.time()``.
+
+        Returns:
+            str: The cache key.
+        """
+        raw = f"{student_id}|{version}|{cursor or ''}"
+        if active:
+            now = time.time() if now is None else now
+            raw += f"|active:{int(now // self.active_ttl)}"
+        return f"{self.KEY_PREFIX}:{hashlib.sha1(raw.encode('utf-8')).hexdigest()}"
+
+    def make_etag(self, key, *parts):
+        """
+        Builds the quoted ETag of a page embedding the fragment stored under key.
+
+        Args:
+            key (str): A key built with ``make_key``.
+            *parts: Whatever else the page depends on, e.g. the signed in user and the template.
+
+        Returns:
+            str: The ETag.
+        """
+        raw = '|'.join([key, *(str(part) for part in parts)])
+        return f'"{hashlib.sha1(raw.encode("utf-8")).hexdigest()}"'
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, html):
+        self.cache.set(key, str(html), timeout=self.timeout)
+
+    @staticmethod
+    def insert_csrf(html, request):
+        """
+        Returns a cached fragment with the CSRF input of the request in place of ``CSRF_PLACEHOLDER``.
+        """
+        csrf_input = format_html('<input type="hidden" name="csrfmiddlewaretoken" value="{}">', get_token(request))
+        return mark_safe(html.replace(CSRF_PLACEHOLDER, csrf_input))
+
+
+_panel_cache = None
+_panel_cache_lock = threading.Lock()
+
+
+def get_panel_cache():
+    """
+    Returns the process wide RentedBooksPanelCache configured by ``settings.RENTED_BOOKS_PANEL_CACHE``.
+    """
+    global _panel_cache
+    if _panel_cache is None:
+        with _panel_cache_lock:
+            if _panel_cache is None:
+                options = getattr(settings, 'RENTED_BOOKS_PANEL_CACHE', {})
+                _panel_cache = RentedBooksPanelCache(
+                    cache_alias=options.get('CACHE_ALIAS', 'default'),
+                    timeout=options.get('TIMEOUT', 24 * 60 * 60),
+                    active_ttl=options.get('ACTIVE_TTL', 60),
+                )
+    return _panel_cache
@@ -0,0 +1,182 @@
+import csv
+import datetime
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from rental.models import Rental
+
+logger = logging.getLogger(__name__)
+
+CSV = 'csv'
+JSONL = 'jsonl'
+FORMATS = (CSV, JSONL)
+CONTENT_TYPES = {CSV: 'text/csv; charset=utf-8', JSONL: 'application/x-ndjson; charset=utf-8'}
+COLUMNS = ('rental_id', 'created', 'student_id', 'username', 'email', 'book_id', 'title', 'author', 'isbn',
+           'return_date', 'returned_at', 'fee_amount', 'overdue_days', 'overdue_fee')
+# Leading characters that make spreadsheets read a cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+# The fields ``RentalExport.row`` reads
+ONLY_FIELDS = ('rental_id', 'created', 'student_id', 'book_id', 'return_date', 'returned_at', 'fee_amount',
+               'overdue_days', 'overdue_fee', 'student_id__username', 'student_id__email', 'book_id__title',
+               'book_id__author', 'book_id__isbn')
+
+
+class _Echo:
+    """
+    A file-like object handing back what csv.writer writes instead of keeping it.
+    """
+
+    def write(self, value):
+        return value
+
+
+class RentalExport:
+    """
+    Writes rentals, with their student and book, as CSV or JSON lines.
+
+    Rentals are read oldest first through a server-side cursor, ``chunk_size`` rows at a time, and
+    each chunk is encoded into one block of bytes, so the export takes constant memory and its first
+    block is ready once the first rows are read. The rows are read in one transaction, which gives
+    the whole export a consistent snapshot and keeps PostgreSQL from materialising the result, as it
+    does for the ``WITH HOLD`` cursors used outside transactions.
+
+    Attributes:
+        format (str): ``csv`` or ``jsonl``.
+        student_ids (list | None): Only export the rentals of these students.
+        created_from (datetime | None): Only export rentals created at or after this time.
+        created_to (datetime | None): Only export rentals created before this time.
+        overdue (bool): Only export unreturned rentals past their return date.
+        chunk_size (int): The rows fetched from the cursor and encoded per block.
+    """
+
+    def __init__(self, format=CSV, student_ids=None, created_from=None, created_to=None, overdue=False,
+                 chunk_size=2000):
+        if format not in FORMATS:
+            raise ValueError(f"Unknown export format {format!r}; use one of {', '.join(FORMATS)}.")
+        self.format = format
+        self.student_ids = student_ids
+        self.created_from = created_from
+        self.created_to = created_to
+        self.overdue = overdue
+        self.chunk_size = chunk_size
+
+    @property
+    def content_type(self):
+        return CONTENT_TYPES[self.format]
+
+    @property
+    def filename(self):
+        return f"rentals.{self.format}"
+
+    def queryset(self, now=None):
+        rentals = (Rental.objects.select_related('book_id', 'student_id').only(*ONLY_FIELDS)
+                   .order_by('created', 'rental_id'))
+        if self.student_ids:
+            rentals = rentals.filter(student_id__in=self.student_ids)
+        if self.created_from is not None:
+            rentals = rentals.filter(created__gte=self.created_from)
+        if self.created_to is not None:
+            rentals = rentals.filter(created__lt=self.created_to)
+        if self.overdue:
+            rentals = rentals.filter(returned_at__isnull=True, return_date__lt=now or timezone.now())
+        return rentals
+
+    @staticmethod
+    def row(rental):
+        student, book = rental.student_id, rental.book_id
+        return (rental.rental_id, rental.created, rental.student_id_id,
+                student.username if student else None, student.email if student else None,
+                rental.book_id_id, book.title if book else None, book.author if book else None,
+                book.isbn if book else None, rental.return_date, rental.returned_at, rental.fee_amount,
+                rental.overdue_days, rental.overdue_fee)
+
+    def header(self):
+        if self.format == CSV:
+            return csv.writer(_Echo()).writerow(COLUMNS).encode('utf-8')
+        return b''
+
+    def encode(self, rows):
+        """
+        Encodes rows into one block of CSV or JSON lines.
+        """
+        if self.format == CSV:
+            writer = csv.writer(_Echo())
+            lines = (writer.writerow([format_csv_value(value) for value in row]) for row in rows)
+        else:
+            lines = (json.dumps(dict(zip(COLUMNS, row)), cls=DjangoJSONEncoder) + '\n' for row in rows)
+        return ''.join(lines).encode('utf-8')
+
+    def blocks(self):
+        """
+        Yields the export as blocks of bytes, the CSV header first.
+
+        The export holds a transaction open until the generator is exhausted or closed.
+        """
+        header = self.header()
+        if header:
+            yield header
+        exported = 0
+        with transaction.atomic():
+            rows = []
+            for rental in self.queryset().iterator(chunk_size=self.chunk_size):
+                rows.append(self.row(rental))
+                if len(rows) == self.chunk_size:
+                    exported += len(rows)
+                    yield self.encode(rows)
+                    rows = []
+            if rows:
+                exported += len(rows)
+                yield self.encode(rows)
+        logger.info("Exported %s rentals as %s", exported, self.format)
+
+    async def ablocks(self):
+        """
+        Yields the blocks of ``blocks`` from an async context, one cursor fetch per thread hop.
+
+        Django's ASGI handler reads a synchronous streaming iterator to the end before sending anything.
+        """
+        blocks = self.blocks()
+        next_block = sync_to_async(next)
+        try:
+            while True:
+                block = await next_block(blocks, None)
+                if block is None:
+                    return
+                yield block
+        finally:
+            # Closes the cursor and ends the transaction when the client goes away mid export
+            await sync_to_async(blocks.close)()
+
+
+def day_range(first_day=None, last_day=None):
+    """
+    Turns an inclusive range of days into the ``(created_from, created_to)`` times of RentalExport.
+
+    Days are read in the current time zone; either end may be None.
+    """
+    def start_of(day):
+        return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+    return (start_of(first_day) if first_day else None,
+            start_of(last_day + datetime.timedelta(days=1)) if last_day else None)
+
+
+def format_csv_value(value):
+    """
+    Formats one CSV cell.
+
+    Text a spreadsheet would read as a formula, such as a title starting with ``=``, is prefixed with
+    a quote so that opening the export cannot run it.
+    """
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
@@ -0,0 +1,232 @@
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Max, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from rental.models import Rental, StudentRentalSummary
+from student.models import Student
+
+logger = logging.getLogger(__name__)
+
+# services.pricing applies summary deltas, so its CENTS and chunked helpers are not imported here
+FEE_QUANTUM = Decimal('0.01')
+
+
+def to_amount(value):
+    """
+    Returns a fee as stored by a two decimal place DecimalField; None counts as zero.
+    """
+    if value is None:
+        return Decimal(0)
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return value.quantize(FEE_QUANTUM)
+
+
+class SummaryDelta:
+    """
+    The change to the StudentRentalSummary of one student.
+
+    Attributes:
+        active_rentals (int): Added to the number of rentals not returned yet.
+        total_rentals (int): Added to the number of rentals.
+        outstanding_fees (Decimal): Added to the outstanding fees.
+        last_rented_at (datetime | None): Becomes the last rental time if it is more recent.
+    """
+    __slots__ = ('active_rentals', 'total_rentals', 'outstanding_fees', 'last_rented_at')
+
+    def __init__(self):
+        self.active_rentals = 0
+        self.total_rentals = 0
+        self.outstanding_fees = Decimal(0)
+        self.last_rented_at = None
+
+    def key(self):
+        return self.active_rentals, self.total_rentals, self.outstanding_fees, self.last_rented_at
+
+    def updates(self):
+        """
+        Returns the ``update()`` keyword arguments applying this delta.
+
+        The version is bumped even when the totals do not change, e.g. by an extension that keeps the fee.
+        """
+        updates = {'version': F('version') + 1}
+        if self.active_rentals:
+            updates['active_rentals'] = F('active_rentals') + self.active_rentals
+        if self.total_rentals:
+            updates['total_rentals'] = F('total_rentals') + self.total_rentals
+        if self.outstanding_fees:
+            updates['outstanding_fees'] = F('outstanding_fees') + self.outstanding_fees
+        if self.last_rented_at is not None:
+            updates['last_rented_at'] = Case(When(last_rented_at__gte=self.last_rented_at, then=F('last_rented_at')),
+                                             default=Value(self.last_rented_at))
+        return updates
+
+
+class RentalSummaryDeltas:
+    """
+    Collects the summary changes of a write to rentals and applies them as ``F()`` deltas.
+
+    Call ``apply`` in the transaction of the write. Every student recorded gets their summary
+    version bumped. Students whose delta is the same share one UPDATE, so a bulk write takes a few
+    statements. Rows are never recounted; missing rows are created with ``ignore_conflicts``
+    before the UPDATE, so concurrent writers cannot lose a delta.
+
+    Example Usage:
+        deltas = RentalSummaryDeltas()
+        deltas.rented(student_id, fee_amount, rented_at)
+        deltas.apply()
+    """
+    BATCH_SIZE = 500
+
+    def __init__(self):
+        self.deltas = defaultdict(SummaryDelta)
+
+    def rented(self, student_id, fee_amount, rented_at, returned=False):
+        """
+        Records a new rental.
+        """
+        delta = self.deltas[student_id]
+        delta.total_rentals += 1
+        if not returned:
+            delta.active_rentals += 1
+        delta.outstanding_fees += to_amount(fee_amount)
+        if rented_at is not None and (delta.last_rented_at is None or rented_at > delta.last_rented_at):
+            delta.last_rented_at = rented_at
+
+    def returned(self, student_id):
+        """
+        Records the return of a rental.
+        """
+        self.deltas[student_id].active_rentals -= 1
+
+    def fee_changed(self, student_id, old_fee, new_fee):
+        """
+        Records a change of the rental or overdue fee of a rental.
+        """
+        self.deltas[student_id].outstanding_fees += to_amount(new_fee) - to_amount(old_fee)
+
+    def apply(self):
+        """
+        Applies the collected deltas and clears them.
+        """
+        students_by_delta = defaultdict(list)
+        deltas = {}
+        for student_id, delta in self.deltas.items():
+            if student_id is not None:
+                students_by_delta[delta.key()].append(student_id)
+                deltas[delta.key()] = delta
+        self.deltas.clear()
+
+        for key, student_ids in students_by_delta.items():
+            updates = deltas[key].updates()
+            for start in range(0, len(student_ids), self.BATCH_SIZE):
+                self._update(student_ids[start:start + self.BATCH_SIZE], updates)
+
+    @staticmethod
+    def _update(student_ids, updates):
+        summaries = StudentRentalSummary.objects.filter(pk__in=student_ids)
+        if len(student_ids) == 1:
+            # The usual single student write: one UPDATE, as the row exists but for the first rental
+            if summaries.update(**updates):
+                return
+        # The rows a partial UPDATE changed could not be told apart, so create missing rows first
+        StudentRentalSummary.objects.bulk_create(
+            [StudentRentalSummary(student_id_id=student_id) for student_id in student_ids], ignore_conflicts=True)
+        summaries.update(**updates)
+
+
+@receiver(post_save, sender=Student)
+def create_rental_summary(sender, instance, created, raw=False, **kwargs):
+    # Rentals then only ever UPDATE the row; bulk created students get theirs on their first rental
+    if created and not raw:
+        StudentRentalSummary.objects.create(student_id=instance)
+
+
+class RebuildResult:
+    """
+    Counts of a summary rebuild.
+
+    Attributes:
+        checked (int): The number of students checked.
+        mismatched (int): The number of summaries that differed from the rentals.
+        fixed (int): The number of summaries rewritten (0 on a verify-only run).
+    """
+    __slots__ = ('checked', 'mismatched', 'fixed')
+
+    def __init__(self):
+        self.checked = 0
+        self.mismatched = 0
+        self.fixed = 0
+
+
+def summary_values():
+    """
+    Returns the aggregates of Rental matching the StudentRentalSummary columns.
+    """
+    return {
+        'active_rentals': Count('pk', filter=Q(returned_at__isnull=True)),
+        'total_rentals': Count('pk'),
+        'outstanding_fees': Sum(Coalesce('fee_amount', Value(Decimal(0))) + F('overdue_fee'),
+                                output_field=DecimalField()),
+        'last_rented_at': Max('created'),
+    }
+
+
+def rebuild_summaries(student_ids=None, batch_size=1000, verify_only=False):
+    """
+    Recomputes the summaries of students from the Rental table and rewrites those that differ.
+
+    Students are checked ``batch_size`` at a time, each batch in one transaction holding the locks
+    of its summary rows, so rentals written meanwhile are counted once.
+
+    Args:
+        student_ids (list | None): Only check these students; all of them when None.
+        batch_size (int): The number of students checked per transaction.
+        verify_only (bool): Count the mismatches without fixing them.
+
+    Returns:
+        RebuildResult: The counts of the run.
+    """
+    students = Student.objects.order_by('pk').values_list('pk', flat=True)
+    if student_ids is not None:
+        students = students.filter(pk__in=student_ids)
+    students = list(students)
+
+    result = RebuildResult()
+    fields = list(summary_values())
+    for start in range(0, len(students), batch_size):
+        batch = students[start:start + batch_size]
+        with transaction.atomic():
+            stored = {summary.pk: summary
+                      for summary in StudentRentalSummary.objects.select_for_update().filter(pk__in=batch)}
+            actual = {row.pop('student_id'): row for row in
+                      Rental.objects.filter(student_id__in=batch).order_by().values('student_id')
+                      .annotate(**summary_values())}
+
+            changed, missing = [], []
+            for student_id in batch:
+                expected = StudentRentalSummary(student_id_id=student_id, **actual.get(student_id, {}))
+                expected.outstanding_fees = to_amount(expected.outstanding_fees)
+                summary = stored.get(student_id)
+                if summary is None:
+                    # Panels of a student without a row were cached as version 0
+                    expected.version = 1
+                    missing.append(expected)
+                elif any(getattr(summary, field) != getattr(expected, field) for field in fields):
+                    expected.version = summary.version + 1
+                    changed.append(expected)
+
+            result.checked += len(batch)
+            result.mismatched += len(changed) + len(missing)
+            if not verify_only:
+                StudentRentalSummary.objects.bulk_update(changed, fields + ['version'])
+                StudentRentalSummary.objects.bulk_create(missing)
+                result.fixed += len(changed) + len(missing)
+        logger.info("Checked %s rental summaries, %s mismatched", result.checked, result.mismatched)
+    return result
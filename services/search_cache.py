@@ -0,0 +1,252 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+
+def off_request_thread(fn):
+    """
+    Wraps a blocking cache call for async code, run on any thread of the default executor.
+
+    Django's async cache methods run on the thread the request shares with its other sync work, so
+    a search gathered with a database query would wait for that query to finish first.
+    """
+    return sync_to_async(fn, thread_sensitive=False)
+
+
+class CachedSearch:
+    """
+    A value read back from the search cache.
+
+    Attributes:
+        value: The cached search result.
+        stored_at (float): The epoch time the value was fetched from upstream.
+        is_stale (bool): True when the value is past its TTL but still inside the stale window.
+    """
+    __slots__ = ('value', 'stored_at', 'is_stale')
+
+    def __init__(self, value, stored_at, is_stale):
+        self.value = value
+        self.stored_at = stored_at
+        self.is_stale = is_stale
+
+
+class LRUTTLCache:
+    """
+    A thread-safe, size bounded LRU map that remembers when each entry was stored.
+
+    Expiry is left to the caller: entries are dropped once they are older than ``max_age``
+    or when the map grows past ``max_entries``.
+    """
+
+    def __init__(self, max_entries, max_age):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, now=None):
+        """
+        Returns the ``(value, stored_at)`` pair for key or None when absent or expired.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if now - entry[1] > self.max_age:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, value, stored_at=None):
+        stored_at = time.time() if stored_at is None else stored_at
+        with self._lock:
+            self._entries[key] = (value, stored_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SearchResultCache:
+    """
+    Two tier cache for OpenLibrary search results.
+
+    The first tier is an in-process LRU owned by each worker, the second tier is a Django cache
+    (file based by default) shared by all workers on the host. Entries are fresh for ``ttl`` seconds
+    and may be served stale for a further ``stale_ttl`` seconds while the caller revalidates them.
+
+    Attributes:
+        local (LRUTTLCache): The per-process tier.
+        shared (BaseCache): The Django cache used as the shared tier.
+        ttl (int): Seconds an entry is considered fresh.
+        stale_ttl (int): Seconds an expired entry may still be served while it is refreshed.
+    """
+    KEY_PREFIX = 'openlibrary:search'
+    COUNTERS = ('local_hits', 'shared_hits', 'stale_hits', 'misses', 'sets')
+
+    def __init__(self, cache_alias='default', max_entries=1024, ttl=300, stale_ttl=3600):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.local = LRUTTLCache(max_entries=max_entries, max_age=ttl + stale_ttl)
+        self.shared = caches[cache_alias]
+        self._counters = dict.fromkeys(self.COUNTERS, 0)
+        self._counter_lock = threading.Lock()
+
+    @staticmethod
+    def normalise_query(query):
+        """
+        Normalises a search query so that case and whitespace variants share one cache entry.
+        """
+        return ' '.join(str(query).split()).casefold()
+
+    def make_key(self, query, **params):
+        """
+        Builds a cache key for a query and any extra upstream parameters.
+        """
+        raw = self.normalise_query(query)
+        if params:
+            raw += '|' + '&'.join(f'{name}={params[name]}' for name in sorted(params))
+        return f"{self.KEY_PREFIX}:{hashlib.sha1(raw.encode('utf-8')).hexdigest()}"
+
+    def get(self, key):
+        """
+        Looks a key up in the local tier, then the shared tier.
+
+        Args:
+            key (str): A key built with ``make_key``.
+
+        Returns:
+            CachedSearch | None: The cached value, or None on a miss.
+        """
+        now = time.time()
+        entry = self.local.get(key, now=now)
+        if entry is not None:
+            return self._hit(entry, 'local_hits', now)
+        return self._shared_hit(key, self.shared.get(key), now)
+
+    async def aget(self, key):
+        """
+        Async version of ``get``; only the shared tier lookup is awaited.
+        """
+        now = time.time()
+        entry = self.local.get(key, now=now)
+        if entry is not None:
+            return self._hit(entry, 'local_hits', now)
+        return self._shared_hit(key, await off_request_thread(self.shared.get)(key), now)
+
+    def set(self, key, value):
+        """
+        Stores a freshly fetched value in both tiers.
+        """
+        stored_at = time.time()
+        self.local.set(key, value, stored_at=stored_at)
+        self.shared.set(key, (value, stored_at), timeout=self.ttl + self.stale_ttl)
+        self._incr('sets')
+
+    async def aset(self, key, value):
+        """
+        Async version of ``set``.
+        """
+        stored_at = time.time()
+        self.local.set(key, value, stored_at=stored_at)
+        await off_request_thread(self.shared.set)(key, (value, stored_at), timeout=self.ttl + self.stale_ttl)
+        self._incr('sets')
+
+    def get_shared(self, key):
+        """
+        Returns the value another worker stored in the shared tier, or None. Counters are not touched.
+        """
+        entry = self.shared.get(key)
+        if entry is None:
+            return None
+        self.local.set(key, entry[0], stored_at=entry[1])
+        return entry[0]
+
+    async def aget_shared(self, key):
+        """
+        Async version of ``get_shared``.
+        """
+        entry = await off_request_thread(self.shared.get)(key)
+        if entry is None:
+            return None
+        self.local.set(key, entry[0], stored_at=entry[1])
+        return entry[0]
+
+    def _shared_hit(self, key, entry, now):
+        if entry is None:
+            self._incr('misses')
+            return None
+        # Promote to the local tier keeping the original fetch time
+        self.local.set(key, entry[0], stored_at=entry[1])
+        return self._hit(entry, 'shared_hits', now)
+
+    def _hit(self, entry, counter, now):
+        is_stale = now - entry[1] > self.ttl
+        self._incr('stale_hits' if is_stale else counter)
+        return CachedSearch(value=entry[0], stored_at=entry[1], is_stale=is_stale)
+
+    def delete(self, key):
+        self.local.delete(key)
+        self.shared.delete(key)
+
+    def clear(self):
+        """
+        Empties the local tier and resets the counters. The shared tier is left untouched.
+        """
+        self.local.clear()
+        with self._counter_lock:
+            self._counters = dict.fromkeys(self.COUNTERS, 0)
+
+    def stats(self):
+        """
+        Returns the hit/miss counters of this process together with the local tier size.
+        """
+        with self._counter_lock:
+            stats = dict(self._counters)
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['stale_hits'] + stats['misses']
+        stats['hit_ratio'] = (lookups - stats['misses']) / lookups if lookups else 0.0
+        stats['local_entries'] = len(self.local)
+        return stats
+
+    def _incr(self, counter):
+        with self._counter_lock:
+            self._counters[counter] += 1
+
+
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+
+def get_search_cache():
+    """
+    Returns the process wide SearchResultCache configured by ``settings.OPENLIBRARY_SEARCH_CACHE``.
+    """
+    global _search_cache
+    if _search_cache is None:
+        with _search_cache_lock:
+            if _search_cache is None:
+                options = getattr(settings, 'OPENLIBRARY_SEARCH_CACHE', {})
+                _search_cache = SearchResultCache(
+                    cache_alias=options.get('CACHE_ALIAS', 'default'),
+                    max_entries=options.get('MAX_ENTRIES', 1024),
+                    ttl=options.get('TTL', 300),
+                    stale_ttl=options.get('STALE_TTL', 3600),
+                )
+    return _search_cache
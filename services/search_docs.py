@@ -0,0 +1,203 @@
+import codecs
+import json
+
+# The only fields of an OpenLibrary search doc the application reads
+SEARCH_FIELDS = ('title', 'author_name', 'number_of_pages_median', 'isbn')
+# An edition of a popular work can list hundreds of ISBNs; the first few identify the book
+MAX_ISBNS = 4
+MAX_AUTHORS = 3
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+
+class SearchDoc:
+    """
+    A compact book search result, in the shape of an OpenLibrary search doc.
+
+    Besides attributes, a SearchDoc supports the read-only mapping access used on plain docs,
+    ``doc['title']`` and ``doc.get('isbn')``, so templates and callers treat both alike.
+
+    Attributes:
+        title (str): The title of the book.
+        author_name (tuple[str]): The authors of the book.
+        number_of_pages_median (int | None): The number of pages.
+        isbn (tuple[str]): The first ISBNs of the book.
+        source (str | None): 'local' for books from the catalogue, None for OpenLibrary results.
+    """
+    __slots__ = ('title', 'author_name', 'number_of_pages_median', 'isbn', 'source')
+
+    def __init__(self, title, author_name=(), number_of_pages_median=None, isbn=(), source=None):
+        self.title = title
+        self.author_name = tuple(author_name)
+        self.number_of_pages_median = number_of_pages_median
+        self.isbn = tuple(isbn)
+        self.source = source
+
+    @classmethod
+    def from_json(cls, doc):
+        """
+        Builds a SearchDoc from a decoded OpenLibrary doc, dropping every other field.
+        """
+        return cls(doc.get('title'), (doc.get('author_name') or ())[:MAX_AUTHORS],
+                   doc.get('number_of_pages_median'), (doc.get('isbn') or ())[:MAX_ISBNS])
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        value = getattr(self, key) if key in self.__slots__ else None
+        return default if value is None else value
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__ if getattr(self, field) is not None}
+
+    def __eq__(self, other):
+        if not isinstance(other, SearchDoc):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+    def __hash__(self):
+        return hash((self.title, self.author_name, self.isbn))
+
+    def __repr__(self):
+        return f"SearchDoc(title={self.title!r}, author_name={self.author_name!r})"
+
+
+class SearchResults(list):
+    """
+    The docs of a search, flagged when OpenLibrary could not be asked for them.
+
+    Attributes:
+        degraded (bool): True when the results come only from the catalogue, or from cached results
+            that could not be refreshed, because OpenLibrary failed or its circuit is open.
+    """
+
+    def __init__(self, docs=(), degraded=False):
+        super().__init__(docs)
+        self.degraded = degraded
+
+
+def iter_search_docs(chunks):
+    """
+    Decodes the ``docs`` array of an OpenLibrary search response one doc at a time.
+
+    Only the current doc and the unread part of the last chunk are held in memory, instead of the
+    whole body and its decoded tree. Other top level members are decoded and skipped.
+
+    Args:
+        chunks (Iterable[bytes | str]): The response body, in pieces of any size.
+
+    Yields:
+        dict: Every decoded doc, in order.
+
+    Raises:
+        ValueError: When the body is not a JSON object, or ends early.
+    """
+    reader = _ChunkReader(chunks)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        key = reader.value()
+        reader.expect(':')
+        if key == 'docs' and reader.peek() == '[':
+            reader.expect('[')
+            if reader.peek() != ']':
+                while True:
+                    yield reader.value()
+                    if reader.expect(',', ']') == ']':
+                        break
+            else:
+                reader.expect(']')
+        else:
+            reader.value()
+        if reader.expect(',', '}') == '}':
+            return
+
+
+def parse_search_response(chunks, limit=None):
+    """
+    Returns the first ``limit`` docs of an OpenLibrary search response as SearchDocs.
+
+    Docs past the limit are not decoded, but the rest of the body is still read so the connection
+    can go back to the pool.
+    """
+    chunks = iter(chunks)
+    docs = []
+    if limit is None or limit > 0:
+        for doc in iter_search_docs(chunks):
+            docs.append(SearchDoc.from_json(doc))
+            if len(docs) == limit:
+                break
+    for _ in chunks:
+        pass
+    return docs
+
+
+class _ChunkReader:
+    """
+    A cursor over text decoded from byte (or already decoded) chunks, read on demand.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._exhausted = False
+
+    def _read(self):
+        """
+        Appends the next chunk to the buffer, dropping the part already consumed.
+        """
+        if self._exhausted:
+            return False
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._exhausted = True
+            text = self._decoder.decode(b'', final=True)
+        else:
+            text = chunk if isinstance(chunk, str) else self._decoder.decode(chunk)
+        self._buffer = self._buffer[self._pos:] + text
+        self._pos = 0
+        return True
+
+    def peek(self):
+        """
+        Skips whitespace and returns the next character, or '' at the end of the body.
+        """
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read():
+                return ''
+
+    def expect(self, *characters):
+        character = self.peek()
+        if character not in characters or not character:
+            raise ValueError(f"Expected {' or '.join(characters)} in the search response, got {character!r}")
+        self._pos += 1
+        return character
+
+    def value(self):
+        """
+        Decodes the next JSON value, reading more chunks until it is complete.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._read():
+                    raise ValueError("The search response ended early") from None
+                continue
+            # A number at the end of the buffer may continue in the next chunk
+            if end < len(self._buffer) or self._exhausted:
+                self._pos = end
+                return value
+            self._read()
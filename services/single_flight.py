@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+import weakref
+
+from django.conf import settings
+from django.core.cache import caches
+
+from services.search_cache import off_request_thread
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """
+    An in-flight call that followers wait on.
+    """
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key onto a single execution.
+
+    Within a process the first caller for a key (the leader) runs the function while later callers
+    (followers) wait for its result. Followers that wait longer than ``timeout`` run the function
+    themselves. With a ``shared_cache`` the leaders of different worker processes also coordinate
+    through a lock key: only the lock holder calls upstream and the others poll for the result
+    it publishes.
+
+    Attributes:
+        timeout (float): Seconds a follower waits before falling back to its own call.
+        shared_cache (BaseCache | None): The Django cache holding cross-worker locks.
+        lock_ttl (float): Seconds a cross-worker lock lives if its holder dies.
+        poll_interval (float): Seconds between polls for a result published by another worker.
+    """
+    LOCK_SUFFIX = ':single-flight'
+    COUNTERS = ('leaders', 'followers', 'shared_followers', 'timeouts')
+
+    def __init__(self, timeout=10, shared_cache=None, lock_ttl=15, poll_interval=0.05):
+        self.timeout = timeout
+        self.shared_cache = shared_cache
+        self.lock_ttl = lock_ttl
+        self.poll_interval = poll_interval
+        self._calls = {}
+        self._async_calls = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(self.COUNTERS, 0)
+
+    def do(self, key, fn, shared_result=None):
+        """
+        Runs ``fn`` once for all concurrent callers using the same key.
+
+        Args:
+            key (str): Identifies identical calls.
+            fn (callable): The call to make; its return value is shared with the followers.
+            shared_result (callable): Returns the result published by another worker, or None.
+                Cross-worker coalescing is only used when this and ``shared_cache`` are given.
+
+        Returns:
+            The result of ``fn``, possibly computed by another thread or worker.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = _Call()
+
+        if not is_leader:
+            self._incr('followers')
+            if call.done.wait(self.timeout):
+                if call.error is not None:
+                    raise call.error
+                return call.result
+            self._incr('timeouts')
+            logger.warning("Timed out waiting for in-flight call %s, calling upstream directly", key)
+            return fn()
+
+        self._incr('leaders')
+        try:
+            call.result = self._lead(key, fn, shared_result)
+            return call.result
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    async def ado(self, key, coro_fn, shared_result=None):
+        """
+        Async version of ``do`` coalescing the coroutines of one event loop.
+
+        Args:
+            key (str): Identifies identical calls.
+            coro_fn (callable): Returns the awaitable to run; its result is shared with the followers.
+            shared_result (callable): Async callable returning the result published by another worker,
+                or None.
+
+        Returns:
+            The result of ``coro_fn()``, possibly computed by another task or worker.
+        """
+        loop = asyncio.get_running_loop()
+        calls = self._async_calls.setdefault(loop, {})
+        future = calls.get(key)
+        if future is not None:
+            self._incr('followers')
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+            except asyncio.TimeoutError:
+                self._incr('timeouts')
+                logger.warning("Timed out waiting for in-flight call %s, calling upstream directly", key)
+                return await coro_fn()
+
+        self._incr('leaders')
+        future = calls[key] = loop.create_future()
+        try:
+            result = await self._alead(key, coro_fn, shared_result)
+            future.set_result(result)
+            return result
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Followers re-raise it; avoid "exception was never retrieved" when there are none
+            future.exception()
+            raise
+        finally:
+            calls.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def _lead(self, key, fn, shared_result):
+        if self.shared_cache is None or shared_result is None:
+            return fn()
+        lock_key = key + self.LOCK_SUFFIX
+        if self.shared_cache.add(lock_key, os.getpid(), timeout=self.lock_ttl):
+            try:
+                return fn()
+            finally:
+                self.shared_cache.delete(lock_key)
+
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            result = shared_result()
+            if result is not None:
+                self._incr('shared_followers')
+                return result
+            if not self.shared_cache.has_key(lock_key):
+                # The other worker finished without publishing a result, e.g. upstream failed
+                break
+        else:
+            self._incr('timeouts')
+        return fn()
+
+    async def _alead(self, key, coro_fn, shared_result):
+        if self.shared_cache is None or shared_result is None:
+            return await coro_fn()
+        lock_key = key + self.LOCK_SUFFIX
+        if await off_request_thread(self.shared_cache.add)(lock_key, os.getpid(), timeout=self.lock_ttl):
+            try:
+                return await coro_fn()
+            finally:
+                await off_request_thread(self.shared_cache.delete)(lock_key)
+
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            result = await shared_result()
+            if result is not None:
+                self._incr('shared_followers')
+                return result
+            if not await off_request_thread(self.shared_cache.has_key)(lock_key):
+                break
+        else:
+            self._incr('timeouts')
+        return await coro_fn()
+
+    def _incr(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight():
+    """
+    Returns the process wide SingleFlight configured by ``settings.OPENLIBRARY_SINGLE_FLIGHT``.
+    """
+    global _single_flight
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                options = getattr(settings, 'OPENLIBRARY_SINGLE_FLIGHT', {})
+                shared_cache = caches[options.get('CACHE_ALIAS', 'default')] if options.get('SHARED_LOCK') else None
+                _single_flight = SingleFlight(
+                    timeout=options.get('TIMEOUT', 10),
+                    shared_cache=shared_cache,
+                    lock_ttl=options.get('LOCK_TTL', 15),
+                    poll_interval=options.get('POLL_INTERVAL', 0.05),
+                )
+    return _single_flight
@@ -0,0 +1,203 @@
+import hashlib
+import importlib
+import logging
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestFilesMixin, staticfiles_storage
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+logger = logging.getLogger(__name__)
+
+# Held while a container prepares the app, so replicas starting together do not migrate at once
+STARTUP_LOCK_ID = 0x626f6f6b666c6f77
+
+
+class StartupStep:
+    """
+    One step of preparing the app for serving, skipped when what it depends on did not change.
+
+    Subclasses implement ``fingerprint``, ``is_current`` and ``apply``.
+    """
+    name = None
+
+    def fingerprint(self):
+        """
+        Returns a digest of what the step depends on, or None when the step has no inputs to hash.
+        """
+        return None
+
+    def is_current(self, fingerprint):
+        """
+        Returns True when the step has already run for this fingerprint.
+        """
+        raise NotImplementedError
+
+    def apply(self, fingerprint):
+        """
+        Runs the step and records the fingerprint it ran for.
+        """
+        raise NotImplementedError
+
+
+class CollectStaticStep(StartupStep):
+    """
+    Collects the static files when their content, the storage or the static URL changed.
+
+    The fingerprint is kept in a marker file next to the collected files, so it survives restarts
+    of a container whose STATIC_ROOT is a volume.
+    """
+    name = 'collectstatic'
+    MARKER = '.startup-fingerprint'
+
+    def fingerprint(self):
+        digest = hashlib.sha1()
+        digest.update(f"{settings.STATIC_URL}|{settings.STORAGES['staticfiles']['BACKEND']}".encode('utf-8'))
+        files = []
+        for finder in finders.get_finders():
+            for path, storage in finder.list([]):
+                files.append((getattr(storage, 'prefix', None) or '', path, storage))
+        for prefix, path, storage in sorted(files, key=lambda entry: entry[:2]):
+            digest.update(f"\0{prefix}/{path}\0".encode('utf-8'))
+            with storage.open(path) as source:
+                for chunk in iter(lambda: source.read(64 * 1024), b''):
+                    digest.update(chunk)
+        return digest.hexdigest()
+
+    @property
+    def marker_path(self):
+        return Path(settings.STATIC_ROOT) / self.MARKER
+
+    def is_current(self, fingerprint):
+        try:
+            recorded = self.marker_path.read_text().strip()
+        except OSError:
+            return False
+        if isinstance(staticfiles_storage, ManifestFilesMixin) and not staticfiles_storage.exists(
+                staticfiles_storage.manifest_name):
+            return False
+        return recorded == fingerprint
+
+    def apply(self, fingerprint):
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.marker_path.write_text(fingerprint)
+
+
+class MigrateStep(StartupStep):
+    """
+    Applies the migrations; skipped when every migration on disk is already recorded as applied.
+    """
+    name = 'migrate'
+
+    def __init__(self, database=DEFAULT_DB_ALIAS):
+        self.database = database
+
+    def is_current(self, fingerprint):
+        executor = MigrationExecutor(connections[self.database])
+        return not executor.migration_plan(executor.loader.graph.leaf_nodes())
+
+    def apply(self, fingerprint):
+        call_command('migrate', interactive=False, database=self.database, verbosity=0)
+
+
+class SeedStep(StartupStep):
+    """
+    Runs the seed functions once per version of the seed module.
+
+    The fingerprint of the module source is kept in a StartupState row, so restarts and replicas
+    do not hash a password per seeded student again.
+
+    Attributes:
+        module (str): The dotted path of the seed module.
+        functions (tuple[str]): The functions of the module to call, in order.
+    """
+    name = 'seed'
+
+    def __init__(self, module='seed.seed_students', functions=('create_staff_students', 'create_students')):
+        self.module = module
+        self.functions = functions
+
+    def fingerprint(self):
+        source = Path(importlib.import_module(self.module).__file__).read_bytes()
+        return hashlib.sha1(f"{self.functions}".encode('utf-8') + source).hexdigest()
+
+    def is_current(self, fingerprint):
+        from rental.models import StartupState
+        return StartupState.objects.filter(name=self.name, fingerprint=fingerprint).exists()
+
+    def apply(self, fingerprint):
+        from rental.models import StartupState
+        module = importlib.import_module(self.module)
+        for function in self.functions:
+            getattr(module, function)()
+        StartupState.objects.update_or_create(name=self.name, defaults={'fingerprint': fingerprint})
+
+
+class StepResult:
+    """
+    The outcome of one startup step.
+
+    Attributes:
+        name (str): The name of the step.
+        ran (bool): False when the step was skipped as current.
+        seconds (float): The time spent on the step, its checks included.
+    """
+    __slots__ = ('name', 'ran', 'seconds')
+
+    def __init__(self, name, ran, seconds):
+        self.name = name
+        self.ran = ran
+        self.seconds = seconds
+
+
+def default_steps():
+    return [CollectStaticStep(), MigrateStep(), SeedStep()]
+
+
+@contextmanager
+def startup_lock(database=DEFAULT_DB_ALIAS):
+    """
+    Holds a PostgreSQL advisory lock for the duration of the block; other databases are not locked.
+    """
+    connection = connections[database]
+    if connection.vendor != 'postgresql':
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_lock(%s)', [STARTUP_LOCK_ID])
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_unlock(%s)', [STARTUP_LOCK_ID])
+
+
+def run_startup(steps=None, force=()):
+    """
+    Runs the startup steps that are not current, in order.
+
+    Args:
+        steps (list[StartupStep] | None): The steps; ``default_steps()`` when None.
+        force (Iterable[str]): The names of steps to run even when current.
+
+    Returns:
+        list[StepResult]: One result per step.
+    """
+    steps = default_steps() if steps is None else steps
+    force = set(force)
+    results = []
+    with startup_lock():
+        for step in steps:
+            started = time.perf_counter()
+            fingerprint = step.fingerprint()
+            ran = step.name in force or not step.is_current(fingerprint)
+            if ran:
+                step.apply(fingerprint)
+            results.append(StepResult(step.name, ran, time.perf_counter() - started))
+            logger.info("Startup step %s %s in %.2fs", step.name, 'ran' if ran else 'skipped', results[-1].seconds)
+    return results
@@ -0,0 +1,93 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from student.models import Student
+
+
+class UserCache:
+    """
+    Caches a compact snapshot of each student for loading the signed in user.
+
+    The snapshot holds only ``FIELDS``, the columns authentication and the views read, and is
+    turned back into a Student with the other columns deferred, as ``.only()`` would, so saving it
+    cannot overwrite them. The password hash is among them because ``django.contrib.auth``
+    checks the session auth hash, derived from it, on every request; the cache must be as private
+    as the database.
+
+    Snapshots are keyed by student, shared by all their sessions, and deleted when the student is
+    saved or deleted; writes through ``QuerySet.update()`` show up after ``timeout`` seconds.
+
+    Attributes:
+        cache_alias (str): The Django cache holding the snapshots.
+        timeout (int): Seconds a snapshot is kept.
+    """
+    KEY_PREFIX = 'student:user:v1'
+    FIELDS = ('student_id', 'password', 'username', 'email', 'first_name', 'last_name', 'is_active', 'is_staff',
+              'is_superuser')
+
+    def __init__(self, cache_alias='default', timeout=300):
+        self.cache_alias = cache_alias
+        self.timeout = timeout
+        # Model.from_db expects the loaded values in the order of the model fields
+        self.fields = tuple(field.attname for field in Student._meta.concrete_fields if field.attname in self.FIELDS)
+
+    @property
+    def cache(self):
+        # Looked up per call so that overridden CACHES settings are honoured
+        return caches[self.cache_alias]
+
+    def make_key(self, user_id):
+        return f"{self.KEY_PREFIX}:{user_id}"
+
+    def get_user(self, user_id):
+        """
+        Returns the active or inactive student with this id, from the cache when it holds them.
+
+        Returns:
+            Student | None: The student, or None when there is none.
+        """
+        key = self.make_key(user_id)
+        values = self.cache.get(key)
+        if values is None:
+            values = Student._default_manager.filter(pk=user_id).values_list(*self.fields).first()
+            if values is None:
+                return None
+            self.cache.set(key, values, timeout=self.timeout)
+        return Student.from_db(DEFAULT_DB_ALIAS, self.fields, values)
+
+    def invalidate(self, user_id):
+        key = self.make_key(user_id)
+        self.cache.delete(key)
+        # Drop it again after commit, so a read inside the transaction cannot cache the old row
+        transaction.on_commit(lambda: self.cache.delete(key))
+
+
+_user_cache = None
+_user_cache_lock = threading.Lock()
+
+
+def get_user_cache():
+    """
+    Returns the process wide UserCache configured by ``settings.STUDENT_USER_CACHE``.
+    """
+    global _user_cache
+    if _user_cache is None:
+        with _user_cache_lock:
+            if _user_cache is None:
+                options = getattr(settings, 'STUDENT_USER_CACHE', {})
+                _user_cache = UserCache(cache_alias=options.get('CACHE_ALIAS', 'default'),
+                                        timeout=options.get('TIMEOUT', 300))
+    return _user_cache
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def invalidate_cached_user(sender, instance, raw=False, **kwargs):
+    # Password changes, profile edits and the last_login update on sign in all save the student
+    if not raw:
+        get_user_cache().invalidate(instance.pk)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class StudentConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'student'
+
+    def ready(self):
+        # Drops the cached user of a student when the student is saved or deleted
+        import services.user_cache  # noqa: F401
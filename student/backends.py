@@ -0,0 +1,16 @@
+from django.contrib.auth.backends import ModelBackend
+
+from services.user_cache import get_user_cache
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend loading the signed in user from ``services.user_cache`` instead of the database.
+
+    Signing in still checks the password against the database; ``django.contrib.auth`` still
+    checks the session auth hash of the cached user on every request.
+    """
+
+    def get_user(self, user_id):
+        user = get_user_cache().get_user(user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
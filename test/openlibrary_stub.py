@@ -0,0 +1,244 @@
+"""
+A local stand-in for openlibrary.org/search.json used by the tests and benchmarks, and a writer of
+files in the format of the OpenLibrary data dumps.
+
+Example Usage:
+    with OpenLibraryStub(latency=0.05) as stub:
+        service = OpenLibraryBookRentalService(api_base_url=stub.search_url)
+        stub.fail_next(2, status=503)
+        service.search_book("Dune")
+"""
+import gzip
+import json
+import multiprocessing
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from rental.utils import isbn10_to_isbn13
+
+
+def make_docs(count, title='Stub Book'):
+    """
+    Builds ``count`` OpenLibrary style search docs.
+    """
+    return [{
+        'title': f"{title} {index}",
+        'author_name': [f"Author {index}", f"Co-Author {index}"],
+        'number_of_pages_median': 100 + index,
+        'isbn': [f"97800000{index:05d}", f"00000{index:05d}"],
+    } for index in range(count)]
+
+
+def write_edition_dump(path, count, duplicate_every=5, author_every=10):
+    """
+    Writes an OpenLibrary style editions dump of ``count`` distinct editions, gzipped when the path
+    ends in ``.gz``.
+
+    Every ``duplicate_every``-th edition is followed by a copy listing its ISBN-10 as a hyphenated
+    ISBN-13, and an author record is written every ``author_every`` lines, as in the full dump.
+
+    Returns:
+        int: The number of lines written.
+    """
+    opener = gzip.open if str(path).endswith('.gz') else open
+    lines = 0
+    with opener(path, 'wt', encoding='utf-8') as dump:
+        for index in range(count):
+            isbn10 = f"{index:09d}X"
+            edition = {'key': f"/books/OL{index}M", 'title': f"Dump Book {index}", 'by_statement': f"Author {index}",
+                       'number_of_pages': 100 + index % 400, 'isbn_10': [isbn10],
+                       'type': {'key': '/type/edition'}}
+            records = [edition]
+            if duplicate_every and index % duplicate_every == 0:
+                isbn13 = isbn10_to_isbn13(isbn10)
+                records.append({**edition, 'key': f"/books/OL{index}M2", 'isbn_10': [],
+                                'isbn_13': [f"{isbn13[:3]}-{isbn13[3:]}"]})
+            for record in records:
+                if author_every and lines % author_every == 0:
+                    dump.write(f"/type/author\t/authors/OL{lines}A\t1\t2023-01-01T00:00:00\t"
+                               f"{json.dumps({'name': f'Author {lines}'})}\n")
+                    lines += 1
+                dump.write(f"/type/edition\t{record['key']}\t3\t2023-01-01T00:00:00\t{json.dumps(record)}\n")
+                lines += 1
+    return lines
+
+
+def make_full_docs(count, isbns=200, title='Stub Book'):
+    """
+    Builds ``count`` search docs with every field OpenLibrary returns when ``fields`` is not given,
+    with ``isbns`` ISBNs each, sized like the docs of popular works.
+    """
+    docs = []
+    for index in range(count):
+        editions = [f"OL{index * 1000 + edition}M" for edition in range(isbns // 2)]
+        docs.append({
+            'key': f"/works/OL{index}W",
+            'type': 'work',
+            'seed': [f"/books/{edition}" for edition in editions] + [f"/works/OL{index}W"],
+            'title': f"{title} {index}",
+            'title_suggest': f"{title} {index}",
+            'title_sort': f"{title} {index}",
+            'edition_count': len(editions),
+            'edition_key': editions,
+            'publish_date': [f"{1950 + year % 70}" for year in range(len(editions))],
+            'publish_year': [1950 + year % 70 for year in range(len(editions))],
+            'first_publish_year': 1950,
+            'number_of_pages_median': 100 + index,
+            'lccn': [f"{index:08d}{edition:02d}" for edition in range(10)],
+            'publish_place': ["London", "New York", "Paris", "Berlin"],
+            'oclc': [f"{index * 7 + edition}" for edition in range(20)],
+            'contributor': [f"Translator {edition}" for edition in range(10)],
+            'lcc': ["PR-6023.00000000.A93"],
+            'ddc': ["823.912"],
+            'isbn': [f"97800{index:04d}{edition:04d}" for edition in range(isbns)],
+            'last_modified_i': 1700000000,
+            'ebook_count_i': 5,
+            'ebook_access': 'borrowable',
+            'has_fulltext': True,
+            'public_scan_b': False,
+            'ia': [f"stubbook{index}_{edition}" for edition in range(20)],
+            'publisher': [f"Publisher {edition}" for edition in range(30)],
+            'language': ["eng", "fre", "ger", "spa", "ita"],
+            'author_key': [f"OL{index}A"],
+            'author_name': [f"Author {index}"],
+            'author_alternative_name': [f"A. {index}", f"Author N. {index}"],
+            'subject': [f"Subject {subject}" for subject in range(40)],
+            'subject_key': [f"subject_{subject}" for subject in range(40)],
+            'place': ["England", "London"],
+            'time': ["20th century"],
+            'id_goodreads': [f"{index * 11 + edition}" for edition in range(15)],
+            'id_librarything': [f"{index * 13}"],
+            'ratings_average': 4.1,
+            'ratings_count': 1200,
+            'want_to_read_count': 3400,
+        })
+    return docs
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.stub.lock:
+            self.server.stub.connections += 1
+
+    def do_GET(self):
+        stub = self.server.stub
+        parsed = urlparse(self.path)
+        query = {name: values[0] for name, values in parse_qs(parsed.query).items()}
+        with stub.lock:
+            stub.requests.append(query)
+            status = stub.failures.pop(0) if stub.failures else 200
+        if stub.latency:
+            time.sleep(stub.latency)
+
+        if parsed.path != '/search.json':
+            status = 404
+        body = b'{}' if status != 200 else json.dumps(stub.payload_for(query)).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up waiting, e.g. after a read timeout
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Benchmarks open hundreds of connections at once
+    request_queue_size = 1024
+
+
+class OpenLibraryStub:
+    """
+    Serves ``/search.json`` on a random local port from a background thread.
+
+    Attributes:
+        latency (float): Seconds every response is delayed by.
+        docs (list): The docs returned for every search.
+        requests (list): The query parameters of every request received.
+        connections (int): The number of TCP connections accepted.
+    """
+
+    def __init__(self, latency=0.0, docs=None):
+        self.latency = latency
+        self.docs = make_docs(3) if docs is None else docs
+        self.requests = []
+        self.connections = 0
+        self.failures = []
+        self.lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def search_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/search.json"
+
+    def fail_next(self, count, status=503):
+        """
+        Makes the next ``count`` requests answer with ``status``.
+        """
+        with self.lock:
+            self.failures.extend([status] * count)
+
+    def payload_for(self, query):
+        # Like OpenLibrary, honour the ``limit`` and ``fields`` parameters
+        docs = self.docs
+        if 'limit' in query:
+            docs = docs[:int(query['limit'])]
+        if 'fields' in query:
+            fields = query['fields'].split(',')
+            docs = [{field: doc[field] for field in fields if field in doc} for doc in docs]
+        return {'numFound': len(self.docs), 'q': query.get('title', ''), 'docs': docs}
+
+    def start(self):
+        self._server = _StubServer(('127.0.0.1', 0), _StubHandler)
+        self._server.stub = self
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={'poll_interval': 0.05},
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def _serve(queue, kwargs):
+    stub = OpenLibraryStub(**kwargs).start()
+    queue.put(stub.search_url)
+    stub._thread.join()
+
+
+@contextmanager
+def stub_in_subprocess(**kwargs):
+    """
+    Runs an OpenLibraryStub in a child process and yields its search URL.
+
+    Benchmarks use this so the stub does not compete with the code under test for the GIL.
+    """
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve, args=(queue, kwargs), daemon=True)
+    process.start()
+    try:
+        yield queue.get(timeout=10)
+    finally:
+        process.terminate()
+        process.join()
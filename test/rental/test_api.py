@@ -0,0 +1,152 @@
+import uuid
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from rental.models import Book, Rental
+from services.book_rental_service import OpenLibraryBookRentalService
+from services.panel_cache import get_panel_cache
+from services.search_docs import SearchDoc
+from student.models import Student
+from test.rental.test_rented_books_panel_cache import LOCMEM_CACHES
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class JSONAPITest(TestCase):
+    def setUp(self):
+        get_panel_cache().cache.clear()
+        self.student = Student.objects.create(username='test', email='test@email.com')
+        self.other = Student.objects.create(username='other', email='other@email.com')
+        self.return_date = (timezone.now() + timedelta(days=60)).isoformat()
+        self.client.force_login(self.student)
+
+    def rent(self, **data):
+        book = {'title': "Dune", 'author': "Frank Herbert", 'page_count': 400, 'isbn': "0306406152",
+                'return_date': self.return_date}
+        return self.client.post(reverse('api_v1:rentals'), {**book, **data}, content_type='application/json')
+
+    def test_requires_authentication(self):
+        self.client.logout()
+        response = self.client.get(reverse('api_v1:rentals'))
+        self.assertEqual(response.status_code, 403)
+
+    def test_search_returns_slim_results(self):
+        docs = [SearchDoc("Dune", ["Frank Herbert"], 412, ["9780441013593"]), {'title': "Dune Messiah"}]
+        with patch.object(OpenLibraryBookRentalService, 'search_book', return_value=docs) as mock_search:
+            response = self.client.get(reverse('api_v1:search'), {'q': "Dune"})
+        mock_search.assert_called_once_with("Dune")
+        self.assertEqual(response.json()['results'], [
+            {'title': "Dune", 'authors': ["Frank Herbert"], 'page_count': 412, 'isbn': ["9780441013593"],
+             'source': None},
+            {'title': "Dune Messiah", 'page_count': None, 'source': None},
+        ])
+
+        with patch.object(OpenLibraryBookRentalService, 'search_book', return_value=docs):
+            response = self.client.get(reverse('api_v1:search'), {'q': "Dune"},
+                                       headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_search_requires_a_query(self):
+        response = self.client.get(reverse('api_v1:search'))
+        self.assertEqual(response.status_code, 400)
+
+    def test_rent_and_list(self):
+        response = self.rent()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['title'], "Dune")
+        self.assertEqual(response.json()['fee_amount'], '4.00')
+
+        response = self.client.get(reverse('api_v1:rentals'))
+        self.assertEqual([rental['title'] for rental in response.json()['results']], ["Dune"])
+        self.assertIsNone(response.json()['next'])
+
+    def test_only_staff_rent_for_other_students(self):
+        response = self.rent(student_id=str(self.other.pk))
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Rental.objects.exists())
+
+        self.student.is_staff = True
+        self.student.save(update_fields=['is_staff'])
+        response = self.rent(student_id=str(self.other.pk))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Rental.objects.get().student_id_id, self.other.pk)
+
+    def test_unknown_student_is_a_client_error(self):
+        self.student.is_staff = True
+        self.student.save(update_fields=['is_staff'])
+        unknown = str(uuid.uuid4())
+
+        response = self.rent(student_id=unknown)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('student_id', response.json())
+        response = self.client.get(reverse('api_v1:rentals'), {'student_id': unknown})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Rental.objects.exists())
+
+    def test_bulk_rent_is_validated_as_a_whole(self):
+        books = [{'title': f"Book {index}", 'author': "Author", 'page_count': 100, 'isbn': f"978{index:010d}"}
+                 for index in range(3)]
+        response = self.client.post(reverse('api_v1:rentals_bulk'),
+                                    {'return_date': self.return_date, 'books': books + [{'title': "No pages"}]},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Rental.objects.exists())
+
+        response = self.client.post(reverse('api_v1:rentals_bulk'), {'return_date': self.return_date, 'books': books},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(sorted(rental['title'] for rental in response.json()['results']),
+                         ["Book 0", "Book 1", "Book 2"])
+
+    def test_list_is_cursor_paginated_with_etag(self):
+        book = Book.objects.create(title="Dune")
+        Rental.objects.bulk_create([Rental(student_id=self.student, book_id=book) for _ in range(5)])
+
+        response = self.client.get(reverse('api_v1:rentals'), {'page_size': 3})
+        self.assertEqual(len(response.json()['results']), 3)
+        next_response = self.client.get(response.json()['next'])
+        self.assertEqual(len(next_response.json()['results']), 2)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('api_v1:rentals'), {'page_size': 3},
+                                       headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse([query for query in queries if 'FROM "Rental"' in query['sql']])
+
+    def test_extend(self):
+        rental_id = self.rent().json()['rental_id']
+
+        response = self.client.post(reverse('api_v1:rentals_extend'), {'days': 10}, content_type='application/json')
+        self.assertEqual([rental['rental_id'] for rental in response.json()['results']], [rental_id])
+
+        new_return_date = (timezone.now() + timedelta(days=90)).date()
+        response = self.client.post(reverse('api_v1:rental_extend', args=[rental_id]),
+                                    {'return_date': new_return_date.isoformat()}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Rental.objects.get().return_date.date(), new_return_date)
+
+    def test_cannot_extend_the_rental_of_another_student(self):
+        rental = Rental.objects.create(student_id=self.other, book_id=Book.objects.create(title="Dune"),
+                                       return_date=timezone.now())
+        response = self.client.post(reverse('api_v1:rental_extend', args=[rental.rental_id]),
+                                    {'return_date': '2030-01-01'}, content_type='application/json')
+        self.assertEqual(response.status_code, 404)
+
+    def test_return(self):
+        rental_id = self.rent().json()['rental_id']
+        response = self.client.post(reverse('api_v1:rental_return', args=[rental_id]))
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_login(Student.objects.create(username='staff', email='staff@email.com', is_staff=True))
+        response = self.client.post(reverse('api_v1:rental_return', args=[rental_id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.json()['returned_at'])
+        self.assertIsNotNone(Rental.objects.get().returned_at)
+
+        response = self.client.get(reverse('api_v1:rentals'), {'student_id': str(self.student.pk), 'active': '1'})
+        self.assertEqual(response.json()['results'], [])
@@ -0,0 +1,87 @@
+import threading
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth.hashers import make_password
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rental.models import Book, Rental
+from rental.views import AsyncBookSearchView
+from services.book_rental_service import OpenLibraryBookRentalService
+from services.local_search import LocalBookSearch
+from services.search_docs import SearchDoc
+from student.models import Student
+
+# The manifest storage needs collectstatic to have run
+STATIC_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+@override_settings(STORAGES=STATIC_STORAGES)
+class AsyncSearchViewsTest(TestCase):
+    def setUp(self):
+        self.student = Student.objects.create(username='test', email='test@email.com',
+                                              password=make_password('password'), is_staff=True)
+        Rental.objects.create(student_id=self.student,
+                              book_id=Book.objects.create(title="Rented Book", page_count=200, isbn="1234567890"),
+                              return_date=timezone.now() + timedelta(days=14))
+
+    async def test_search_requires_login(self):
+        response = await self.async_client.get(reverse('book_search'))
+        self.assertEqual(response.status_code, 302)
+
+    async def test_search_get_lists_rented_books(self):
+        await self.async_client.aforce_login(self.student)
+        response = await self.async_client.get(reverse('book_search'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Rented Book")
+
+    async def test_search_post_renders_results(self):
+        await self.async_client.aforce_login(self.student)
+        with patch.object(OpenLibraryBookRentalService, 'asearch_book',
+                          return_value=[{'title': 'Found Book', 'author_name': ['A', 'B']}]) as mock_search:
+            response = await self.async_client.post(reverse('book_search'), {'search_query': 'Found'})
+        mock_search.assert_awaited_once_with('Found')
+        self.assertContains(response, "Found Book")
+        self.assertContains(response, "Rented Book")
+
+    async def test_upstream_search_starts_while_the_panel_renders(self):
+        upstream_started = threading.Event()
+        panels_waited = []
+        get_rented_books_panel = AsyncBookSearchView.get_rented_books_panel
+
+        def slow_panel(view, *args, **kwargs):
+            # Only finishes once the OpenLibrary call is under way, or gives up after a while
+            panels_waited.append(upstream_started.wait(5))
+            return get_rented_books_panel(view, *args, **kwargs)
+
+        async def fetch(service, title):
+            upstream_started.set()
+            return [SearchDoc("Found Book", ["A"], 100, [])]
+
+        await self.async_client.aforce_login(self.student)
+        with patch.object(AsyncBookSearchView, 'get_rented_books_panel', slow_panel), \
+                patch.object(OpenLibraryBookRentalService, '_afetch_search_results', fetch), \
+                patch.object(LocalBookSearch, 'search_docs', return_value=[]):
+            response = await self.async_client.post(reverse('book_search'), {'search_query': 'Panel Race'})
+        self.assertEqual(panels_waited, [True])
+        self.assertContains(response, "Found Book")
+        self.assertContains(response, "Rented Book")
+
+    async def test_borrowed_books_requires_staff(self):
+        student = await Student.objects.acreate(username='other', email='other@email.com')
+        await self.async_client.aforce_login(student)
+        response = await self.async_client.get(reverse('admin_borrowed_books', args=[self.student.student_id]))
+        self.assertEqual(response.status_code, 302)
+
+    async def test_borrowed_books_post_renders_results(self):
+        await self.async_client.aforce_login(self.student)
+        with patch.object(OpenLibraryBookRentalService, 'asearch_book', return_value=[{'title': 'Found Book'}]):
+            response = await self.async_client.post(reverse('admin_borrowed_books', args=[self.student.student_id]),
+                                                     {'search_query': 'Found'})
+        self.assertContains(response, "Found Book")
+        self.assertContains(response, "Rented Book")
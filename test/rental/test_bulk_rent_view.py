@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rental.models import Rental
+from student.models import Student
+
+STATIC_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+@override_settings(STORAGES=STATIC_STORAGES)
+class BookBulkRentViewTest(TestCase):
+    def setUp(self):
+        self.librarian = Student.objects.create(username='librarian', email='librarian@email.com', is_staff=True)
+        self.student = Student.objects.create(username='student', email='student@email.com')
+        self.return_date = (timezone.now() + timedelta(days=60)).strftime('%B %d, %Y, %I:%M %p')
+        self.client.force_login(self.librarian)
+
+    def test_rents_all_books(self):
+        response = self.client.post(reverse('book_rent_bulk'), {
+            'student_id': self.student.student_id,
+            'return_date': self.return_date,
+            'books': "0306406152, Dune, Frank Herbert, 400\n\n9780804429573, \"Emma, Vol 1\", Jane Austen, 300\n",
+        })
+
+        self.assertContains(response, "2 Book(s) Rented")
+        self.assertEqual(Rental.objects.filter(student_id=self.student).count(), 2)
+        self.assertTrue(Rental.objects.filter(book_id__title="Emma, Vol 1").exists())
+
+    def test_invalid_line_rejects_whole_batch(self):
+        response = self.client.post(reverse('book_rent_bulk'), {
+            'student_id': self.student.student_id,
+            'return_date': self.return_date,
+            'books': "0306406152, Dune, Frank Herbert, 400\n9780804429573, Emma, Jane Austen, many\n",
+        })
+
+        self.assertContains(response, "Line 2: the page count must be a positive number.")
+        self.assertFalse(Rental.objects.exists())
+
+    def test_requires_staff(self):
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('book_rent_bulk'))
+        self.assertEqual(response.status_code, 302)
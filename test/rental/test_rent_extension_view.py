@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rental.models import Book, Rental
+from student.models import Student
+from test.rental.test_bulk_rent_view import STATIC_STORAGES
+
+
+@override_settings(STORAGES=STATIC_STORAGES)
+class BookRentExtensionViewTest(TestCase):
+    def setUp(self):
+        self.student = Student.objects.create(username='student', email='student@email.com')
+        book = Book.objects.create(title="Dune", page_count=400)
+        self.return_date = timezone.now() + timedelta(days=10)
+        self.rentals = [Rental.objects.create(student_id=self.student, book_id=book, return_date=self.return_date)
+                        for _ in range(2)]
+        self.client.force_login(self.student)
+
+    def test_extends_all_active_rentals_of_the_student(self):
+        response = self.client.post(reverse('book_rent_extension'), {'days': 14})
+
+        self.assertContains(response, "2 rental(s) extended by 14 days")
+        self.assertEqual(set(Rental.objects.values_list('return_date', flat=True)),
+                         {self.return_date + timedelta(days=14)})
+
+    def test_rejects_invalid_days(self):
+        response = self.client.post(reverse('book_rent_extension'), {'days': 0})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, "rental(s) extended")
+        self.assertEqual(set(Rental.objects.values_list('return_date', flat=True)), {self.return_date})
@@ -0,0 +1,103 @@
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rental.models import Book, Rental
+from rental.pagination import KeysetPaginator
+from services.rental_summary import rebuild_summaries
+from student.models import Student
+from test.rental.test_async_views import STATIC_STORAGES
+
+
+class KeysetPaginatorTest(TestCase):
+    def setUp(self):
+        self.student = Student.objects.create(username='test', email='test@email.com')
+        book = Book.objects.create(title="Dune", page_count=100, isbn="9780306406157")
+        now = timezone.now()
+        rentals = Rental.objects.bulk_create([Rental(student_id=self.student, book_id=book) for _ in range(25)])
+        # Pairs of rentals share a timestamp, so the rental id has to break the tie
+        for index, rental in enumerate(rentals):
+            rental.created = now - timedelta(minutes=index // 2)
+        # created is set on insert, so the timestamps are written afterwards
+        Rental.objects.bulk_update(rentals, ['created'])
+        self.paginator = KeysetPaginator(Rental.objects.filter(student_id=self.student), per_page=10,
+                                         ordering=('-created', '-rental_id'))
+
+    def test_pages_cover_every_rental_once_in_order(self):
+        seen, cursor, pages = [], None, 0
+        while True:
+            page = self.paginator.page(cursor)
+            seen.extend(page)
+            pages += 1
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len({rental.rental_id for rental in seen}), 25)
+        self.assertEqual(seen, sorted(seen, key=lambda rental: (rental.created, rental.rental_id), reverse=True))
+
+    def test_deep_page_is_one_query(self):
+        cursor = self.paginator.page(self.paginator.page().next_cursor).next_cursor
+        with self.assertNumQueries(1):
+            page = self.paginator.page(cursor)
+        self.assertEqual(len(page), 5)
+        self.assertFalse(page.has_next)
+
+    def test_condition_bounds_the_leading_field(self):
+        created = timezone.now()
+        condition = self.paginator.after([created, self.student.pk])
+        sql = str(Rental.objects.filter(condition).query)
+        # The inclusive bound on created is ANDed with the tie breaking OR, so it can start an index range
+        self.assertIn('WHERE ("Rental"."created" <= ', sql)
+        self.assertIn(' AND ("Rental"."created" < ', sql)
+        ascending = KeysetPaginator(Rental.objects.all(), ordering=('return_date', 'rental_id'))
+        self.assertIn('"return_date" >= ', str(Rental.objects.filter(ascending.after([created, self.student.pk])).query))
+
+    def test_invalid_cursor_returns_first_page(self):
+        page = self.paginator.page('not-a-cursor')
+        self.assertTrue(page.is_first)
+        self.assertEqual(len(page), 10)
+
+
+@override_settings(STORAGES=STATIC_STORAGES)
+class RentedBooksListingTest(TestCase):
+    def setUp(self):
+        self.student = Student.objects.create(username='test', email='test@email.com',
+                                              password=make_password('password'), is_staff=True)
+        now = timezone.now()
+        rentals = Rental.objects.bulk_create(
+            [Rental(student_id=self.student, book_id=Book.objects.create(title=f"Book {index:02}"),
+                    return_date=now + timedelta(days=7 - index, hours=1))
+             for index in range(25)])
+        for index, rental in enumerate(rentals):
+            rental.created = now - timedelta(days=index)
+        Rental.objects.bulk_update(rentals, ['created'])
+        self.client.force_login(self.student)
+
+    def test_listing_is_paginated(self):
+        response = self.client.get(reverse('book_search'))
+        self.assertEqual(len(response.context['rented_books']), 20)
+        self.assertContains(response, "Book 00")
+        self.assertNotContains(response, "Book 24")
+
+        response = self.client.get(reverse('book_search'), {'cursor': response.context['rented_books'].next_cursor})
+        self.assertEqual(len(response.context['rented_books']), 5)
+        self.assertContains(response, "Book 24")
+        self.assertNotContains(response, "Book 00")
+
+    def test_active_only_hides_returned_rentals_and_matches_books_out(self):
+        # Books 08-24 are overdue; 12-24 have been returned
+        Rental.objects.filter(book_id__title__gte="Book 12").update(returned_at=timezone.now())
+        rebuild_summaries()
+
+        response = self.client.get(reverse('admin_borrowed_books', args=[self.student.student_id]),
+                                   {'active': '1'})
+        titles = [rental.book_id.title for rental in response.context['rented_books']]
+        self.assertEqual(titles, [f"Book {index:02}" for index in range(12)])
+        self.assertFalse(response.context['rented_books'].has_next)
+        self.assertContains(response, f"Books out: {len(titles)} of 25 rented")
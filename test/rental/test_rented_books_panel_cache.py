@@ -0,0 +1,93 @@
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rental.models import Book, Rental
+from services.book_rental_service import OpenLibraryBookRentalService
+from services.catalogue import BookCatalogue
+from services.panel_cache import get_panel_cache
+from student.models import Student
+from test.rental.test_async_views import STATIC_STORAGES
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'panel-cache-tests'},
+}
+
+
+@override_settings(STORAGES=STATIC_STORAGES, CACHES=LOCMEM_CACHES)
+class RentedBooksPanelCacheTest(TestCase):
+    def setUp(self):
+        get_panel_cache().cache.clear()
+        self.student = Student.objects.create(username='test', email='test@email.com',
+                                              password=make_password('password'), is_staff=True)
+        self.service = OpenLibraryBookRentalService(catalogue=BookCatalogue())
+        self.return_date = (timezone.now() + timedelta(days=10)).strftime('%B %d, %Y, %I:%M %p')
+        self.rental = self.service.rent_book(student_id=self.student.student_id, title="Dune", author="Frank Herbert",
+                                             page_count=400, isbn="0306406152", return_date=self.return_date)
+        self.client.force_login(self.student)
+
+    def test_panel_is_rendered_once_per_version(self):
+        response = self.client.get(reverse('book_search'))
+        self.assertIn('rented_books', response.context)
+        self.assertContains(response, "Dune")
+
+        response = self.client.get(reverse('book_search'))
+        self.assertNotIn('rented_books', response.context)
+        self.assertContains(response, "Dune")
+
+    def test_renting_and_extending_refresh_the_panel(self):
+        self.client.get(reverse('book_search'))
+        self.service.rent_book(student_id=self.student.student_id, title="Emma", author="Jane Austen",
+                               page_count=200, isbn="9780141439587", return_date=self.return_date)
+        response = self.client.get(reverse('book_search'))
+        self.assertIn('rented_books', response.context)
+        self.assertContains(response, "Emma")
+
+        # The fee of a rental kept within the free month does not change, but its return date does
+        new_return_date = timezone.now() + timedelta(days=12)
+        self.service.rent_extension(self.rental.rental_id, new_return_date.strftime('%Y-%m-%d'))
+        response = self.client.get(reverse('book_search'))
+        self.assertIn('rented_books', response.context)
+
+    def test_admin_page_reuses_the_panel_of_the_student(self):
+        self.client.get(reverse('book_search'))
+        response = self.client.get(reverse('admin_borrowed_books', args=[self.student.student_id]))
+        self.assertNotIn('rented_books', response.context)
+        self.assertContains(response, "Dune")
+
+    def test_cached_panel_holds_the_csrf_token_of_the_request(self):
+        self.client.get(reverse('book_search'))
+        self.client.logout()
+        self.client.force_login(self.student)
+
+        response = self.client.get(reverse('book_search'))
+        self.assertNotIn('rented_books', response.context)
+        self.assertNotContains(response, "csrf_input")
+        self.assertContains(response, 'name="csrfmiddlewaretoken"', count=3)
+
+    def test_conditional_get_is_answered_with_304_until_the_rentals_change(self):
+        response = self.client.get(reverse('book_search'))
+        etag = response['ETag']
+
+        response = self.client.get(reverse('book_search'), headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        response = self.client.get(reverse('book_search'), {'active': '1'}, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+
+        self.service.extend_rentals(self.student.student_id, days=1)
+        response = self.client.get(reverse('book_search'), headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_pages_are_cached_separately(self):
+        Rental.objects.bulk_create([Rental(student_id=self.student, book_id=Book.objects.create(title=f"Book {index}"))
+                                    for index in range(25)])
+        first = self.client.get(reverse('book_search'))
+        response = self.client.get(reverse('book_search'), {'cursor': first.context['rented_books'].next_cursor})
+        self.assertIn('rented_books', response.context)
+        self.assertEqual(len(response.context['rented_books']), 6)
@@ -0,0 +1,86 @@
+from django.contrib.auth.hashers import make_password
+from django.template.loader import render_to_string
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rental.models import Book
+from services.http_client import PooledHTTPClient
+from services.metrics import MetricsRegistry, get_metrics_registry, start_request_timings, stop_request_timings
+from student.models import Student
+from test.openlibrary_stub import OpenLibraryStub
+from test.rental.test_async_views import STATIC_STORAGES
+
+
+class RequestTimingsTest(TestCase):
+    def setUp(self):
+        self.timings, token = start_request_timings()
+        self.addCleanup(stop_request_timings, token)
+
+    def test_queries_are_counted_and_timed(self):
+        list(Book.objects.all())
+        Book.objects.create(title="Dune")
+        self.assertEqual(self.timings.db_queries, 2)
+        self.assertGreater(self.timings.db_seconds, 0)
+
+    def test_http_calls_are_timed(self):
+        client = PooledHTTPClient()
+        self.addCleanup(client.close)
+        with OpenLibraryStub(latency=0.02) as stub:
+            client.get(stub.search_url)
+        self.assertEqual(self.timings.http_calls, 1)
+        self.assertGreaterEqual(self.timings.http_seconds, 0.02)
+
+    def test_template_rendering_is_timed(self):
+        with override_settings(STORAGES=STATIC_STORAGES):
+            render_to_string('login.html')
+        self.assertGreater(self.timings.render_seconds, 0)
+
+
+class MetricsRegistryTest(TestCase):
+    def test_renders_cumulative_histograms(self):
+        registry = MetricsRegistry()
+        timings, token = start_request_timings()
+        stop_request_timings(token)
+        timings.db_queries = 3
+        registry.observe('book_search', 200, 0.03, timings)
+        registry.observe('book_search', 200, 2.0, timings)
+
+        text = registry.render()
+
+        self.assertIn('bookflow_requests_total{view="book_search",status="2xx"} 2', text)
+        self.assertIn('bookflow_request_duration_seconds_bucket{view="book_search",le="0.05"} 1', text)
+        self.assertIn('bookflow_request_duration_seconds_bucket{view="book_search",le="+Inf"} 2', text)
+        self.assertIn('bookflow_request_db_queries_bucket{view="book_search",le="5"} 2', text)
+        self.assertIn('bookflow_request_duration_seconds_count{view="book_search"} 2', text)
+
+
+@override_settings(STORAGES=STATIC_STORAGES)
+class RequestMetricsMiddlewareTest(TestCase):
+    def setUp(self):
+        get_metrics_registry().clear()
+        self.staff = Student.objects.create(username='staff', email='staff@email.com',
+                                            password=make_password('password'), is_staff=True)
+
+    def test_sync_view_gets_server_timing(self):
+        response = self.client.get(reverse('login'))
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries", .*render;dur=[\d.]+')
+
+    async def test_async_view_counts_its_queries(self):
+        await self.async_client.aforce_login(self.staff)
+        await self.async_client.get(reverse('book_search'), {'active': '1'})
+        response = await self.async_client.get(reverse('book_search'))
+        # The rental summary and the rented books page; the session and the user come from the cache
+        self.assertIn('desc="2 queries"', response['Server-Timing'])
+
+    def test_metrics_endpoint_is_staff_only(self):
+        self.client.get(reverse('login'))
+        student = Student.objects.create(username='student', email='student@email.com')
+        self.client.force_login(student)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 302)
+
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertContains(response, 'bookflow_requests_total{view="login",status="2xx"} 1')
+        self.assertContains(response, 'bookflow_request_render_seconds_count{view="login"} 1')
@@ -0,0 +1,66 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rental.models import Book, Rental
+from rental.views import StudentListView
+from services.rental_summary import rebuild_summaries
+from student.models import Student
+from test.rental.test_async_views import STATIC_STORAGES
+
+
+@override_settings(STORAGES=STATIC_STORAGES)
+class StudentListViewTest(TestCase):
+    def setUp(self):
+        self.staff = Student.objects.create(username='librarian', email='librarian@email.com', is_staff=True)
+        students = Student.objects.bulk_create([Student(username=f'student{index:03}',
+                                                        email=f'pupil{index:03}@email.com')
+                                                for index in range(60)])
+        book = Book.objects.create(title="Dune", page_count=100)
+        now = timezone.now()
+        # Two active rentals and one overdue rental with an accrued late fee
+        Rental.objects.bulk_create([Rental(student_id=students[0], book_id=book, return_date=now + timedelta(days=days),
+                                           fee_amount=Decimal(fee), overdue_fee=Decimal(overdue_fee))
+                                    for days, fee, overdue_fee in [(5, '1.25', '0'), (9, '2.00', '0'),
+                                                                   (-1, '3.00', '0.50')]])
+        # bulk_create bypasses the summary deltas
+        rebuild_summaries()
+        self.client.force_login(self.staff)
+
+    def test_rows_are_read_from_the_summaries_in_the_page_query(self):
+        self.client.get(reverse('admin_list_students'))
+        # The request savepoint and the page itself, however many rentals there are; the session and
+        # the user come from the cache
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('admin_list_students'))
+
+        students = response.context['students']
+        self.assertEqual(len(students), StudentListView.students_per_page)
+        first = students.items[1]
+        self.assertEqual(first.username, 'student000')
+        # The overdue rental is still out
+        self.assertEqual(first.active_rentals, 3)
+        self.assertEqual(first.outstanding_fees, Decimal('6.75'))
+        self.assertEqual(students.items[2].active_rentals, 0)
+        self.assertEqual(students.items[2].outstanding_fees, 0)
+
+    def test_next_page_continues_after_last_username(self):
+        first_page = self.client.get(reverse('admin_list_students')).context['students']
+        response = self.client.get(reverse('admin_list_students'), {'cursor': first_page.next_cursor})
+
+        students = response.context['students']
+        self.assertEqual([student.username for student in students],
+                         [f'student{index:03}' for index in range(49, 60)])
+        self.assertFalse(students.has_next)
+
+    def test_filters_by_username_or_email_prefix(self):
+        response = self.client.get(reverse('admin_list_students'), {'q': 'student05'})
+        self.assertEqual([student.username for student in response.context['students']],
+                         [f'student{index:03}' for index in range(50, 60)])
+
+        response = self.client.get(reverse('admin_list_students'), {'q': 'pupil01'})
+        self.assertEqual(len(response.context['students']), 10)
+        self.assertContains(response, 'value="pupil01"')
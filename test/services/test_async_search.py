@@ -0,0 +1,56 @@
+import asyncio
+import time
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from services.book_rental_service import OpenLibraryBookRentalService
+from services.http_client import AsyncPooledHTTPClient
+from services.search_cache import SearchResultCache
+from test.openlibrary_stub import OpenLibraryStub, make_docs
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'async-search-tests'},
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AsyncSearchBookTest(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.stub = OpenLibraryStub(docs=make_docs(2)).start()
+        self.addCleanup(self.stub.stop)
+        self.http_client = AsyncPooledHTTPClient(max_retries=1, read_timeout=1, backoff_factor=0.001)
+        self.service = OpenLibraryBookRentalService(search_cache=SearchResultCache(),
+                                                    async_http_client=self.http_client,
+                                                    api_base_url=self.stub.search_url)
+
+    async def test_asearch_book_calls_stub_and_caches(self):
+        books = await self.service.asearch_book("Dune")
+        again = await self.service.asearch_book("dune")
+        await self.http_client.aclose()
+
+        self.assertEqual([book['title'] for book in books], ['Stub Book 0', 'Stub Book 1'])
+        self.assertEqual(again, books)
+        self.assertEqual(len(self.stub.requests), 1)
+
+    async def test_asearch_book_retries_then_gives_up(self):
+        self.stub.fail_next(2, status=503)
+        books = await self.service.asearch_book("Dune")
+        await self.http_client.aclose()
+
+        self.assertEqual(books, [])
+        self.assertEqual(len(self.stub.requests), 2)
+        self.assertEqual(self.http_client.stats.snapshot()['errors'], 1)
+
+    async def test_searches_run_concurrently(self):
+        self.stub.latency = 0.2
+        started = time.perf_counter()
+        results = await asyncio.gather(*(self.service.asearch_book(f"Title {index}") for index in range(20)))
+        elapsed = time.perf_counter() - started
+        await self.http_client.aclose()
+
+        self.assertEqual(len(results), 20)
+        self.assertEqual(len(self.stub.requests), 20)
+        # Twenty sequential searches would take at least four seconds
+        self.assertLess(elapsed, 2)
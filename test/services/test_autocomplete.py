@@ -0,0 +1,166 @@
+import time
+import uuid
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rental.models import Book, Rental
+from services import autocomplete
+from services.autocomplete import AutocompleteSnapshot, BookAutocomplete
+from student.models import Student
+from test.rental.test_async_views import STATIC_STORAGES
+
+
+def titles(suggestions):
+    return [suggestion.title for suggestion in suggestions]
+
+
+class AutocompleteSnapshotTest(SimpleTestCase):
+    def setUp(self):
+        self.ids = [uuid.uuid4() for _ in range(4)]
+        books = [(self.ids[0], "Dune", "Frank Herbert"),
+                 (self.ids[1], "Dune Messiah", "Frank Herbert"),
+                 (self.ids[2], "The Left Hand of Darkness", "Ursula K. Le Guin"),
+                 (self.ids[3], "Children of Dune", None)]
+        self.snapshot = AutocompleteSnapshot.build(books, {self.ids[1]: 5, self.ids[3]: 2})
+
+    def test_matches_any_word_ranked_by_rentals(self):
+        self.assertEqual(titles(self.snapshot.suggest("du")), ["Dune Messiah", "Children of Dune", "Dune"])
+        self.assertEqual(self.snapshot.suggest("du")[0].rentals, 5)
+
+    def test_matches_authors_and_phrases(self):
+        self.assertEqual(titles(self.snapshot.suggest("le gu")), ["The Left Hand of Darkness"])
+        self.assertEqual(titles(self.snapshot.suggest("HERB")), ["Dune Messiah", "Dune"])
+        self.assertEqual(titles(self.snapshot.suggest("dune mes")), ["Dune Messiah"])
+        self.assertEqual(self.snapshot.suggest("zz"), [])
+        self.assertEqual(self.snapshot.suggest("  "), [])
+
+    def test_limit(self):
+        self.assertEqual(titles(self.snapshot.suggest("dune", limit=1)), ["Dune Messiah"])
+
+    def test_entries_are_sorted_by_suffix(self):
+        books = [(uuid.uuid4(), title, author) for title, author in
+                 [("A", "B"), ("a b a", None), ("Ab", "Abc"), ("abc abd", "a"), ("The The", "Them"), ("x", "y z")]]
+        snapshot = AutocompleteSnapshot.build(books, {})
+        self.assertEqual(list(snapshot.entries), sorted(snapshot.entries, key=snapshot.suffix))
+        self.assertEqual(len(snapshot.entries), 16)
+
+    def test_changes_are_merged(self):
+        new_id = uuid.uuid4()
+        snapshot = self.snapshot.with_changes(
+            [(self.ids[0], "Dune (Deluxe Edition)", "Frank Herbert"), (new_id, "Dunes of Mars", None)],
+            {self.ids[0]: 10})
+
+        self.assertEqual(titles(snapshot.suggest("dune")),
+                         ["Dune (Deluxe Edition)", "Dune Messiah", "Children of Dune", "Dunes of Mars"])
+        self.assertEqual(titles(snapshot.suggest("deluxe")), ["Dune (Deluxe Edition)"])
+        self.assertEqual(list(snapshot.entries), sorted(snapshot.entries, key=snapshot.suffix))
+        # The old snapshot is left as it was
+        self.assertEqual(titles(self.snapshot.suggest("dunes")), [])
+
+    def test_broad_prefixes_walk_the_ranking(self):
+        with patch.object(AutocompleteSnapshot, 'RANKED_WALK_MIN_MATCHES', 1):
+            self.assertEqual(titles(self.snapshot.suggest("du")), ["Dune Messiah", "Children of Dune", "Dune"])
+            self.assertEqual(titles(self.snapshot.suggest("herb", limit=1)), ["Dune Messiah"])
+
+    def test_memoises_large_ranges(self):
+        books = [(uuid.uuid4(), f"Book {number}", None) for number in range(AutocompleteSnapshot.MEMO_MIN_MATCHES)]
+        snapshot = AutocompleteSnapshot.build(books, {})
+        first = snapshot.suggest("book")
+        self.assertIs(snapshot.suggest("book"), first)
+        self.assertIsNot(snapshot.suggest("book 1"), snapshot.suggest("book 1"))
+
+
+class BookAutocompleteTest(TestCase):
+    def setUp(self):
+        self.student = Student.objects.create(username='test', email='test@email.com')
+        self.dune = Book.objects.create(title="Dune", author="Frank Herbert")
+        self.messiah = Book.objects.create(title="Dune Messiah", author="Frank Herbert")
+        Rental.objects.create(student_id=self.student, book_id=self.messiah)
+        self.autocomplete = BookAutocomplete(refresh_interval=60)
+        self.autocomplete.refresh()
+
+    def test_builds_in_the_background(self):
+        book_autocomplete = BookAutocomplete()
+        with self.assertNumQueries(0), patch.object(autocomplete.threading, 'Thread') as mock_thread:
+            self.assertEqual(book_autocomplete.suggest("du"), [])
+            self.assertEqual(book_autocomplete.suggest("dune"), [])
+        # One build at a time
+        mock_thread.return_value.start.assert_called_once_with()
+
+        book_autocomplete.refresh()
+        with self.assertNumQueries(0):
+            self.assertEqual(titles(book_autocomplete.suggest("du")), ["Dune Messiah", "Dune"])
+
+    def test_warm_starts_the_build(self):
+        book_autocomplete = BookAutocomplete()
+        with patch.object(autocomplete.threading, 'Thread') as mock_thread:
+            book_autocomplete.warm()
+            self.autocomplete.warm()
+        mock_thread.return_value.start.assert_called_once_with()
+
+    def test_short_queries_get_nothing(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.autocomplete.suggest("d"), [])
+
+    def test_refresh_applies_new_books_and_rentals(self):
+        self.dune.title = "Dune (Deluxe Edition)"
+        self.dune.save()
+        Book.objects.create(title="Dune Chronicles")
+        Rental.objects.create(student_id=self.student, book_id=self.dune)
+        Rental.objects.create(student_id=self.student, book_id=self.dune)
+
+        self.autocomplete.refresh()
+        self.assertEqual(titles(self.autocomplete.suggest("du")),
+                         ["Dune (Deluxe Edition)", "Dune Messiah", "Dune Chronicles"])
+        self.assertEqual(self.autocomplete.suggest("du")[0].rentals, 2)
+
+        snapshot = self.autocomplete.snapshot()
+        self.autocomplete.refresh()
+        self.assertIs(self.autocomplete.snapshot(), snapshot)
+
+    def test_full_reload_drops_deleted_books(self):
+        self.dune.delete()
+        self.autocomplete.full_reload_interval = 0
+        self.autocomplete.refresh()
+        self.assertEqual(titles(self.autocomplete.suggest("du")), ["Dune Messiah"])
+
+    def test_due_refresh_runs_in_the_background(self):
+        self.autocomplete._refreshed_at = time.monotonic() - 61
+        with patch.object(autocomplete.threading, 'Thread') as mock_thread:
+            self.assertEqual(titles(self.autocomplete.suggest("du")), ["Dune Messiah", "Dune"])
+        mock_thread.return_value.start.assert_called_once_with()
+
+
+@override_settings(STORAGES=STATIC_STORAGES)
+class AutocompleteViewTest(TestCase):
+    def setUp(self):
+        self.student = Student.objects.create(username='test', email='test@email.com')
+        self.client.force_login(self.student)
+        self.book = Book.objects.create(title="Dune", author="Frank Herbert")
+        book_autocomplete = BookAutocomplete()
+        book_autocomplete.refresh()
+        patcher = patch.object(autocomplete, '_autocomplete', book_autocomplete)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_suggestions(self):
+        response = self.client.get(reverse('api_v1:autocomplete'), {'q': "dun"})
+        self.assertEqual(response.json(), {'results': [
+            {'book_id': str(self.book.pk), 'title': "Dune", 'author': "Frank Herbert", 'rentals': 0}]})
+        self.assertEqual(response['Cache-Control'], 'private, max-age=60')
+
+    def test_invalid_limit(self):
+        response = self.client.get(reverse('api_v1:autocomplete'), {'q': "dun", 'limit': "many"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_requires_authentication(self):
+        self.client.logout()
+        response = self.client.get(reverse('api_v1:autocomplete'), {'q': "dun"})
+        self.assertIn(response.status_code, (401, 403))
+
+    def test_search_form_uses_the_endpoint(self):
+        response = self.client.get(reverse('book_search'))
+        self.assertContains(response, f'data-autocomplete-url="{reverse("api_v1:autocomplete")}"')
+        self.assertContains(response, '<datalist id="book-suggestions">')
@@ -0,0 +1,66 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from rental.models import Book, Rental
+from services.book_rental_service import OpenLibraryBookRentalService
+from services.catalogue import BookCatalogue
+from student.models import Student
+
+
+def make_books(count, offset=0):
+    return [{'isbn': f"978{offset + index:010d}", 'title': f"Book {offset + index}",
+             'author': "Author", 'page_count': 100 + index} for index in range(count)]
+
+
+class RentBooksBulkTest(TestCase):
+    def setUp(self):
+        self.student = Student.objects.create(username='test', email='test@email.com')
+        self.service = OpenLibraryBookRentalService(catalogue=BookCatalogue())
+        self.return_date = (timezone.now() + timedelta(days=60)).strftime('%B %d, %Y, %I:%M %p')
+
+    def rent(self, books):
+        return self.service.rent_books_bulk(student_id=self.student.student_id, books=books,
+                                            return_date=self.return_date)
+
+    def test_rents_every_book_with_its_fee(self):
+        rentals = self.rent(make_books(30))
+
+        self.assertEqual(len(rentals), 30)
+        self.assertEqual(Rental.objects.filter(student_id=self.student).count(), 30)
+        self.assertEqual(Book.objects.count(), 30)
+        self.assertEqual(Rental.objects.get(book_id__title="Book 5").fee_amount, Decimal('1.05'))
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        with CaptureQueriesContext(connection) as small_batch:
+            self.rent(make_books(3))
+        with CaptureQueriesContext(connection) as large_batch:
+            self.rent(make_books(60, offset=100))
+        self.assertEqual(len(small_batch.captured_queries), len(large_batch.captured_queries))
+
+    def test_existing_and_repeated_books_are_reused(self):
+        existing = Book.objects.create(title="Dune", isbn="0306406152", page_count=400)
+        books = [
+            {'isbn': "978-0-306-40615-7", 'title': "Dune", 'author': "Frank Herbert", 'page_count': 400},
+            {'isbn': "0306406152", 'title': "Dune", 'author': "Frank Herbert", 'page_count': 400},
+            {'isbn': "", 'title': "Untitled Handout", 'author': "", 'page_count': 10},
+        ]
+        rentals = self.rent(books)
+
+        self.assertEqual([rental.book_id_id for rental in rentals[:2]], [existing.book_id, existing.book_id])
+        self.assertEqual(Book.objects.count(), 2)
+
+    def test_rent_book_inserts_one_priced_row(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.rent_book(student_id=self.student.student_id, title="Dune", author="Frank Herbert",
+                                   page_count=400, isbn="0306406152", return_date=self.return_date)
+        # The INSERT and the summary UPDATE, in a savepoint
+        with self.assertNumQueries(4):
+            rental = self.service.rent_book(student_id=self.student.student_id, title="Dune", author="Frank Herbert",
+                                            page_count=400, isbn="0306406152", return_date=self.return_date)
+        rental.refresh_from_db()
+        self.assertEqual(rental.fee_amount, Decimal('4.00'))
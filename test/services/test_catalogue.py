@@ -0,0 +1,95 @@
+from datetime import timedelta
+from importlib import import_module
+
+from django.apps import apps
+from django.test import TestCase
+from django.utils import timezone
+
+from rental.models import Book, Rental
+from rental.utils import make_catalogue_key, normalise_isbn
+from services.book_rental_service import OpenLibraryBookRentalService
+from services.catalogue import BookCatalogue, get_book_catalogue
+from student.models import Student
+
+
+class CatalogueKeyTest(TestCase):
+    def test_normalise_isbn(self):
+        self.assertEqual(normalise_isbn("0-306-40615-2"), "9780306406157")
+        self.assertEqual(normalise_isbn("978-0-306-40615-7"), "9780306406157")
+        self.assertEqual(normalise_isbn("080442957x"), "9780804429573")
+        self.assertIsNone(normalise_isbn("124567890"))
+        self.assertIsNone(normalise_isbn(None))
+
+    def test_make_catalogue_key_falls_back_to_title_and_author(self):
+        self.assertEqual(make_catalogue_key(isbn="0306406152", title="Ignored"), "isbn:9780306406157")
+        self.assertEqual(make_catalogue_key(isbn="124567890", title="The  Hobbit!", author="J.R.R. Tolkien"),
+                         make_catalogue_key(title="the hobbit", author="J R R Tolkien"))
+        self.assertIsNone(make_catalogue_key(isbn="", title="", author="Someone"))
+
+    def test_book_save_sets_catalogue_key(self):
+        book = Book.objects.create(title="Dune", isbn="9780306406157")
+        self.assertEqual(book.catalogue_key, "isbn:9780306406157")
+
+
+class BookCatalogueTest(TestCase):
+    def setUp(self):
+        self.student = Student.objects.create(username='test', email='test@email.com')
+        self.service = OpenLibraryBookRentalService(catalogue=BookCatalogue())
+        self.return_date = (timezone.now() + timedelta(days=14)).strftime('%B %d, %Y, %I:%M %p')
+
+    def rent(self, isbn, title="Dune"):
+        return self.service.rent_book(student_id=self.student.student_id, title=title, author="Frank Herbert",
+                                      page_count=400, isbn=isbn, return_date=self.return_date)
+
+    def test_repeat_rentals_share_one_book(self):
+        first = self.rent("0-306-40615-2")
+        second = self.rent("9780306406157")
+
+        self.assertEqual(Book.objects.count(), 1)
+        self.assertEqual(first.book_id_id, second.book_id_id)
+        self.assertEqual(Rental.objects.filter(book_id=first.book_id_id).count(), 2)
+
+    def test_books_without_isbn_are_keyed_by_title(self):
+        self.rent("124567890", title="Dune")
+        self.rent("124567890", title="Dune Messiah")
+        self.rent("124567890", title="dune")
+        self.assertEqual(Book.objects.count(), 2)
+
+    def test_committed_lookups_skip_the_query(self):
+        catalogue = self.service.catalogue
+        with self.captureOnCommitCallbacks(execute=True):
+            book_id = catalogue.get_or_create_book_id(title="Dune", author=None, page_count=1, isbn="0306406152")
+
+        with self.assertNumQueries(0):
+            self.assertEqual(catalogue.get_or_create_book_id(title="Dune", author=None, page_count=1,
+                                                             isbn="0306406152"), book_id)
+
+    def test_deleted_book_is_forgotten(self):
+        catalogue = get_book_catalogue()
+        self.addCleanup(catalogue.clear)
+        with self.captureOnCommitCallbacks(execute=True):
+            catalogue.get_or_create_book_id(title="Dune", author=None, page_count=1, isbn="0306406152")
+        self.assertIsNotNone(catalogue.book_ids.get("isbn:9780306406157"))
+
+        Book.objects.get(catalogue_key="isbn:9780306406157").delete()
+        self.assertIsNone(catalogue.book_ids.get("isbn:9780306406157"))
+
+
+class MergeDuplicateBooksTest(TestCase):
+    def test_duplicates_are_merged_into_oldest_book(self):
+        student = Student.objects.create(username='test', email='test@email.com')
+        # bulk_create skips save(), like rows written before catalogue keys existed
+        books = Book.objects.bulk_create([
+            Book(title="Dune", isbn="0306406152"),
+            Book(title="Dune", isbn="978-0-306-40615-7"),
+            Book(title="Emma", isbn="124567890"),
+        ])
+        Book.objects.filter(book_id=books[0].book_id).update(created=timezone.now() - timedelta(days=1))
+        Rental.objects.bulk_create([Rental(student_id=student, book_id=book) for book in books])
+
+        import_module('rental.migrations.0003_book_catalogue_key').merge_duplicate_books(apps, None)
+
+        self.assertEqual(Book.objects.count(), 2)
+        self.assertEqual(Rental.objects.filter(book_id=books[0].book_id).count(), 2)
+        self.assertEqual(set(Book.objects.values_list('catalogue_key', flat=True)),
+                         {"isbn:9780306406157", "title:emma|"})
@@ -0,0 +1,100 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+
+from rental.models import Book, JobState
+from rental.utils import isbn10_to_isbn13
+from services import catalogue_import
+from services.catalogue_import import WORK_TYPE, CatalogueDumpImporter, parse_dump_line
+from test.openlibrary_stub import write_edition_dump
+
+
+class ParseDumpLineTest(SimpleTestCase):
+    def test_tab_separated_edition(self):
+        record = {'title': " Dune ", 'by_statement': "Frank Herbert", 'number_of_pages': 412,
+                  'isbn_10': ["0-306-40615-2"]}
+        line = f"/type/edition\t/books/OL1M\t3\t2023-01-01\t{json.dumps(record)}\n".encode('utf-8')
+        self.assertEqual(parse_dump_line(line),
+                         ("isbn:9780306406157", "Dune", "Frank Herbert", 412, "9780306406157"))
+
+    def test_json_lines_record(self):
+        line = json.dumps({'title': "Dune", 'author_name': ["Frank Herbert"], 'isbn': ["bad", "0306406152"]})
+        self.assertEqual(parse_dump_line(line.encode('utf-8'))[0], "isbn:9780306406157")
+
+    def test_records_without_a_key_are_skipped(self):
+        self.assertIsNone(parse_dump_line(b'/type/edition\t/books/OL1M\t1\t2023-01-01\t{"isbn_10": []}\n'))
+        self.assertIsNone(parse_dump_line(b'/type/edition\t/books/OL1M\t1\t2023-01-01\t{"title": \n'))
+        self.assertIsNone(parse_dump_line(b'/type/author\t/authors/OL1A\t1\t2023-01-01\t{"name": "A"}\n'))
+
+    def test_works_are_imported_when_asked_for(self):
+        line = b'/type/work\t/works/OL1W\t1\t2023-01-01\t{"title": "Dune"}\n'
+        self.assertIsNone(parse_dump_line(line))
+        self.assertEqual(parse_dump_line(line, types=(WORK_TYPE,)), ("title:dune|", "Dune", None, None, None))
+
+
+class CatalogueDumpImporterTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'ol_dump_editions.txt.gz')
+        self.lines = write_edition_dump(self.path, 50)
+
+    def test_imports_distinct_editions(self):
+        result = CatalogueDumpImporter(batch_size=16).run(self.path)
+
+        self.assertEqual(result.lines, self.lines)
+        self.assertEqual(Book.objects.count(), 50)
+        book = Book.objects.get(title="Dump Book 7")
+        self.assertEqual((book.author, book.page_count, book.isbn),
+                         ("Author 7", 107, isbn10_to_isbn13("000000007X")))
+        self.assertIsNone(JobState.objects.get(name='catalogue_import:ol_dump_editions.txt.gz').cursor)
+
+    def test_existing_books_are_kept_unless_updated(self):
+        book = Book.objects.create(title="Dune", isbn="0000000077")
+        CatalogueDumpImporter(batch_size=16).run(self.path)
+        self.assertEqual(Book.objects.get(pk=book.pk).title, "Dune")
+
+        CatalogueDumpImporter(batch_size=16, update_existing=True).run(self.path)
+        self.assertEqual(Book.objects.get(pk=book.pk).title, "Dump Book 7")
+        self.assertEqual(Book.objects.count(), 50)
+
+    def test_resumes_from_the_checkpoint(self):
+        importer = CatalogueDumpImporter(batch_size=16)
+        first = importer.run(self.path, max_lines=32)
+        self.assertEqual(first.lines, 32)
+        self.assertEqual(JobState.objects.get(name=importer.state_name(self.path)).cursor, str(first.offset))
+
+        with patch.object(catalogue_import, 'parse_dump_lines', wraps=catalogue_import.parse_dump_lines) as mock_parse:
+            second = importer.run(self.path)
+        self.assertEqual(second.resumed_from, first.offset)
+        self.assertEqual(first.lines + second.lines, self.lines)
+        self.assertEqual(sum(len(call.args[0]) for call in mock_parse.call_args_list), self.lines - 32)
+        self.assertEqual(Book.objects.count(), 50)
+
+    def test_restart_ignores_the_checkpoint(self):
+        importer = CatalogueDumpImporter(batch_size=16)
+        importer.run(self.path, max_lines=16)
+        self.assertEqual(importer.run(self.path, restart=True).lines, self.lines)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('import_catalogue_dump', self.path, '--workers', '0', '--batch-size', '20', stdout=out)
+        self.assertIn(f"Read {self.lines} lines", out.getvalue())
+        self.assertEqual(Book.objects.count(), 50)
+
+
+class ParallelCatalogueDumpImportTest(TransactionTestCase):
+    def test_worker_processes_parse_in_order(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'editions.txt')
+            lines = write_edition_dump(path, 200)
+            result = CatalogueDumpImporter(batch_size=25, workers=2).run(path)
+            self.assertEqual(result.offset, os.path.getsize(path))
+
+        self.assertEqual(result.lines, lines)
+        self.assertEqual(Book.objects.count(), 200)
@@ -0,0 +1,192 @@
+import time
+from unittest.mock import patch
+
+import requests
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rental.models import Book
+from services.book_rental_service import OpenLibraryBookRentalService
+from services.circuit_breaker import CircuitBreaker
+from services.http_client import PooledHTTPClient
+from services.local_search import LocalBookSearch
+from services.search_cache import SearchResultCache
+from services.search_docs import SearchResults
+from services.single_flight import SingleFlight
+from student.models import Student
+from test.openlibrary_stub import OpenLibraryStub, make_docs
+from test.rental.test_async_views import STATIC_STORAGES
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'circuit-breaker-tests'},
+}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CircuitBreakerTest(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(window=10, min_calls=4, failure_rate=0.5, open_seconds=5, clock=self.clock)
+
+    def record(self, *outcomes):
+        for ok in outcomes:
+            self.assertTrue(self.breaker.allow_request())
+            self.breaker.record_success() if ok else self.breaker.record_failure()
+
+    def test_opens_at_the_failure_rate(self):
+        self.record(True, False, True)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.record(False)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow_request())
+
+    def test_needs_min_calls_to_open(self):
+        self.record(False, False, False)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_old_outcomes_leave_the_window(self):
+        self.record(False, False, False)
+        self.clock.now += 11
+        self.record(True, True, True, False)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(self.breaker.snapshot(), {'state': CircuitBreaker.CLOSED, 'calls': 4, 'failures': 1})
+
+    def test_half_open_probe_closes_the_circuit(self):
+        self.record(False, False, False, False)
+        self.clock.now += 5
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(self.breaker.allow_request())
+        # Only one probe at a time
+        self.assertFalse(self.breaker.allow_request())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(self.breaker.allow_request())
+
+    def test_failed_probe_reopens_the_circuit(self):
+        self.record(False, False, False, False)
+        self.clock.now += 5
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.clock.now += 4
+        self.assertFalse(self.breaker.allow_request())
+
+    def test_lost_probe_is_replaced(self):
+        self.record(False, False, False, False)
+        self.clock.now += 5
+        self.assertTrue(self.breaker.allow_request())
+        self.clock.now += 5
+        self.assertTrue(self.breaker.allow_request())
+
+
+class LatencyBudgetTest(SimpleTestCase):
+    def setUp(self):
+        self.stub = OpenLibraryStub().start()
+        self.addCleanup(self.stub.stop)
+
+    def test_budget_cuts_the_timeout_and_the_retries(self):
+        self.stub.latency = 0.5
+        client = PooledHTTPClient(read_timeout=10, max_retries=3, backoff_factor=0.001)
+        self.addCleanup(client.close)
+
+        started = time.perf_counter()
+        with self.assertRaises(requests.Timeout):
+            client.get(self.stub.search_url, budget=0.1)
+        self.assertLess(time.perf_counter() - started, 0.4)
+        self.assertEqual(len(self.stub.requests), 1)
+
+
+# The async search looks up local books on a connection of its own, which only sees committed rows
+@override_settings(CACHES=LOCMEM_CACHES)
+class SearchBookCircuitTest(TransactionTestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.stub = OpenLibraryStub(docs=make_docs(2)).start()
+        self.addCleanup(self.stub.stop)
+        self.http_client = PooledHTTPClient(max_retries=0, read_timeout=1)
+        self.addCleanup(self.http_client.close)
+        self.breaker = CircuitBreaker(min_calls=2, failure_rate=0.5, open_seconds=0.2)
+        self.service = OpenLibraryBookRentalService(search_cache=SearchResultCache(ttl=60, stale_ttl=600),
+                                                    http_client=self.http_client, single_flight=SingleFlight(),
+                                                    api_base_url=self.stub.search_url,
+                                                    local_search=LocalBookSearch(limit=10, min_results=2),
+                                                    circuit_breaker=self.breaker, latency_budget=0.2)
+        Book.objects.create(title="Dune", author="Frank Herbert", page_count=412)
+
+    def open_circuit(self):
+        self.stub.fail_next(2, status=503)
+        self.service.search_book("first")
+        self.service.search_book("second")
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+    def test_open_circuit_fails_fast_with_local_results(self):
+        self.open_circuit()
+        books = self.service.search_book("dune")
+
+        self.assertTrue(books.degraded)
+        self.assertEqual([book['title'] for book in books], ["Dune"])
+        self.assertEqual(len(self.stub.requests), 2)
+
+    def test_stale_results_are_served_while_open(self):
+        key = self.service._search_cache_key("Children")
+        self.service.search_cache.local.set(key, make_docs(1), stored_at=time.time() - 120)
+        self.open_circuit()
+
+        with patch.object(OpenLibraryBookRentalService, '_revalidate_in_background') as mock_revalidate:
+            books = self.service.search_book("Children")
+        mock_revalidate.assert_not_called()
+        self.assertTrue(books.degraded)
+        self.assertEqual([book['title'] for book in books], ['Stub Book 0'])
+
+    def test_probe_restores_upstream_searches(self):
+        self.open_circuit()
+        time.sleep(0.25)
+        books = self.service.search_book("third")
+
+        self.assertFalse(books.degraded)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual([book['title'] for book in books], ['Stub Book 0', 'Stub Book 1'])
+
+    def test_slow_upstream_is_cut_off_by_the_budget(self):
+        self.stub.latency = 0.5
+        started = time.perf_counter()
+        books = self.service.search_book("dune")
+
+        self.assertLess(time.perf_counter() - started, 0.45)
+        self.assertTrue(books.degraded)
+        self.assertEqual([book['title'] for book in books], ["Dune"])
+
+    async def test_async_search_fails_fast_while_open(self):
+        await sync_to_async(self.open_circuit)()
+        books = await self.service.asearch_book("third")
+
+        self.assertTrue(books.degraded)
+        self.assertEqual(len(self.stub.requests), 2)
+
+
+@override_settings(STORAGES=STATIC_STORAGES, CACHES=LOCMEM_CACHES)
+class DegradedSearchViewTest(TestCase):
+    def setUp(self):
+        self.student = Student.objects.create(username='test', email='test@email.com')
+        self.client.force_login(self.student)
+
+    def test_search_page_shows_the_degraded_notice(self):
+        results = SearchResults([{'title': 'Local Book'}], degraded=True)
+        with patch.object(OpenLibraryBookRentalService, 'asearch_book', return_value=results):
+            response = self.client.post(reverse('book_search'), {'search_query': 'Local'})
+        self.assertContains(response, "Local Book")
+        self.assertContains(response, "OpenLibrary is not responding")
+
+    def test_api_flags_degraded_results(self):
+        with patch.object(OpenLibraryBookRentalService, 'search_book', return_value=SearchResults(degraded=True)):
+            response = self.client.get(reverse('api_v1:search'), {'q': "Local"})
+        self.assertEqual(response.json(), {'results': [], 'degraded': True})
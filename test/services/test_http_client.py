@@ -0,0 +1,91 @@
+import requests
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from services.book_rental_service import OpenLibraryBookRentalService
+from services.http_client import PooledHTTPClient
+from services.search_cache import SearchResultCache
+from test.openlibrary_stub import OpenLibraryStub, make_docs
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'http-client-tests'},
+}
+
+
+class PooledHTTPClientTest(TestCase):
+    def setUp(self):
+        self.stub = OpenLibraryStub().start()
+        self.addCleanup(self.stub.stop)
+        self.client = PooledHTTPClient(pool_maxsize=2, connect_timeout=1, read_timeout=1,
+                                       max_retries=2, backoff_factor=0.001, backoff_max=0.01)
+        self.addCleanup(self.client.close)
+
+    def test_connections_are_kept_alive(self):
+        for _ in range(5):
+            response = self.client.get(self.stub.search_url, params={'title': 'Dune'})
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.stub.requests), 5)
+        self.assertEqual(self.stub.connections, 1)
+
+    def test_retries_retryable_status(self):
+        self.stub.fail_next(2, status=503)
+        response = self.client.get(self.stub.search_url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.stub.requests), 3)
+        self.assertEqual(self.client.stats.snapshot()['retries'], 2)
+
+    def test_gives_up_after_max_retries(self):
+        self.stub.fail_next(5, status=502)
+        response = self.client.get(self.stub.search_url)
+
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual(len(self.stub.requests), 3)
+        self.assertEqual(self.client.stats.snapshot()['errors'], 1)
+
+    def test_does_not_retry_client_errors(self):
+        self.stub.fail_next(1, status=400)
+        self.assertEqual(self.client.get(self.stub.search_url).status_code, 400)
+        self.assertEqual(len(self.stub.requests), 1)
+
+    def test_read_timeout(self):
+        self.stub.latency = 0.3
+        client = PooledHTTPClient(read_timeout=0.05, max_retries=0)
+        self.addCleanup(client.close)
+        with self.assertRaises(requests.Timeout):
+            client.get(self.stub.search_url)
+
+    def test_latency_stats(self):
+        self.client.get(self.stub.search_url)
+        self.client.get(self.stub.search_url)
+        stats = self.client.stats.snapshot()
+        self.assertEqual(stats['calls'], 2)
+        self.assertGreater(stats['p99_seconds'], 0)
+        self.assertGreaterEqual(stats['max_seconds'], stats['p50_seconds'])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SearchBookOverHTTPTest(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.stub = OpenLibraryStub(docs=make_docs(2)).start()
+        self.addCleanup(self.stub.stop)
+        self.http_client = PooledHTTPClient(max_retries=1, read_timeout=0.2, backoff_factor=0.001)
+        self.addCleanup(self.http_client.close)
+        self.service = OpenLibraryBookRentalService(search_cache=SearchResultCache(),
+                                                    http_client=self.http_client,
+                                                    api_base_url=self.stub.search_url)
+
+    def test_search_book_calls_stub(self):
+        books = self.service.search_book("Dune Messiah")
+        self.assertEqual([book['title'] for book in books], ['Stub Book 0', 'Stub Book 1'])
+        self.assertEqual(self.stub.requests, [{'title': 'Dune Messiah', 'limit': '20',
+                                                'fields': 'title,author_name,number_of_pages_median,isbn'}])
+
+    def test_search_book_returns_empty_list_when_upstream_is_down(self):
+        self.stub.fail_next(2, status=503)
+        self.assertEqual(self.service.search_book("Dune"), [])
+
+    def test_search_book_returns_empty_list_on_timeout(self):
+        self.stub.latency = 0.5
+        self.assertEqual(self.service.search_book("Dune"), [])
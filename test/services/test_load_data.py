@@ -0,0 +1,47 @@
+from collections import Counter
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from rental.models import Book, Rental
+from services.book_rental_service import OpenLibraryBookRentalService
+from services.load_data import SyntheticDataGenerator
+from student.models import Student
+
+
+class SyntheticDataGeneratorTest(TestCase):
+    def setUp(self):
+        self.generator = SyntheticDataGenerator(chunk_size=40, tag='load', seed=7)
+        self.result = self.generator.generate(students=50, books=100, rentals=500)
+
+    def test_creates_requested_rows(self):
+        self.assertEqual((self.result.students, self.result.books, self.result.rentals), (50, 100, 500))
+        self.assertEqual(Student.objects.filter(username__startswith='load-').count(), 50)
+        self.assertEqual(Book.objects.count(), 100)
+        self.assertEqual(Rental.objects.count(), 500)
+
+    def test_students_share_a_working_password(self):
+        students = list(Student.objects.all()[:2])
+        self.assertEqual(students[0].password, students[1].password)
+        self.assertTrue(students[0].check_password('password'))
+
+    def test_rentals_are_spread_and_priced(self):
+        rentals = list(Rental.objects.select_related('book_id'))
+        self.assertGreater(len({rental.created.date() for rental in rentals}), 100)
+        for rental in rentals[:100]:
+            expected = OpenLibraryBookRentalService.calculate_rental_cost(
+                rental.book_id.page_count, rental.created, rental.return_date)
+            self.assertAlmostEqual(float(rental.fee_amount), expected, places=2)
+        self.assertTrue(any(rental.fee_amount for rental in rentals))
+        self.assertTrue(any(not rental.fee_amount for rental in rentals))
+
+    def test_popularity_is_skewed(self):
+        counts = sorted(Counter(Rental.objects.values_list('book_id', flat=True)).values(), reverse=True)
+        # The most popular book is rented far more often than a typical one
+        self.assertGreater(counts[0], 5 * counts[len(counts) // 2])
+
+    def test_command_reports_counts(self):
+        out = StringIO()
+        call_command('generate_load_data', '--students=3', '--books=4', '--rentals=10', '--tag=cmd', stdout=out)
+        self.assertIn("Created 3 students, 4 books and 10 rentals", out.getvalue())
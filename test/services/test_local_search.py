@@ -0,0 +1,111 @@
+from importlib import import_module
+
+from django.contrib.postgres.indexes import GinIndex
+from django.core.cache import caches
+from django.db.backends.postgresql.base import DatabaseWrapper
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from rental.models import Book
+from services.book_rental_service import OpenLibraryBookRentalService
+from services.http_client import PooledHTTPClient
+from services.local_search import LocalBookSearch, book_search_vector
+from services.search_cache import SearchResultCache
+from services.single_flight import SingleFlight
+from test.openlibrary_stub import OpenLibraryStub
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'local-search-tests'},
+}
+
+
+class SearchIndexMigrationTest(SimpleTestCase):
+    def test_postgres_index_matches_the_searched_expression(self):
+        # Only compiles SQL, no PostgreSQL server is needed
+        connection = DatabaseWrapper({'NAME': 'bookflow', 'USER': '', 'PASSWORD': '', 'HOST': '', 'PORT': '',
+                                      'OPTIONS': {}, 'TIME_ZONE': None, 'CONN_MAX_AGE': 0,
+                                      'CONN_HEALTH_CHECKS': False, 'AUTOCOMMIT': True, 'ATOMIC_REQUESTS': False,
+                                      'TEST': {}}, alias='postgres-sql-only')
+        with connection.schema_editor(collect_sql=True, atomic=False) as editor:
+            editor.add_index(Book, GinIndex(book_search_vector(), name='book_search_vector_idx'))
+
+        migration = import_module('rental.migrations.0006_book_search_index')
+        self.assertEqual(editor.collected_sql, [migration.FORWARD_SQL['postgresql'][1] + ';'])
+
+
+class LocalBookSearchTest(TestCase):
+    def setUp(self):
+        self.local_search = LocalBookSearch(limit=10)
+        Book.objects.create(title="Dune", author="Frank Herbert", page_count=412, isbn="0306406152")
+        Book.objects.create(title="Dune Messiah", author="Frank Herbert", page_count=256)
+        Book.objects.create(title="Children of Dune", author="Frank Herbert", page_count=444)
+        Book.objects.create(title="The Dispossessed", author="Ursula K. Le Guin", page_count=387)
+
+    def titles(self, query):
+        return [book.title for book in self.local_search.search(query)]
+
+    def test_every_word_must_prefix_match(self):
+        self.assertEqual(set(self.titles("dune")), {"Dune", "Dune Messiah", "Children of Dune"})
+        self.assertEqual(self.titles("dune mess"), ["Dune Messiah"])
+        self.assertEqual(self.titles("le guin"), ["The Dispossessed"])
+        self.assertEqual(self.titles("dune guin"), [])
+
+    def test_title_matches_rank_above_author_matches(self):
+        Book.objects.create(title="Herbert West", author="H. P. Lovecraft")
+        self.assertEqual(self.titles("herbert")[0], "Herbert West")
+
+    def test_isbn_is_matched_in_any_format(self):
+        self.assertEqual(self.titles("978-0-306-40615-7"), ["Dune"])
+
+    def test_index_follows_updates_and_deletes(self):
+        Book.objects.filter(title="The Dispossessed").update(title="The Left Hand of Darkness")
+        Book.objects.filter(title="Dune Messiah").delete()
+
+        self.assertEqual(self.titles("dispossessed"), [])
+        self.assertEqual(self.titles("darkness"), ["The Left Hand of Darkness"])
+        self.assertEqual(set(self.titles("dune")), {"Dune", "Children of Dune"})
+
+    def test_merge_skips_upstream_docs_already_held(self):
+        local_docs = self.local_search.search_docs("dune messiah")
+        upstream_docs = [{'title': "Dune Messiah", 'author_name': ["Frank Herbert"]},
+                         {'title': "Dune Chronicles", 'author_name': ["Frank Herbert"]}]
+
+        merged = self.local_search.merge(local_docs, upstream_docs)
+
+        self.assertEqual([(doc['title'], doc.get('source')) for doc in merged],
+                         [("Dune Messiah", 'local'), ("Dune Chronicles", None)])
+
+
+# The async search looks up local books on a connection of its own, which only sees committed rows
+@override_settings(CACHES=LOCMEM_CACHES)
+class LocalFirstSearchBookTest(TransactionTestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.stub = OpenLibraryStub().start()
+        self.addCleanup(self.stub.stop)
+        self.http_client = PooledHTTPClient()
+        self.addCleanup(self.http_client.close)
+        self.service = OpenLibraryBookRentalService(search_cache=SearchResultCache(), http_client=self.http_client,
+                                                    single_flight=SingleFlight(), api_base_url=self.stub.search_url,
+                                                    local_search=LocalBookSearch(limit=10, min_results=2))
+        Book.objects.bulk_create([Book(title=f"Stub Book {index}", author=f"Author {index}", page_count=100)
+                                  for index in range(2)])
+
+    def test_enough_local_matches_skip_upstream(self):
+        books = self.service.search_book("stub book")
+
+        self.assertEqual(len(books), 2)
+        self.assertEqual(self.stub.requests, [])
+
+    def test_thin_local_matches_are_merged_with_upstream(self):
+        books = self.service.search_book("stub book 1")
+
+        self.assertEqual(len(self.stub.requests), 1)
+        # The stub returns Stub Book 0-2; Stub Book 1 is already held and comes first
+        self.assertEqual([(book['title'], book.get('source')) for book in books],
+                         [("Stub Book 1", 'local'), ("Stub Book 0", None), ("Stub Book 2", None)])
+
+    async def test_async_search_answers_locally(self):
+        books = await self.service.asearch_book("stub")
+
+        self.assertEqual(len(books), 2)
+        self.assertEqual(self.stub.requests, [])
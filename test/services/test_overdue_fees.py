@@ -0,0 +1,126 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from rental.models import Book, JobState, Rental
+from services.jobs import JobRunner
+from services.overdue_fees import OverdueFeeAccrual
+from student.models import Student
+
+
+class CrashAfter:
+    """
+    Wraps a job so that it fails after ``batches`` batches, like a runner killed mid-run.
+    """
+
+    def __init__(self, job, batches):
+        self.job = job
+        self.batches = batches
+        self.name = job.name
+        self.interval = job.interval
+
+    def run_batch(self, as_of, cursor):
+        if self.batches == 0:
+            raise RuntimeError("Killed")
+        self.batches -= 1
+        return self.job.run_batch(as_of, cursor)
+
+
+class OverdueFeeAccrualTest(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        student = Student.objects.create(username='test', email='test@email.com')
+        book = Book.objects.create(title="Dune", page_count=400)
+        self.late = {days: Rental.objects.create(student_id=student, book_id=book, fee_amount=Decimal('4.00'),
+                                                 return_date=self.now - timedelta(days=days, hours=1))
+                     for days in (1, 3, 10, 30, 45)}
+        self.returned = Rental.objects.create(student_id=student, book_id=book,
+                                              return_date=self.now - timedelta(days=20),
+                                              returned_at=self.now - timedelta(days=19))
+        self.on_time = Rental.objects.create(student_id=student, book_id=book,
+                                             return_date=self.now - timedelta(hours=20))
+        self.job = OverdueFeeAccrual(fee_per_day='0.25', batch_size=2)
+
+    def run_job(self, job, as_of):
+        cursor = None
+        while True:
+            cursor = job.run_batch(as_of, cursor)
+            if cursor is None:
+                return
+
+    def test_charges_every_full_day_of_unreturned_rentals(self):
+        self.run_job(self.job, self.now)
+
+        for days, rental in self.late.items():
+            rental.refresh_from_db()
+            self.assertEqual((rental.overdue_days, rental.overdue_fee), (days, Decimal('0.25') * days))
+            self.assertEqual(rental.fee_amount, Decimal('4.00'))
+        for rental in (self.returned, self.on_time):
+            rental.refresh_from_db()
+            self.assertEqual((rental.overdue_days, rental.overdue_fee), (0, Decimal('0')))
+
+    def test_rerun_writes_only_new_days(self):
+        self.run_job(self.job, self.now)
+        with CaptureQueriesContext(connection) as queries:
+            self.run_job(self.job, self.now)
+        self.assertFalse([query for query in queries.captured_queries if query['sql'].startswith('UPDATE')])
+
+        self.run_job(self.job, self.now + timedelta(days=1))
+        self.late[3].refresh_from_db()
+        self.assertEqual((self.late[3].overdue_days, self.late[3].overdue_fee), (4, Decimal('1.00')))
+
+    def test_runner_resumes_from_its_checkpoint(self):
+        runner = JobRunner([self.job])
+        with self.assertRaises(RuntimeError):
+            runner.run(CrashAfter(self.job, batches=2))
+
+        state = JobState.objects.get(name=self.job.name)
+        as_of = state.run_started_at
+        self.assertIsNotNone(state.cursor)
+        # The two committed batches hold the four most overdue rentals
+        self.assertEqual(Rental.objects.filter(overdue_days__gt=0).count(), 4)
+
+        # The lease of the dead runner has to expire first
+        JobState.objects.filter(name=self.job.name).update(lease_until=None)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(runner.run(self.job))
+        updates = [query for query in queries.captured_queries if query['sql'].startswith('UPDATE "Rental"')]
+        # Only the last rental was left
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(Rental.objects.filter(overdue_days__gt=0).count(), 5)
+
+        state.refresh_from_db()
+        self.assertIsNone(state.run_started_at)
+        self.assertIsNone(state.cursor)
+        self.assertGreaterEqual(state.last_finished_at, as_of)
+
+    def test_runner_honours_interval_and_lease(self):
+        runner = JobRunner([self.job])
+        self.assertTrue(runner.run(self.job))
+        self.assertFalse(runner.run(self.job))
+        self.assertTrue(runner.run(self.job, force=True))
+
+        JobState.objects.filter(name=self.job.name).update(lease_until=timezone.now() + timedelta(minutes=5))
+        self.assertFalse(runner.run(self.job, force=True))
+
+    def test_command_runs_due_jobs_once(self):
+        out = StringIO()
+        call_command('run_jobs', '--once', stdout=out)
+        self.assertIn("Finished: accrue_overdue_fees.", out.getvalue())
+        self.assertEqual(Rental.objects.filter(overdue_days__gt=0).count(), 5)
+
+    def test_scan_uses_the_partial_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest("Checks the SQLite query plan")
+        queryset = OverdueFeeAccrual.overdue_rentals(self.now).order_by('return_date', 'rental_id')[:2]
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('rental_unreturned_due_idx', plan)
@@ -0,0 +1,82 @@
+import datetime
+import random
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from rental.models import Book, Rental
+from services.book_rental_service import OpenLibraryBookRentalService
+from services.pricing import BulkFeeEngine, to_naive_datetime64
+from student.models import Student
+
+
+class BulkFeeEngineTest(TestCase):
+    def setUp(self):
+        self.engine = BulkFeeEngine(cost_per_page=OpenLibraryBookRentalService.COST_PER_PAGE, chunk_size=7)
+
+    def test_parity_with_scalar_calculation(self):
+        rng = random.Random(42)
+        start = datetime.datetime(2023, 1, 1, tzinfo=datetime.timezone.utc)
+        rented_dates, return_dates, page_counts = [], [], []
+        for _ in range(2000):
+            rented = start + datetime.timedelta(days=rng.randint(0, 800), seconds=rng.randint(0, 86399))
+            rented_dates.append(rented)
+            # Cluster return dates around the month boundary
+            return_dates.append(rented + datetime.timedelta(days=rng.randint(27, 33), seconds=rng.randint(-5, 5)))
+            page_counts.append(rng.randint(1, 2000))
+
+        fees = self.engine.fees(page_counts, to_naive_datetime64(rented_dates), to_naive_datetime64(return_dates))
+
+        for pages, rented, returned, fee in zip(page_counts, rented_dates, return_dates, fees):
+            expected = OpenLibraryBookRentalService.calculate_rental_cost(pages, rented, returned)
+            self.assertEqual(fee, Decimal(str(expected)).quantize(Decimal('0.01')), (pages, rented, returned))
+
+    def test_month_length_of_rent_month_is_used(self):
+        rented = [datetime.datetime(2024, 2, 1), datetime.datetime(2023, 2, 1), datetime.datetime(2024, 1, 1)]
+        returned = [datetime.datetime(2024, 3, 1, 0, 1), datetime.datetime(2023, 3, 1, 0, 1),
+                    datetime.datetime(2024, 2, 1)]
+        fees = self.engine.fees([100, 100, 100], to_naive_datetime64(rented), to_naive_datetime64(returned))
+        # 2024-02 has 29 days, 2023-02 has 28, and returning exactly after 31 days is still free
+        self.assertEqual(fees, [Decimal('1.00'), Decimal('1.00'), Decimal('0.00')])
+
+    def test_rounds_half_up_to_cents(self):
+        engine = BulkFeeEngine(cost_per_page='0.005')
+        rented = to_naive_datetime64([datetime.datetime(2024, 1, 1)] * 2)
+        returned = to_naive_datetime64([datetime.datetime(2024, 3, 1)] * 2)
+        self.assertEqual(engine.fees([1, 3], rented, returned), [Decimal('0.01'), Decimal('0.02')])
+
+
+class RepriceRentalsTest(TestCase):
+    def setUp(self):
+        self.student = Student.objects.create(username='test', email='test@email.com')
+        book = Book.objects.create(title="Dune", page_count=250, isbn="9780306406157")
+        rentals = []
+        for index in range(25):
+            rental = Rental.objects.create(student_id=self.student, book_id=book, fee_amount=Decimal('9.99'))
+            # Alternate between short and long rentals
+            rental.return_date = rental.created + datetime.timedelta(days=10 if index % 2 else 60)
+            rentals.append(rental)
+        Rental.objects.bulk_update(rentals, ['return_date'])
+        Rental.objects.create(student_id=self.student, book_id=book, fee_amount=Decimal('9.99'))
+
+    def test_reprice_writes_changed_fees(self):
+        engine = BulkFeeEngine(cost_per_page=OpenLibraryBookRentalService.COST_PER_PAGE, chunk_size=10)
+        result = engine.reprice()
+
+        self.assertEqual((result.scanned, result.changed, result.updated), (25, 25, 25))
+        self.assertEqual(Rental.objects.filter(fee_amount=Decimal('2.50')).count(), 13)
+        self.assertEqual(Rental.objects.filter(fee_amount=0).count(), 12)
+        # The rental without a return date is left alone
+        self.assertEqual(Rental.objects.filter(fee_amount=Decimal('9.99')).count(), 1)
+
+        self.assertEqual(engine.reprice().changed, 0)
+
+    def test_command_dry_run_does_not_write(self):
+        out = StringIO()
+        call_command('reprice_rentals', '--dry-run', '--chunk-size=8', stdout=out)
+
+        self.assertIn("Scanned 25 rentals", out.getvalue())
+        self.assertIn("25 changed, 0 updated", out.getvalue())
+        self.assertEqual(Rental.objects.filter(fee_amount=Decimal('9.99')).count(), 26)
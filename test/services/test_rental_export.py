@@ -0,0 +1,143 @@
+import csv
+import datetime
+import io
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rental.models import Book, Rental
+from services.rental_export import JSONL, RentalExport, day_range, format_csv_value
+from student.models import Student
+from test.rental.test_async_views import STATIC_STORAGES
+
+
+class RentalExportTestMixin:
+    def setUp(self):
+        self.staff = Student.objects.create(username='staff', email='staff@email.com', is_staff=True)
+        self.student = Student.objects.create(username='test', email='test@email.com')
+        self.other = Student.objects.create(username='other', email='other@email.com')
+        now = timezone.now()
+        book = Book.objects.create(title="Dune, Part 1", author="Frank Herbert", isbn="9780441013593")
+        self.on_time = Rental.objects.create(student_id=self.student, book_id=book, return_date=now + timedelta(days=7),
+                                             fee_amount='3.00')
+        self.overdue = Rental.objects.create(student_id=self.student, book_id=Book.objects.create(title="Emma"),
+                                             return_date=now - timedelta(days=3), fee_amount='2.00')
+        self.other_rental = Rental.objects.create(student_id=self.other, book_id=book,
+                                                  return_date=now - timedelta(days=1), returned_at=now)
+        self.old = Rental.objects.create(student_id=self.other, book_id=None)
+        Rental.objects.filter(pk=self.old.pk).update(created=now - timedelta(days=40))
+
+
+class RentalExportTest(RentalExportTestMixin, TestCase):
+    def export(self, **kwargs):
+        return b''.join(RentalExport(**kwargs).blocks()).decode('utf-8')
+
+    def test_csv(self):
+        rows = list(csv.DictReader(io.StringIO(self.export(chunk_size=2))))
+
+        self.assertEqual([row['rental_id'] for row in rows],
+                         [str(rental.pk) for rental in (self.old, self.on_time, self.overdue, self.other_rental)])
+        row = rows[1]
+        self.assertEqual((row['username'], row['title'], row['author'], row['isbn'], row['fee_amount']),
+                         ('test', "Dune, Part 1", "Frank Herbert", "9780441013593", '3.00'))
+        self.assertEqual(row['return_date'], self.on_time.return_date.isoformat())
+        self.assertEqual((rows[0]['title'], rows[0]['returned_at']), ('', ''))
+
+    def test_csv_escapes_formulas(self):
+        Book.objects.filter(pk=self.on_time.book_id_id).update(title='=HYPERLINK("http://evil.example")',
+                                                               author="@Herbert")
+        rows = list(csv.DictReader(io.StringIO(self.export())))
+
+        self.assertEqual((rows[1]['title'], rows[1]['author']), ('\'=HYPERLINK("http://evil.example")', "'@Herbert"))
+        for value in ('+1', '-1', '\tx', '\rx'):
+            self.assertEqual(format_csv_value(value), "'" + value)
+        self.assertEqual(format_csv_value(-1), -1)
+        self.assertEqual(format_csv_value("Dune"), "Dune")
+
+    def test_jsonl(self):
+        lines = self.export(format=JSONL, student_ids=[self.student.pk]).splitlines()
+
+        records = [json.loads(line) for line in lines]
+        self.assertEqual([record['title'] for record in records], ["Dune, Part 1", "Emma"])
+        self.assertEqual(records[0]['student_id'], str(self.student.pk))
+        self.assertEqual(records[0]['fee_amount'], '3.00')
+
+    def test_filters(self):
+        def rental_ids(**kwargs):
+            return [json.loads(line)['rental_id'] for line in self.export(format=JSONL, **kwargs).splitlines()]
+
+        self.assertEqual(rental_ids(overdue=True), [str(self.overdue.pk)])
+        today = timezone.localdate()
+        self.assertEqual(len(rental_ids(created_from=day_range(today)[0])), 3)
+        self.assertEqual(rental_ids(created_to=day_range(last_day=today - timedelta(days=1))[1]), [str(self.old.pk)])
+
+    def test_reads_in_chunks_with_one_query(self):
+        export = RentalExport(chunk_size=2)
+        with self.assertNumQueries(3):
+            # The query, wrapped in a savepoint inside the test transaction
+            blocks = list(export.blocks())
+        self.assertEqual(len(blocks), 3)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            RentalExport(format='xml')
+
+    def test_command_writes_to_stdout(self):
+        out = StringIO()
+        call_command('export_rentals', '--format', 'jsonl', '--overdue', stdout=out)
+        self.assertEqual([json.loads(line)['title'] for line in out.getvalue().splitlines()], ["Emma"])
+
+    def test_command_writes_a_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'rentals.csv')
+            out = StringIO()
+            call_command('export_rentals', '--student', str(self.other.pk), '--to',
+                         (timezone.localdate() - timedelta(days=1)).isoformat(), '-o', path, stdout=out)
+            with open(path, newline='', encoding='utf-8') as file:
+                rows = list(csv.DictReader(file))
+        self.assertEqual([row['rental_id'] for row in rows], [str(self.old.pk)])
+        self.assertIn(f"to {path}", out.getvalue())
+
+
+@override_settings(STORAGES=STATIC_STORAGES)
+class RentalExportViewTest(RentalExportTestMixin, TestCase):
+    async def read(self, response):
+        return b''.join([block async for block in response.streaming_content]).decode('utf-8')
+
+    async def test_streams_csv(self):
+        await self.async_client.aforce_login(self.staff)
+        response = await self.async_client.get(reverse('admin_export_rentals'))
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="rentals.csv"')
+        rows = list(csv.DictReader(io.StringIO(await self.read(response))))
+        self.assertEqual(len(rows), 4)
+
+    async def test_filters(self):
+        await self.async_client.aforce_login(self.staff)
+        response = await self.async_client.get(reverse('admin_export_rentals'), {
+            'format': 'jsonl', 'student_id': str(self.student.pk), 'overdue': '1',
+            'created_from': datetime.date.today() - timedelta(days=1)})
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        records = [json.loads(line) for line in (await self.read(response)).splitlines()]
+        self.assertEqual([record['rental_id'] for record in records], [str(self.overdue.pk)])
+
+    async def test_invalid_filters(self):
+        await self.async_client.aforce_login(self.staff)
+        response = await self.async_client.get(reverse('admin_export_rentals'),
+                                               {'created_from': '2026-02-01', 'created_to': '2026-01-01'})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_requires_staff(self):
+        await self.async_client.aforce_login(self.student)
+        response = await self.async_client.get(reverse('admin_export_rentals'))
+        self.assertEqual(response.status_code, 302)
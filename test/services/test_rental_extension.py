@@ -0,0 +1,84 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from rental.models import Book, Rental
+from services.book_rental_service import OpenLibraryBookRentalService
+from services.overdue_fees import OverdueFeeAccrual
+from services.rental_summary import rebuild_summaries
+from student.models import Student
+
+
+class ExtendRentalsTest(TestCase):
+    def setUp(self):
+        self.service = OpenLibraryBookRentalService()
+        self.student = Student.objects.create(username='test', email='test@email.com')
+        self.other = Student.objects.create(username='other', email='other@email.com')
+        self.now = timezone.now()
+        books = [Book.objects.create(title=f"Book {index}", page_count=100 * (index + 1)) for index in range(3)]
+        self.active = [Rental.objects.create(student_id=self.student, book_id=book,
+                                             return_date=self.now + timedelta(days=20)) for book in books]
+        self.overdue = Rental.objects.create(student_id=self.student, book_id=books[0],
+                                             return_date=self.now - timedelta(days=1))
+        self.others = Rental.objects.create(student_id=self.other, book_id=books[0],
+                                            return_date=self.now + timedelta(days=20))
+
+    def test_extends_and_reprices_active_rentals_only(self):
+        rentals = self.service.extend_rentals(self.student.student_id, days=14)
+
+        self.assertEqual({rental.rental_id for rental in rentals}, {rental.rental_id for rental in self.active})
+        stored = Rental.objects.get(pk=self.active[1].pk)
+        self.assertEqual(stored.return_date, self.active[1].return_date + timedelta(days=14))
+        # 34 days is past the free first month
+        self.assertEqual(stored.fee_amount, Decimal('2.00'))
+        self.assertGreater(stored.modified, self.active[1].modified)
+        for untouched in (self.overdue, self.others):
+            self.assertEqual(Rental.objects.get(pk=untouched.pk).return_date, untouched.return_date)
+
+    def test_one_select_one_update_of_the_extension_columns_and_one_summary_update(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.service.extend_rentals(self.student.student_id, days=14)
+
+        statements = [query['sql'] for query in queries.captured_queries if 'SAVEPOINT' not in query['sql']]
+        self.assertEqual(len(statements), 3)
+        self.assertTrue(statements[0].startswith('SELECT'))
+        update = statements[1]
+        self.assertTrue(update.startswith('UPDATE "Rental" SET "return_date"'))
+        self.assertIn('"fee_amount"', update)
+        self.assertIn('"modified"', update)
+        self.assertNotIn('"student_id"', update.split(' WHERE ')[0])
+        self.assertTrue(statements[2].startswith('UPDATE "StudentRentalSummary"'))
+
+    def test_rent_extension_sets_the_return_date(self):
+        rental = self.service.rent_extension(self.active[0].rental_id,
+                                             (self.now + timedelta(days=60)).strftime('%Y-%m-%d'))
+
+        stored = Rental.objects.get(pk=rental.pk)
+        self.assertEqual(stored.return_date.date(), (self.now + timedelta(days=60)).date())
+        self.assertEqual(stored.fee_amount, Decimal('1.00'))
+        with self.assertRaises(Rental.DoesNotExist):
+            self.service.rent_extension(self.student.student_id, '2030-01-01')
+
+    @override_settings(OVERDUE_FEES={'PER_DAY': '0.25'})
+    def test_extending_a_late_rental_settles_its_overdue_fee(self):
+        late = Rental.objects.create(student_id=self.student, book_id=self.active[0].book_id, fee_amount='0.00',
+                                     return_date=self.now - timedelta(days=5, hours=1))
+        OverdueFeeAccrual(fee_per_day='0.25').run_batch(self.now, None)
+        rebuild_summaries()
+        self.assertEqual(Rental.objects.get(pk=late.pk).overdue_fee, Decimal('1.25'))
+
+        # Still late, but by fewer days
+        self.service.rent_extension(late.rental_id, (self.now - timedelta(days=2)).strftime('%Y-%m-%d'))
+        stored = Rental.objects.get(pk=late.pk)
+        self.assertIn(stored.overdue_days, (1, 2))
+        self.assertEqual(stored.overdue_fee, Decimal('0.25') * stored.overdue_days)
+        self.assertEqual(rebuild_summaries(verify_only=True).mismatched, 0)
+
+        self.service.rent_extension(late.rental_id, (self.now + timedelta(days=7)).strftime('%Y-%m-%d'))
+        stored = Rental.objects.get(pk=late.pk)
+        self.assertEqual((stored.overdue_days, stored.overdue_fee), (0, 0))
+        self.assertEqual(rebuild_summaries(verify_only=True).mismatched, 0)
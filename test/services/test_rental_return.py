@@ -0,0 +1,63 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from rental.models import Book, Rental, StudentRentalSummary
+from services.book_rental_service import OpenLibraryBookRentalService
+from services.overdue_fees import OverdueFeeAccrual
+from services.rental_summary import rebuild_summaries
+from student.models import Student
+
+
+@override_settings(OVERDUE_FEES={'PER_DAY': '0.25'})
+class ReturnRentalsTest(TestCase):
+    def setUp(self):
+        self.service = OpenLibraryBookRentalService()
+        self.student = Student.objects.create(username='test', email='test@email.com')
+        self.now = timezone.now()
+        book = Book.objects.create(title="Dune", page_count=400)
+        self.on_time = Rental.objects.create(student_id=self.student, book_id=book, fee_amount=Decimal('4.00'),
+                                             return_date=self.now + timedelta(days=20))
+        self.late = Rental.objects.create(student_id=self.student, book_id=book, fee_amount=Decimal('4.00'),
+                                          return_date=self.now - timedelta(days=3, hours=1))
+        rebuild_summaries()
+
+    def summary(self):
+        return StudentRentalSummary.objects.get(pk=self.student.pk)
+
+    def test_sets_returned_at_and_updates_the_summary(self):
+        version = self.summary().version
+        rentals = self.service.return_rentals(Rental.objects.filter(pk=self.on_time.pk), returned_at=self.now)
+
+        self.assertEqual([rental.pk for rental in rentals], [self.on_time.pk])
+        stored = Rental.objects.get(pk=self.on_time.pk)
+        self.assertEqual(stored.returned_at, self.now)
+        self.assertEqual(stored.overdue_fee, 0)
+        summary = self.summary()
+        self.assertEqual((summary.active_rentals, summary.total_rentals), (1, 2))
+        self.assertGreater(summary.version, version)
+        self.assertEqual(rebuild_summaries(verify_only=True).mismatched, 0)
+
+    def test_settles_the_overdue_fee_of_a_late_rental(self):
+        self.service.return_rentals(Rental.objects.filter(pk=self.late.pk), returned_at=self.now)
+
+        stored = Rental.objects.get(pk=self.late.pk)
+        self.assertEqual((stored.overdue_days, stored.overdue_fee), (3, Decimal('0.75')))
+        self.assertEqual(self.summary().outstanding_fees, Decimal('8.75'))
+        self.assertEqual(rebuild_summaries(verify_only=True).mismatched, 0)
+
+        # A returned rental accrues no more overdue fees
+        OverdueFeeAccrual(fee_per_day='0.25').run_batch(self.now + timedelta(days=10), None)
+        self.assertEqual(Rental.objects.get(pk=self.late.pk).overdue_fee, Decimal('0.75'))
+
+    def test_leaves_returned_rentals_alone(self):
+        self.service.return_rentals(Rental.objects.filter(pk=self.late.pk), returned_at=self.now)
+
+        rentals = self.service.return_rentals(Rental.objects.all(), returned_at=self.now + timedelta(days=5))
+
+        self.assertEqual([rental.pk for rental in rentals], [self.on_time.pk])
+        self.assertEqual(Rental.objects.get(pk=self.late.pk).returned_at, self.now)
+        self.assertEqual(self.summary().active_rentals, 0)
+        self.assertEqual(rebuild_summaries(verify_only=True).mismatched, 0)
@@ -0,0 +1,124 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from rental.models import Book, Rental, StudentRentalSummary
+from services.book_rental_service import OpenLibraryBookRentalService
+from services.catalogue import BookCatalogue
+from services.overdue_fees import OverdueFeeAccrual
+from services.pricing import BulkFeeEngine
+from services.rental_summary import RentalSummaryDeltas, rebuild_summaries
+from student.models import Student
+
+
+class RentalSummaryTest(TestCase):
+    def setUp(self):
+        self.student = Student.objects.create(username='test', email='test@email.com')
+        self.service = OpenLibraryBookRentalService(catalogue=BookCatalogue())
+        self.return_date = (timezone.now() + timedelta(days=60)).strftime('%B %d, %Y, %I:%M %p')
+
+    def summary(self, student=None):
+        return StudentRentalSummary.objects.get(pk=(student or self.student).pk)
+
+    def assertSummaryMatchesRentals(self):
+        self.assertEqual(rebuild_summaries(verify_only=True).mismatched, 0)
+
+    def test_new_student_gets_an_empty_summary(self):
+        summary = self.summary()
+        self.assertEqual((summary.active_rentals, summary.total_rentals, summary.outstanding_fees), (0, 0, 0))
+        self.assertIsNone(summary.last_rented_at)
+
+    def test_rent_book_adds_the_rental(self):
+        rental = self.service.rent_book(student_id=self.student.student_id, title="Dune", author="Frank Herbert",
+                                        page_count=400, isbn="0306406152", return_date=self.return_date)
+
+        summary = self.summary()
+        self.assertEqual((summary.active_rentals, summary.total_rentals), (1, 1))
+        self.assertEqual(summary.outstanding_fees, Decimal('4.00'))
+        self.assertEqual(summary.last_rented_at, rental.created)
+        self.assertSummaryMatchesRentals()
+
+    def test_bulk_rental_is_one_summary_update(self):
+        books = [{'isbn': f"978{index:010d}", 'title': f"Book {index}", 'author': "Author", 'page_count': 100}
+                 for index in range(25)]
+        rentals = self.service.rent_books_bulk(student_id=self.student.student_id, books=books,
+                                               return_date=self.return_date)
+
+        summary = self.summary()
+        self.assertEqual((summary.active_rentals, summary.total_rentals), (25, 25))
+        self.assertEqual(summary.outstanding_fees, Decimal('25.00'))
+        self.assertEqual(summary.last_rented_at, max(rental.created for rental in rentals))
+        self.assertSummaryMatchesRentals()
+
+    def test_extension_and_repricing_apply_the_fee_difference(self):
+        book = Book.objects.create(title="Dune", page_count=300)
+        now = timezone.now()
+        rental = Rental.objects.create(student_id=self.student, book_id=book, return_date=now + timedelta(days=10),
+                                       fee_amount=Decimal('0.00'))
+        rebuild_summaries()
+
+        self.service.rent_extension(rental.rental_id, (now + timedelta(days=60)).strftime('%Y-%m-%d'))
+        self.assertEqual(self.summary().outstanding_fees, Decimal('3.00'))
+
+        Rental.objects.filter(pk=rental.pk).update(fee_amount=Decimal('9.99'))
+        StudentRentalSummary.objects.filter(pk=self.student.pk).update(outstanding_fees=Decimal('9.99'))
+        BulkFeeEngine(cost_per_page=OpenLibraryBookRentalService.COST_PER_PAGE).reprice()
+        self.assertEqual(self.summary().outstanding_fees, Decimal('3.00'))
+        self.assertSummaryMatchesRentals()
+
+    def test_overdue_fee_accrual_adds_the_fee_increase(self):
+        book = Book.objects.create(title="Dune", page_count=400)
+        now = timezone.now()
+        Rental.objects.create(student_id=self.student, book_id=book, fee_amount=Decimal('4.00'),
+                              return_date=now - timedelta(days=3, hours=1))
+        rebuild_summaries()
+        job = OverdueFeeAccrual(fee_per_day='0.25')
+
+        job.run_batch(now, None)
+        self.assertEqual(self.summary().outstanding_fees, Decimal('4.75'))
+        # A later run only adds the new day
+        job.run_batch(now + timedelta(days=1), None)
+        self.assertEqual(self.summary().outstanding_fees, Decimal('5.00'))
+        self.assertSummaryMatchesRentals()
+
+    def test_missing_rows_are_created_by_the_first_delta(self):
+        students = Student.objects.bulk_create([Student(username=f'bulk{index}', email=f'bulk{index}@email.com')
+                                                for index in range(3)])
+        rented_at = timezone.now()
+        deltas = RentalSummaryDeltas()
+        for student in students + [self.student]:
+            deltas.rented(student.pk, Decimal('1.50'), rented_at)
+        deltas.apply()
+
+        for student in students + [self.student]:
+            summary = self.summary(student)
+            self.assertEqual((summary.active_rentals, summary.outstanding_fees), (1, Decimal('1.50')))
+
+    def test_last_rental_time_never_moves_back(self):
+        now = timezone.now()
+        for rented_at in (now, now - timedelta(days=1)):
+            deltas = RentalSummaryDeltas()
+            deltas.rented(self.student.pk, 0, rented_at)
+            deltas.apply()
+        self.assertEqual(self.summary().last_rented_at, now)
+
+    def test_rebuild_repairs_drifted_summaries(self):
+        self.service.rent_book(student_id=self.student.student_id, title="Dune", author="Frank Herbert",
+                               page_count=400, isbn="0306406152", return_date=self.return_date)
+        StudentRentalSummary.objects.filter(pk=self.student.pk).update(active_rentals=7)
+        other = Student.objects.bulk_create([Student(username='nosummary', email='nosummary@email.com')])[0]
+
+        out = StringIO()
+        with self.assertRaises(SystemExit):
+            call_command('rebuild_rental_summaries', '--verify', stderr=out)
+        self.assertIn("2 mismatched, 0 fixed", out.getvalue())
+
+        result = rebuild_summaries(batch_size=1)
+        self.assertEqual((result.checked, result.mismatched, result.fixed), (2, 2, 2))
+        self.assertEqual(self.summary().active_rentals, 1)
+        self.assertEqual(self.summary(other).total_rentals, 0)
+        self.assertSummaryMatchesRentals()
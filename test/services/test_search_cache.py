@@ -0,0 +1,97 @@
+import time
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from services.book_rental_service import OpenLibraryBookRentalService
+from services.search_cache import LRUTTLCache, SearchResultCache
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'search-cache-tests'},
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SearchResultCacheTest(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.cache = SearchResultCache(max_entries=2, ttl=60, stale_ttl=600)
+
+    def test_make_key_normalises_query(self):
+        self.assertEqual(self.cache.make_key("The  Hobbit "), self.cache.make_key("the hobbit"))
+        self.assertNotEqual(self.cache.make_key("the hobbit"), self.cache.make_key("the hobbit", limit=5))
+
+    def test_local_hit_after_set(self):
+        key = self.cache.make_key("Dune")
+        self.assertIsNone(self.cache.get(key))
+        self.cache.set(key, [{'title': 'Dune'}])
+
+        cached = self.cache.get(key)
+        self.assertEqual(cached.value, [{'title': 'Dune'}])
+        self.assertFalse(cached.is_stale)
+        stats = self.cache.stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['local_hits'], 1)
+
+    def test_shared_tier_is_promoted_to_local(self):
+        key = self.cache.make_key("Dune")
+        other_worker = SearchResultCache(max_entries=2, ttl=60, stale_ttl=600)
+        other_worker.set(key, ['from another worker'])
+
+        self.assertEqual(self.cache.get(key).value, ['from another worker'])
+        self.assertEqual(self.cache.stats()['shared_hits'], 1)
+        self.assertEqual(len(self.cache.local), 1)
+
+    def test_expired_entry_is_served_stale(self):
+        key = self.cache.make_key("Dune")
+        self.cache.local.set(key, ['old'], stored_at=time.time() - 120)
+
+        cached = self.cache.get(key)
+        self.assertTrue(cached.is_stale)
+        self.assertEqual(self.cache.stats()['stale_hits'], 1)
+
+    def test_lru_evicts_least_recently_used(self):
+        lru = LRUTTLCache(max_entries=2, max_age=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('a')[0], 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CachedSearchBookTest(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.service = OpenLibraryBookRentalService(search_cache=SearchResultCache(ttl=60, stale_ttl=600))
+
+    def test_repeat_search_is_served_from_cache(self):
+        with patch.object(OpenLibraryBookRentalService, '_fetch_search_results',
+                          return_value=[{'title': 'Dune'}]) as mock_fetch:
+            self.assertEqual(self.service.search_book("Dune"), [{'title': 'Dune'}])
+            self.assertEqual(self.service.search_book("  dune"), [{'title': 'Dune'}])
+        mock_fetch.assert_called_once_with("Dune")
+
+    def test_failed_search_is_not_cached(self):
+        with patch.object(OpenLibraryBookRentalService, '_fetch_search_results', return_value=None) as mock_fetch:
+            self.assertEqual(self.service.search_book("Dune"), [])
+            self.assertEqual(self.service.search_book("Dune"), [])
+        self.assertEqual(mock_fetch.call_count, 2)
+
+    def test_key_covers_the_upstream_params(self):
+        key = self.service._search_cache_key("Dune")
+        self.assertNotEqual(key, self.service.search_cache.make_key("Dune"))
+        with patch('services.book_rental_service.SEARCH_FIELDS', ('title',)):
+            self.assertNotEqual(self.service._search_cache_key("Dune"), key)
+        self.service.search_limit += 1
+        self.assertNotEqual(self.service._search_cache_key("Dune"), key)
+
+    def test_stale_entry_is_revalidated(self):
+        key = self.service._search_cache_key("Dune")
+        self.service.search_cache.local.set(key, ['old'], stored_at=time.time() - 120)
+
+        with patch.object(OpenLibraryBookRentalService, '_revalidate_in_background') as mock_revalidate:
+            self.assertEqual(self.service.search_book("Dune"), ['old'])
+        mock_revalidate.assert_called_once_with(key, "Dune")
@@ -0,0 +1,76 @@
+import json
+import pickle
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from services.book_rental_service import OpenLibraryBookRentalService
+from services.http_client import PooledHTTPClient
+from services.search_cache import SearchResultCache
+from services.search_docs import MAX_ISBNS, SearchDoc, iter_search_docs, parse_search_response
+from test.openlibrary_stub import OpenLibraryStub, make_full_docs
+
+
+def chunked(body, size):
+    return [body[start:start + size] for start in range(0, len(body), size)]
+
+
+class IterSearchDocsTest(SimpleTestCase):
+    def test_decodes_docs_split_across_any_chunks(self):
+        docs = make_full_docs(3, isbns=10) + [{'title': "Les Misérables ☃", 'number_of_pages_median': 1463}]
+        body = json.dumps({'numFound': 4, 'start': 0, 'docs': docs, 'q': 'x', 'offset': None}).encode('utf-8')
+        # One byte chunks split numbers and multi-byte characters
+        for size in (1, 7, 4096, len(body)):
+            self.assertEqual(list(iter_search_docs(chunked(body, size))), docs)
+
+    def test_skips_other_members_and_empty_docs(self):
+        self.assertEqual(list(iter_search_docs([b'{"numFound": 0, "docs": [], "q": {"a": [1, 2]}}'])), [])
+        self.assertEqual(list(iter_search_docs([b'{}'])), [])
+
+    def test_rejects_truncated_and_invalid_bodies(self):
+        with self.assertRaises(ValueError):
+            list(iter_search_docs([b'{"docs": [{"title": "Du']))
+        with self.assertRaises(ValueError):
+            list(iter_search_docs([b'[1, 2]']))
+
+    def test_parse_keeps_compact_records(self):
+        body = json.dumps({'docs': make_full_docs(5, isbns=50)}).encode('utf-8')
+        docs = parse_search_response(chunked(body, 1000), limit=3)
+
+        self.assertEqual([doc.title for doc in docs], ['Stub Book 0', 'Stub Book 1', 'Stub Book 2'])
+        self.assertEqual(len(docs[0].isbn), MAX_ISBNS)
+        self.assertEqual(docs[1].author_name, ('Author 1',))
+        self.assertEqual(docs[1].number_of_pages_median, 101)
+
+
+class SearchDocTest(SimpleTestCase):
+    def test_reads_like_a_doc(self):
+        doc = SearchDoc("Dune", ["Frank Herbert"], 412, ["9780441013593"], source='local')
+        self.assertEqual(doc['title'], "Dune")
+        self.assertEqual(doc.get('isbn'), ("9780441013593",))
+        self.assertEqual(doc.get('key', 'missing'), 'missing')
+        with self.assertRaises(KeyError):
+            doc['to_dict']
+        self.assertEqual(pickle.loads(pickle.dumps(doc)), doc)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                       'LOCATION': 'search-docs-tests'}})
+class SlimSearchTest(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.stub = OpenLibraryStub(docs=make_full_docs(30)).start()
+        self.addCleanup(self.stub.stop)
+        self.http_client = PooledHTTPClient(max_retries=0)
+        self.addCleanup(self.http_client.close)
+        self.service = OpenLibraryBookRentalService(search_cache=SearchResultCache(), http_client=self.http_client,
+                                                    api_base_url=self.stub.search_url, search_limit=10)
+
+    def test_asks_for_the_needed_fields_only(self):
+        books = self.service.search_book("Stub")
+
+        self.assertEqual(len(books), 10)
+        self.assertEqual(books[0], SearchDoc("Stub Book 0", ["Author 0"], 100,
+                                             ["9780000000000", "9780000000001", "9780000000002", "9780000000003"]))
+        self.assertEqual(self.stub.requests[0]['limit'], '10')
+        self.assertEqual(self.stub.requests[0]['fields'], 'title,author_name,number_of_pages_median,isbn')
@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from services.book_rental_service import OpenLibraryBookRentalService
+from services.http_client import PooledHTTPClient
+from services.search_cache import SearchResultCache
+from services.single_flight import SingleFlight
+from test.openlibrary_stub import OpenLibraryStub
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'single-flight-tests'},
+}
+
+
+class SlowCall:
+    def __init__(self, delay=0.2, result='result'):
+        self.delay = delay
+        self.result = result
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return self.result
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SingleFlightTest(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_concurrent_callers_share_one_call(self):
+        single_flight = SingleFlight(timeout=5)
+        slow_call = SlowCall()
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            results = list(executor.map(lambda _: single_flight.do('key', slow_call), range(10)))
+
+        self.assertEqual(results, ['result'] * 10)
+        self.assertEqual(slow_call.calls, 1)
+        self.assertEqual(single_flight.stats()['leaders'], 1)
+        self.assertEqual(single_flight.stats()['followers'], 9)
+
+    def test_different_keys_are_not_coalesced(self):
+        single_flight = SingleFlight()
+        slow_call = SlowCall(delay=0.05)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(lambda key: single_flight.do(key, slow_call), ['a', 'b']))
+        self.assertEqual(slow_call.calls, 2)
+
+    def test_follower_falls_back_after_timeout(self):
+        single_flight = SingleFlight(timeout=0.05)
+        slow_call = SlowCall(delay=0.3)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            leader = executor.submit(single_flight.do, 'key', slow_call)
+            time.sleep(0.02)
+            follower = executor.submit(single_flight.do, 'key', slow_call)
+            self.assertEqual(follower.result(), 'result')
+            self.assertEqual(leader.result(), 'result')
+        self.assertEqual(slow_call.calls, 2)
+        self.assertEqual(single_flight.stats()['timeouts'], 1)
+
+    def test_leader_error_is_raised_in_followers(self):
+        single_flight = SingleFlight()
+
+        def failing_call():
+            time.sleep(0.1)
+            raise ValueError("upstream failed")
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [executor.submit(single_flight.do, 'key', failing_call) for _ in range(3)]
+            for future in futures:
+                with self.assertRaises(ValueError):
+                    future.result()
+
+    def test_waits_for_result_published_by_another_worker(self):
+        shared_cache = caches['default']
+        single_flight = SingleFlight(timeout=2, shared_cache=shared_cache, poll_interval=0.01)
+        # Another worker holds the lock and publishes its result shortly after
+        shared_cache.add('key' + SingleFlight.LOCK_SUFFIX, 'other-worker')
+        threading.Timer(0.1, shared_cache.set, args=('key', 'from other worker')).start()
+
+        slow_call = SlowCall()
+        result = single_flight.do('key', slow_call, shared_result=lambda: shared_cache.get('key'))
+
+        self.assertEqual(result, 'from other worker')
+        self.assertEqual(slow_call.calls, 0)
+        self.assertEqual(single_flight.stats()['shared_followers'], 1)
+
+    def test_calls_upstream_when_other_worker_gives_up(self):
+        shared_cache = caches['default']
+        single_flight = SingleFlight(timeout=2, shared_cache=shared_cache, poll_interval=0.01)
+        lock_key = 'key' + SingleFlight.LOCK_SUFFIX
+        shared_cache.add(lock_key, 'other-worker')
+        threading.Timer(0.05, shared_cache.delete, args=(lock_key,)).start()
+
+        slow_call = SlowCall(delay=0)
+        self.assertEqual(single_flight.do('key', slow_call, shared_result=lambda: None), 'result')
+        self.assertEqual(slow_call.calls, 1)
+
+    async def test_async_callers_share_one_call(self):
+        single_flight = SingleFlight(timeout=5)
+        calls = []
+
+        async def slow_call():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return 'result'
+
+        results = await asyncio.gather(*(single_flight.ado('key', slow_call) for _ in range(10)))
+        self.assertEqual(results, ['result'] * 10)
+        self.assertEqual(len(calls), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CoalescedSearchBookTest(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.stub = OpenLibraryStub(latency=0.2).start()
+        self.addCleanup(self.stub.stop)
+        self.http_client = PooledHTTPClient(pool_maxsize=10)
+        self.addCleanup(self.http_client.close)
+        self.service = OpenLibraryBookRentalService(search_cache=SearchResultCache(), http_client=self.http_client,
+                                                    single_flight=SingleFlight(), api_base_url=self.stub.search_url)
+
+    def test_concurrent_identical_searches_make_one_upstream_call(self):
+        titles = ["Dune", "dune", " DUNE "] * 4
+        with ThreadPoolExecutor(max_workers=len(titles)) as executor:
+            results = list(executor.map(self.service.search_book, titles))
+
+        self.assertEqual(len(self.stub.requests), 1)
+        self.assertTrue(all(result == results[0] for result in results))
+        self.assertEqual(len(results[0]), 3)
@@ -0,0 +1,50 @@
+import tempfile
+from importlib import import_module
+from pathlib import Path
+from unittest.mock import patch
+
+from django.apps import apps
+from django.test import TestCase, override_settings
+
+from rental.models import JobState, StartupState
+from services.startup import CollectStaticStep, MigrateStep, SeedStep, run_startup
+from student.models import Student
+from test.rental.test_async_views import STATIC_STORAGES
+
+
+class StartupTest(TestCase):
+    def test_migrations_are_current(self):
+        results = run_startup([MigrateStep()])
+        self.assertFalse(results[0].ran)
+
+    @patch('seed.seed_students.make_password', return_value='!')
+    def test_seed_runs_once_per_version_of_the_seed_module(self, make_password):
+        self.assertTrue(run_startup([SeedStep()])[0].ran)
+        self.assertEqual(Student.objects.count(), 19)
+
+        with patch('seed.seed_students.create_students') as create_students:
+            self.assertFalse(run_startup([SeedStep()])[0].ran)
+            create_students.assert_not_called()
+
+        StartupState.objects.filter(name=SeedStep.name).update(fingerprint='an older seed module')
+        self.assertTrue(run_startup([SeedStep()])[0].ran)
+        self.assertEqual(Student.objects.count(), 19)
+
+    def test_migration_moves_the_seed_fingerprint_out_of_job_state(self):
+        JobState.objects.create(name='startup:seed', cursor='a seed module')
+        import_module('rental.migrations.0011_startup_state').move_seed_fingerprint(apps, None)
+
+        self.assertFalse(JobState.objects.exists())
+        self.assertEqual(StartupState.objects.get(name=SeedStep.name).fingerprint, 'a seed module')
+
+    def test_static_files_are_collected_when_they_change(self):
+        static_root = tempfile.TemporaryDirectory()
+        self.addCleanup(static_root.cleanup)
+        with override_settings(STATIC_ROOT=static_root.name, STORAGES=STATIC_STORAGES):
+            self.assertTrue(run_startup([CollectStaticStep()])[0].ran)
+            self.assertTrue((Path(static_root.name) / 'admin' / 'css' / 'base.css').exists())
+            self.assertFalse(run_startup([CollectStaticStep()])[0].ran)
+            self.assertTrue(run_startup([CollectStaticStep()], force=['collectstatic'])[0].ran)
+
+            with override_settings(STATIC_URL='/assets/'):
+                self.assertTrue(run_startup([CollectStaticStep()])[0].ran)
@@ -0,0 +1,56 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from services.user_cache import get_user_cache
+from student.models import Student
+from test.rental.test_async_views import STATIC_STORAGES
+from test.rental.test_rented_books_panel_cache import LOCMEM_CACHES
+
+
+@override_settings(STORAGES=STATIC_STORAGES, CACHES=LOCMEM_CACHES)
+class UserCacheTest(TestCase):
+    def setUp(self):
+        get_user_cache().cache.clear()
+        self.student = Student.objects.create(username='test', email='test@email.com', phone_number='123')
+        self.student.set_password('password')
+        self.student.save()
+        self.client.login(username='test', password='password')
+
+    def test_authenticated_requests_run_no_auth_queries(self):
+        self.client.get(reverse('book_search'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('book_search'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in queries
+                          if 'FROM "Student"' in query['sql'] or 'FROM "django_session"' in query['sql']])
+
+    def test_password_change_signs_out_other_sessions(self):
+        self.client.get(reverse('book_search'))
+        student = Student.objects.get(pk=self.student.pk)
+        student.set_password('new password')
+        student.save()
+
+        response = self.client.get(reverse('book_search'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_profile_change_is_seen_on_the_next_request(self):
+        self.assertEqual(get_user_cache().get_user(self.student.pk).email, 'test@email.com')
+        self.student.email = 'new@email.com'
+        self.student.save()
+        self.assertEqual(get_user_cache().get_user(self.student.pk).email, 'new@email.com')
+
+    def test_saving_a_cached_user_keeps_the_other_columns(self):
+        user = get_user_cache().get_user(self.student.pk)
+        user.first_name = 'Ada'
+        user.save()
+
+        student = Student.objects.get(pk=self.student.pk)
+        self.assertEqual((student.first_name, student.phone_number), ('Ada', '123'))
+
+    def test_inactive_students_are_signed_out(self):
+        self.student.is_active = False
+        self.student.save()
+        response = self.client.get(reverse('book_search'))
+        self.assertEqual(response.status_code, 302)
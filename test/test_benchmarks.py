@@ -0,0 +1,24 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from django.db import connection
+from django.test import SimpleTestCase
+
+
+class FlowBenchmarkSmokeTest(SimpleTestCase):
+    @unittest.skipUnless(connection.vendor == 'sqlite', "the benchmark would create the test database of this run")
+    def test_concurrent_users_complete_their_flows(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'flow.json')
+            subprocess.run([sys.executable, '-m', 'benchmarks.flow', '--users', '2', '--flows', '1', '--latency', '0',
+                            '--docs', '2', '--output', output], check=True, capture_output=True, timeout=120)
+            with open(output) as file:
+                results = json.load(file)
+
+        self.assertEqual(results['flows'], 2)
+        for view, stats in results['results'].items():
+            self.assertEqual((stats['requests'], stats['errors']), (2, 0), view)